@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+"""Benchmarks for skdsl-py on synthetic contracts.
+
+Synthesizes a DSL contract of configurable size (tags x endpoints x complex requirements,
+nested generic types, hidden APIs), runs the translator pipeline stage by stage and reports
+wall time and peak traced memory per stage. Results can be saved as a baseline; later runs
+are compared against it and regressions are flagged in the JSON report (and exit code 1).
+
+    python bench.py --tags 200 --endpoints 30 --requirements 10 --save-baseline
+    python bench.py --tags 200 --endpoints 30 --requirements 10 --json bench_output.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import main as skdsl
+
+BENCH_FORMAT = 1
+STAGES = ("parse", "types", "requirements", "codegen_tags", "codegen_models", "write", "api_json", "api_index")
+PRIMITIVES = ("u8", "u32", "u64", "i32", "i64", "f64", "bool", "String")
+METHODS = ("get", "post", "put", "patch", "delete")
+
+
+# --- Synthetic contracts ---
+def synthesize_contract(tags: int, endpoints: int, requirements: int, seed: int = 0) -> str:
+    """Builds a DSL contract with `tags` x `endpoints` endpoints and `requirements` `req` blocks."""
+    rng = random.Random(seed)
+    lines = ["# Synthetic skdsl-py benchmark contract", ""]
+
+    models = [f"Model{i}" for i in range(max(4, tags // 2))]
+    for model in models:
+        lines.append(f"type {model} crate::api::types::{model}")
+    # Alias chains over nested generics: Alias{i} refers to Alias{i-1}
+    aliases = []
+    for i in range(max(4, tags // 4)):
+        inner = aliases[-1] if aliases and i % 3 else rng.choice(models)
+        definition = rng.choice([
+            f"HashMap<String, HashMap<u32, Vec<{inner}>>>",
+            f"Vec<Option<{inner}>>",
+            f"HashMap<u64, ({inner}, Vec<String>)>",
+            f"Option<Vec<HashMap<String, {inner}>>>",
+        ])
+        lines.append(f"type Alias{i} {definition}")
+        aliases.append(f"Alias{i}")
+    lines.append("")
+
+    req_names = []
+    for i in range(requirements):
+        keyword = "req/hidden" if i % 3 == 2 else "req"
+        incoming = [f"h/str/X-Req{i}-Header{j}" for j in range(3)] + [f"c/req{i}_session", f"q/u32/req{i}_page"]
+        outgoing = [f"h/str/X-Req{i}-Out"]
+        lines.append(f"{keyword} req{i} {' '.join(incoming)} -> {' '.join(outgoing)}")
+        req_names.append(f"req{i}")
+    lines.append("")
+
+    body_types = models + aliases + [f"Vec<{m}>" for m in models[:4]]
+    for t in range(tags):
+        tag_reqs = " ".join(f"req/{name}" for name in rng.sample(req_names, min(len(req_names), rng.randint(0, 2))))
+        lines.append(f"api tag tag{t} {tag_reqs}".rstrip())
+        for e in range(endpoints):
+            method = METHODS[e % len(METHODS)]
+            keyword = "api/hidden" if e % 10 == 9 else "api"
+            endpoint_reqs = f"req/{rng.choice(req_names)} " if req_names and e % 4 == 0 else ""
+            incoming = [f"{method}/tag{t}/res{e}/{{u64/id}}"]
+            incoming += [f"q/{rng.choice(PRIMITIVES)}/q{k}" for k in range(rng.randint(0, 3))]
+            incoming += [f"h/str/X-Header{k}" for k in range(rng.randint(0, 2))]
+            if method in ("post", "put", "patch"):
+                incoming.append(f"b/json/{rng.choice(body_types)}")
+            outgoing = [f"b/json/{rng.choice(body_types)}" if method == "get" else "ok"]
+            if e % 5 == 0:
+                outgoing.append("h/str/X-Request-ID")
+            lines.append(f"{keyword} {endpoint_reqs}{' '.join(incoming)} -> {' '.join(outgoing)}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+# --- Pipeline ---
+def run_pipeline(dsl_text: str, out_dir: Path, measure: Callable[[str, Callable[[], Any]], Any]) -> skdsl.DslFile:
+    """Runs every translator stage once through `measure(stage_name, fn)`."""
+    def parse() -> skdsl.DslFile:
+        fragment = skdsl.parse_dsl_fragment(dsl_text)
+        dsl_file = skdsl.DslFile()
+        skdsl.merge_dsl_fragment(dsl_file, fragment)
+        skdsl.merge_dsl_tags(dsl_file, fragment.tags)
+        return dsl_file
+
+    def types() -> None:
+        resolver = skdsl.resolve_type_definitions(dsl_file)
+        skdsl.resolve_param_types(dsl_file, resolver)
+
+    def requirements() -> None:
+        skdsl.resolve_requirements(dsl_file)
+        skdsl.resolve_cache_policies(dsl_file)
+        skdsl.resolve_request_limits(dsl_file)
+
+    dsl_file = measure("parse", parse)
+    measure("types", types)
+    measure("requirements", requirements)
+    tag_modules = measure("codegen_tags", lambda: {
+        tag.py_module_name: skdsl.generate_tag_module_code(tag, dsl_file) for tag in dsl_file.tags
+    })
+    version_files = measure("codegen_models", lambda: {
+        "models.py": skdsl.generate_models_file_code(dsl_file),
+        "main_app.py": skdsl.generate_main_app_code(dsl_file, "v1"),
+        "requirements.py": skdsl.generate_requirements_module_code(dsl_file),
+    })
+
+    def write() -> None:
+        for name, code in {**version_files, **tag_modules}.items():
+            skdsl.write_file_if_changed(out_dir / name, code)
+
+    measure("write", write)
+    measure("api_json", lambda: skdsl.dump_api_json(dsl_file))
+    measure("api_index", lambda: skdsl.dump_api_index(skdsl.build_api_index(dsl_file)))
+    return dsl_file
+
+
+def time_stages(dsl_text: str, repeat: int) -> Dict[str, List[float]]:
+    samples: Dict[str, List[float]] = {stage: [] for stage in STAGES}
+
+    def measure(stage: str, fn: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = fn()
+        samples[stage].append(time.perf_counter() - started)
+        return result
+
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as out_dir:
+            run_pipeline(dsl_text, Path(out_dir), measure)
+    return samples
+
+
+def trace_stage_memory(dsl_text: str) -> Dict[str, int]:
+    """Peak traced allocation per stage, in bytes, above what was live when the stage started."""
+    peaks: Dict[str, int] = {}
+
+    def measure(stage: str, fn: Callable[[], Any]) -> Any:
+        live_before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = fn()
+        peaks[stage] = max(0, tracemalloc.get_traced_memory()[1] - live_before)
+        return result
+
+    tracemalloc.start()
+    try:
+        with tempfile.TemporaryDirectory() as out_dir:
+            run_pipeline(dsl_text, Path(out_dir), measure)
+        peaks["total"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def contract_counts(dsl_file: skdsl.DslFile, dsl_text: str) -> Dict[str, int]:
+    endpoints = [endpoint for tag in dsl_file.tags for endpoint in tag.endpoints]
+    return {
+        "lines": dsl_text.count("\n") + 1,
+        "tags": len(dsl_file.tags),
+        "endpoints": len(endpoints),
+        "params": sum(len(e.final_path_params) + len(e.final_query_params) + len(e.final_header_params)
+                      + len(e.final_cookie_params) + len(e.final_form_params) for e in endpoints),
+        "types": len(dsl_file.type_definitions),
+        "requirements": len(dsl_file.complex_requirements),
+    }
+
+
+# --- Reports ---
+def build_report(args: argparse.Namespace, dsl_text: str) -> Dict[str, Any]:
+    with contextlib.redirect_stdout(io.StringIO()): # Translator warnings are not part of the benchmark
+        samples = time_stages(dsl_text, args.repeat)
+        peaks = trace_stage_memory(dsl_text)
+        with tempfile.TemporaryDirectory() as out_dir:
+            dsl_file = run_pipeline(dsl_text, Path(out_dir), lambda stage, fn: fn())
+
+    stages = {
+        stage: {
+            "median_s": statistics.median(samples[stage]),
+            "min_s": min(samples[stage]),
+            "peak_bytes": peaks[stage],
+        }
+        for stage in STAGES
+    }
+    return {
+        "format": BENCH_FORMAT,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "contract": {"tags": args.tags, "endpoints_per_tag": args.endpoints, "requirements": args.requirements,
+                     "seed": args.seed},
+        "counts": contract_counts(dsl_file, dsl_text),
+        "repeat": args.repeat,
+        "stages": stages,
+        "total_median_s": sum(s["median_s"] for s in stages.values()),
+        "peak_bytes": peaks["total"],
+    }
+
+
+def compare_with_baseline(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float,
+                          min_time_delta: float) -> List[Dict[str, Any]]:
+    """Stages whose best time or peak memory grew by more than `threshold` (a fraction).
+    Times are compared by their minimum, the sample least disturbed by other load."""
+    regressions = []
+    for stage, current in report["stages"].items():
+        previous = baseline["stages"].get(stage)
+        if previous is None:
+            continue
+        old_t, new_t = previous["min_s"], current["min_s"]
+        if new_t > old_t * (1 + threshold) and new_t - old_t > min_time_delta:
+            regressions.append({"stage": stage, "metric": "min_s", "baseline": old_t, "current": new_t,
+                                "change": new_t / old_t - 1 if old_t else None})
+        old_m, new_m = previous["peak_bytes"], current["peak_bytes"]
+        if old_m and new_m > old_m * (1 + threshold):
+            regressions.append({"stage": stage, "metric": "peak_bytes", "baseline": old_m, "current": new_m,
+                                "change": new_m / old_m - 1})
+    return regressions
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    contract, counts = report["contract"], report["counts"]
+    lines = [
+        f"Contract: {contract['tags']} tags x {contract['endpoints_per_tag']} endpoints, {contract['requirements']} requirements "
+        f"({counts['lines']} lines, {counts['endpoints']} endpoints, {counts['params']} params, {counts['types']} types)",
+        f"{'stage':<16}{'median ms':>12}{'min ms':>12}{'peak KiB':>12}",
+    ]
+    for stage, values in report["stages"].items():
+        lines.append(f"{stage:<16}{values['median_s'] * 1000:>12.2f}{values['min_s'] * 1000:>12.2f}"
+                     f"{values['peak_bytes'] / 1024:>12.1f}")
+    lines.append(f"{'total':<16}{report['total_median_s'] * 1000:>12.2f}{'':>12}{report['peak_bytes'] / 1024:>12.1f}")
+    for regression in report.get("regressions", []):
+        lines.append(f"REGRESSION {regression['stage']} {regression['metric']}: "
+                     f"{regression['baseline']:.6g} -> {regression['current']:.6g} (+{regression['change']:.0%})")
+    if "baseline_note" in report:
+        lines.append(report["baseline_note"])
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark skdsl-py on a synthetic contract")
+    parser.add_argument("--tags", type=int, default=50, help="Number of API tags")
+    parser.add_argument("--endpoints", type=int, default=20, help="Endpoints per tag")
+    parser.add_argument("--requirements", type=int, default=8, help="Number of complex requirements")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the contract generator")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per stage (the median is reported)")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline results file")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed growth before a stage is flagged (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore time regressions smaller than this")
+    parser.add_argument("--json", help="Write the machine-readable report to this file ('-' for stdout)")
+    parser.add_argument("--dump-dsl", help="Also write the synthesized contract to this file")
+    args = parser.parse_args()
+
+    dsl_text = synthesize_contract(args.tags, args.endpoints, args.requirements, args.seed)
+    if args.dump_dsl:
+        Path(args.dump_dsl).write_text(dsl_text)
+
+    report = build_report(args, dsl_text)
+    baseline_path = Path(args.baseline)
+    report["regressions"] = []
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text())
+        comparable = baseline.get("format") == BENCH_FORMAT and baseline.get("contract") == report["contract"]
+        if comparable:
+            report["regressions"] = compare_with_baseline(report, baseline, args.threshold, args.min_delta_ms / 1000)
+            report["baseline_note"] = f"Compared with {baseline_path} (threshold {args.threshold:.0%})"
+        else:
+            report["baseline_note"] = f"Baseline {baseline_path} was recorded for another contract, not compared"
+
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps({k: v for k, v in report.items() if k != "regressions"}, indent=2) + "\n")
+        print(f"Saved baseline to {baseline_path}", file=sys.stderr)
+    return 1 if report["regressions"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
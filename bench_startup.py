@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""Startup benchmark of generated apps: the eager `main_app.py` against `--lazy-routers`.
+
+Synthesizes a contract with bench.py's generator and generates it twice into a temporary
+folder, once as is and once with `--lazy-routers`, next to a stub `crate` package for its model
+types. For each layout, fresh interpreters import `main_app` and send one request to an endpoint
+of the first tag, straight to the ASGI app. Reported are the import time, the resident memory
+after the import and after that request, and the time of the request (which includes importing
+the tag in the lazy layout), each as the median over `--runs` interpreters.
+
+    python bench_startup.py --tags 200 --endpoints 20
+    python bench_startup.py --tags 50 --json -
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import bench
+import main as skdsl
+
+LAYOUTS = {"eager": [], "lazy": ["--lazy-routers"]}
+
+# Run by every measured interpreter: argv is the method and the path of the probe request
+PROBE_CODE = r'''
+import asyncio, json, resource, sys, time
+
+def rss_bytes():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024 # Peak, in KiB on Linux
+
+async def request(app, method, path):
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+    async def receive():
+        return messages.pop() if messages else {"type": "http.disconnect"}
+    async def send(message):
+        sent.append(message)
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method.upper(),
+             "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+             "headers": [], "client": ("127.0.0.1", 50000), "server": ("bench", 80)}
+    await app(scope, receive, send)
+    return next(m["status"] for m in sent if m["type"] == "http.response.start")
+
+start = time.perf_counter()
+from v1.main_app import app
+import_s = time.perf_counter() - start
+rss_import = rss_bytes()
+start = time.perf_counter()
+status = asyncio.run(request(app, sys.argv[1], sys.argv[2]))
+first_request_s = time.perf_counter() - start
+print(json.dumps({"import_s": import_s, "rss_import_bytes": rss_import, "first_request_s": first_request_s,
+                  "rss_first_request_bytes": rss_bytes(), "status": status,
+                  "modules": sum(1 for name in sys.modules if name.startswith("v1."))}))
+'''
+
+
+def write_crate_stub(folder: Path, dsl_text: str) -> None:
+    """A `crate.api.types` module with a small pydantic model per `crate::api::types::X` type."""
+    names = sorted(set(re.findall(r"crate::api::types::(\w+)", dsl_text)))
+    package = folder / "crate" / "api"
+    package.mkdir(parents=True)
+    (folder / "crate" / "__init__.py").write_text("")
+    (package / "__init__.py").write_text("")
+    classes = [f"class {name}(BaseModel):\n    id: int = 0\n    name: str = \"\"\n    tags: List[str] = []\n"
+               for name in names]
+    (package / "types.py").write_text("from typing import List\nfrom pydantic import BaseModel\n\n" + "\n".join(classes))
+
+
+def generate_layout(dsl_path: Path, out_dir: Path, extra_args: List[str]) -> None:
+    command = [sys.executable, str(Path(skdsl.__file__)), "-i", str(dsl_path), "-o", str(out_dir), "-v", "v1",
+               "--no-cache", *extra_args]
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+
+
+def probe_request(dsl_text: str) -> Tuple[str, str]:
+    """Method and path of the first endpoint of the first tag, path parameters set to 1."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        dsl_file = skdsl.parse_dsl_file_content(dsl_text)
+    tag = dsl_file.tags[0]
+    endpoint = tag.endpoints[0]
+    return endpoint.http_method, f"/api/v1/{tag.name}" + re.sub(r"\{[^}]+\}", "1", endpoint.path_template)
+
+
+def measure_layout(app_dir: Path, crate_dir: Path, method: str, path: str, runs: int) -> Dict[str, Any]:
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join([str(app_dir), str(crate_dir)]), "PYTHONDONTWRITEBYTECODE": "1"}
+    # A first, unmeasured run compiles everything; the generated app is then imported from bytecode
+    subprocess.run([sys.executable, "-c", PROBE_CODE, method, path], env={**env, "PYTHONDONTWRITEBYTECODE": ""},
+                   check=True, stdout=subprocess.DEVNULL)
+    samples = []
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", PROBE_CODE, method, path], env=env, check=True,
+                                capture_output=True, text=True)
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+    report = {key: statistics.median(sample[key] for sample in samples)
+              for key in ("import_s", "rss_import_bytes", "first_request_s", "rss_first_request_bytes")}
+    report["status"] = samples[0]["status"]
+    report["modules_loaded"] = samples[0]["modules"]
+    return report
+
+
+def build_report(args: argparse.Namespace) -> Dict[str, Any]:
+    dsl_text = bench.synthesize_contract(args.tags, args.endpoints, args.requirements, args.seed)
+    method, path = probe_request(dsl_text)
+    report: Dict[str, Any] = {"contract": {"tags": args.tags, "endpoints_per_tag": args.endpoints,
+                                           "requirements": args.requirements, "seed": args.seed},
+                              "runs": args.runs, "probe": f"{method.upper()} {path}", "layouts": {}}
+    with tempfile.TemporaryDirectory(prefix="skdsl-bench-startup-") as tmp:
+        folder = Path(tmp)
+        dsl_path = folder / "contract.dsl"
+        dsl_path.write_text(dsl_text)
+        write_crate_stub(folder / "stubs", dsl_text)
+        for layout, extra_args in LAYOUTS.items():
+            generate_layout(dsl_path, folder / layout, extra_args)
+            report["layouts"][layout] = measure_layout(folder / layout, folder / "stubs", method, path, args.runs)
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    contract = report["contract"]
+    lines = [
+        f"Contract: {contract['tags']} tags x {contract['endpoints_per_tag']} endpoints; "
+        f"first request: {report['probe']} (median of {report['runs']} runs)",
+        f"{'layout':<8}{'import ms':>11}{'RSS MiB':>10}{'1st req ms':>12}{'RSS MiB':>10}{'modules':>9}",
+    ]
+    for layout, result in report["layouts"].items():
+        lines.append(f"{layout:<8}{result['import_s'] * 1000:>11.1f}{result['rss_import_bytes'] / 2 ** 20:>10.1f}"
+                     f"{result['first_request_s'] * 1000:>12.1f}{result['rss_first_request_bytes'] / 2 ** 20:>10.1f}"
+                     f"{result['modules_loaded']:>9}")
+    eager, lazy = report["layouts"]["eager"], report["layouts"]["lazy"]
+    lines.append(f"lazy/eager: {lazy['import_s'] / eager['import_s']:.2f}x import time, "
+                 f"{lazy['rss_import_bytes'] / eager['rss_import_bytes']:.2f}x RSS after import, "
+                 f"{(lazy['import_s'] + lazy['first_request_s']) / (eager['import_s'] + eager['first_request_s']):.2f}x "
+                 f"time to the first response")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare worker startup of eager and --lazy-routers apps")
+    parser.add_argument("--tags", type=int, default=100, help="Number of API tags")
+    parser.add_argument("--endpoints", type=int, default=20, help="Endpoints per tag")
+    parser.add_argument("--requirements", type=int, default=8, help="Number of complex requirements")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the contract generator")
+    parser.add_argument("--runs", type=int, default=5, help="Measured interpreters per layout")
+    parser.add_argument("--json", help="Write the machine-readable report to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = build_report(args)
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+#!/usr/bin/env python
+"""Wire-format benchmark for generated routers: JSON, JSON with --fast-json, and MessagePack.
+
+Writes the generated `runtime.py` support module to a temporary folder and builds three echo
+endpoints the way the generated tag modules declare them: a `b/json` one, the same endpoint as
+emitted with `--fast-json` (TypeAdapters in `route_options`, `FastJSONResponse` as default
+response class) and a `b/msgpack` one (`response_class=MsgPackResponse`,
+`@route_options(msgpack_body=True)`). Each request is sent straight to the ASGI app, so the
+timings cover body decoding, validation, serialization and encoding, without any HTTP client
+or server overhead.
+
+    python bench_wire.py --records 1000 --samples 64
+    python bench_wire.py --records 100 --json -
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated, Any, Dict, List, Tuple
+
+import main as skdsl
+
+FORMATS = ("json", "json-fast", "msgpack")
+
+
+def load_runtime(folder: Path) -> Any:
+    """Imports the generated runtime module from `folder`."""
+    path = folder / "runtime.py"
+    path.write_text(skdsl.generate_runtime_module_code())
+    spec = importlib.util.spec_from_file_location("skdsl_bench_runtime", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def build_app(runtime: Any) -> Any:
+    from fastapi import APIRouter, Body, FastAPI
+    from pydantic import BaseModel, TypeAdapter
+
+    class Record(BaseModel):
+        id: int
+        name: str
+        tags: List[str]
+        score: float
+        samples: List[int]
+
+    router = APIRouter(route_class=runtime.SkdslRoute)
+
+    @router.post("/json", response_model=List[Record])
+    async def post_json(payload: List[Record] = Body(...)):
+        return payload
+
+    @router.post("/msgpack", response_model=List[Record], response_class=runtime.MsgPackResponse)
+    @runtime.route_options(msgpack_body=True)
+    async def post_msgpack(payload: List[Record] = Body(...)):
+        return payload
+
+    fast_router = APIRouter(route_class=runtime.SkdslRoute, default_response_class=runtime.FastJSONResponse)
+    records_adapter = TypeAdapter(List[Record])
+
+    @fast_router.post("/json-fast", response_model=List[Record])
+    @runtime.route_options(body_adapter=records_adapter, response_adapter=records_adapter)
+    async def post_json_fast(payload: Annotated[List[Record], runtime.PREVALIDATED, Body()]):
+        return payload
+
+    app = FastAPI() # The plain b/json route keeps FastAPI's default response handling
+    app.include_router(router)
+    app.include_router(fast_router)
+    return app
+
+
+def synthesize_payload(records: int, samples: int) -> List[Dict[str, Any]]:
+    return [
+        {"id": i, "name": f"record-{i}", "tags": ["alpha", "beta", f"t{i % 7}"], "score": i / 3,
+         "samples": [(i * 7919 + j * 104729) % 65536 for j in range(samples)]}
+        for i in range(records)
+    ]
+
+
+async def call_app(app: Any, path: str, body: bytes, headers: List[Tuple[bytes, bytes]]) -> Tuple[int, bytes]:
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent: List[Dict[str, Any]] = []
+
+    async def receive() -> Dict[str, Any]:
+        return messages.pop() if messages else {"type": "http.disconnect"}
+
+    async def send(message: Dict[str, Any]) -> None:
+        sent.append(message)
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "", "headers": headers,
+        "client": ("127.0.0.1", 50000), "server": ("bench", 80),
+    }
+    await app(scope, receive, send)
+    status = next(m["status"] for m in sent if m["type"] == "http.response.start")
+    return status, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+def time_codec(encode: Any, decode: Any, payload: Any, repeat: int) -> Dict[str, float]:
+    encode_times, decode_times = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        encoded = encode(payload)
+        encode_times.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        decode(encoded)
+        decode_times.append(time.perf_counter() - start)
+    return {"encode_s": min(encode_times), "decode_s": min(decode_times)}
+
+
+async def time_requests(app: Any, body: bytes, fmt: str, repeat: int) -> Dict[str, Any]:
+    media_type = b"application/msgpack" if fmt == "msgpack" else b"application/json"
+    headers = [(b"content-type", media_type), (b"accept", media_type), (b"content-length", str(len(body)).encode())]
+    status, response = await call_app(app, f"/{fmt}", body, headers) # Warm-up, also checks the route
+    if status != 200:
+        raise RuntimeError(f"/{fmt} answered {status}: {response[:200]!r}")
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await call_app(app, f"/{fmt}", body, headers)
+        samples.append(time.perf_counter() - start)
+    return {"request_bytes": len(body), "response_bytes": len(response),
+            "median_s": statistics.median(samples), "min_s": min(samples)}
+
+
+def build_report(args: argparse.Namespace) -> Dict[str, Any]:
+    import msgpack
+
+    payload = synthesize_payload(args.records, args.samples)
+    json_codec = (lambda value: json.dumps(value, separators=(",", ":")).encode("utf-8"), json.loads)
+    encoders = {
+        "json": json_codec,
+        "json-fast": json_codec, # Same bytes on the wire, different server-side path
+        "msgpack": (lambda value: msgpack.packb(value, use_bin_type=True), lambda data: msgpack.unpackb(data, raw=False)),
+    }
+    with tempfile.TemporaryDirectory(prefix="skdsl-bench-wire-") as tmp:
+        app = build_app(load_runtime(Path(tmp)))
+        report: Dict[str, Any] = {"records": args.records, "samples_per_record": args.samples, "formats": {}}
+        for fmt in FORMATS:
+            encode, decode = encoders[fmt]
+            body = encode(payload)
+            result = asyncio.run(time_requests(app, body, fmt, args.repeat))
+            result["codec"] = time_codec(encode, decode, payload, args.repeat)
+            report["formats"][fmt] = result
+    return report
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Echo of {report['records']} records ({report['samples_per_record']} ints each)",
+        f"{'format':<10}{'req KiB':>10}{'resp KiB':>10}{'median ms':>12}{'min ms':>10}{'enc ms':>9}{'dec ms':>9}",
+    ]
+    for fmt, result in report["formats"].items():
+        codec = result["codec"]
+        lines.append(f"{fmt:<10}{result['request_bytes'] / 1024:>10.1f}{result['response_bytes'] / 1024:>10.1f}"
+                     f"{result['median_s'] * 1000:>12.2f}{result['min_s'] * 1000:>10.2f}"
+                     f"{codec['encode_s'] * 1000:>9.2f}{codec['decode_s'] * 1000:>9.2f}")
+    json_result = report["formats"]["json"]
+    for fmt in FORMATS[1:]:
+        result = report["formats"][fmt]
+        lines.append(f"{fmt}/json: {result['median_s'] / json_result['median_s']:.2f}x time, "
+                     f"{result['response_bytes'] / json_result['response_bytes']:.2f}x response size")
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare the JSON, fast JSON and MessagePack paths of generated routers")
+    parser.add_argument("--records", type=int, default=1000, help="Records in the echoed list")
+    parser.add_argument("--samples", type=int, default=64, help="Integers per record")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed requests per format")
+    parser.add_argument("--json", help="Write the machine-readable report to this file ('-' for stdout)")
+    args = parser.parse_args()
+
+    report = build_report(args)
+    if args.json == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        if args.json:
+            Path(args.json).write_text(json.dumps(report, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,164 +1,649 @@
 #!/usr/bin/env python
 
 import argparse
+import contextlib
+import functools
+import hashlib
+import io
 import json
+import keyword
+import math
 import os
+import re
+import sys
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Union, Any
-
-from pydantic import BaseModel, Field
+from typing import List, Dict, NamedTuple, Optional, Union, Any, Tuple
 
 # --- Entities (Normally in a separate entities.py) ---
-class DslTypeDefinition(BaseModel):
-    name: str
-    definition: str
-    is_alias: bool
-    # For Python codegen
-    py_type_str: Optional[str] = None
-    py_import_stmt: Optional[str] = None
-    pydantic_model_def: Optional[str] = None
-
-class DslParameter(BaseModel): # Common fields for incoming/outgoing params
-    param_type: str # 'header', 'query', 'cookie', 'path', 'body_json', 'body_file', 'form_param', etc.
-    name: str # Name of header, query key, path variable, cookie name, form key
-    dsl_type: str # Original DSL type string (e.g., "u64", "Vec<String>", "MyData")
-    py_type: Optional[str] = None # Translated Python type (e.g., "int", "List[str]", "MyData")
-    is_hidden: bool = False # For OpenAPI spec
-    # For body/file specifically
-    content_type: Optional[str] = None # e.g. application/json, application/octet-stream
-    # For path params
-    is_rest_path: bool = False # for {**rest_path}
-
-class DslBody(BaseModel):
-    body_type: str # 'json', 'msgpack', 'file', 'plain', 'html', 'ok'
-    dsl_type: Optional[str] = None # For json/msgpack, e.g., "MyData", "Vec<OtherData>"
-    py_type: Optional[str] = None # Translated Python type
-    file_form_key: Optional[str] = None # For b/file/<form_key>
-
-class DslEndpoint(BaseModel):
-    raw_definition: str
-    is_hidden_openapi: bool = False # from api/hidden
-    
-    http_method: str
-    path_template: str # e.g., "/users/{id}"
-    
-    path_params: List[DslParameter] = []
-    query_params: List[DslParameter] = []
-    header_params: List[DslParameter] = []
-    cookie_params: List[DslParameter] = []
-    form_params: List[DslParameter] = [] # from f/<type>/<key>
-    
-    request_body: Optional[DslBody] = None # Parsed from b/...
-    
-    response_body: DslBody # Parsed from -> b/... or -> ok
-    response_headers: List[DslParameter] = []
-    response_cookies: List[DslParameter] = []
-    
-    # For linking and generation
-    func_name: str = ""
-    complex_req_names: List[str] = []
-    
-    # Populated after resolving complex requirements
-    final_path_params: List[DslParameter] = Field(default_factory=list)
-    final_query_params: List[DslParameter] = Field(default_factory=list)
-    final_header_params: List[DslParameter] = Field(default_factory=list)
-    final_cookie_params: List[DslParameter] = Field(default_factory=list)
-    final_form_params: List[DslParameter] = Field(default_factory=list)
-    final_request_body: Optional[DslBody] = None
-    
-    final_response_body: Optional[DslBody] = None
-    final_response_headers: List[DslParameter] = Field(default_factory=list)
-    final_response_cookies: List[DslParameter] = Field(default_factory=list)
+# The IR is made of plain slotted records: no validation on construction, names and types
+# interned, and parameter objects shared between endpoints. Pydantic is only used to
+# serialize it to .api.json (see `dump_api_json`).
 
+class IrRecord:
+    """Base of the IR records. Slots are listed in .api.json field order."""
+    __slots__ = ()
+    # Slot name -> record class of the fields that hold records or lists of records
+    _record_fields: Dict[str, type] = {}
 
-class DslComplexRequirement(BaseModel):
-    name: str
-    is_hidden_openapi: bool # From req/hidden
-    
-    # Note: DSL spec says complex reqs cannot have body, form, path params [cite: 23]
-    header_params: List[DslParameter] = []
-    query_params: List[DslParameter] = [] # Though spec doesn't explicitly list, it could be useful
-    cookie_params: List[DslParameter] = []
-    
-    response_headers: List[DslParameter] = []
-    response_cookies: List[DslParameter] = []
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: _ir_to_plain(getattr(self, name)) for name in self.__slots__}
 
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "IrRecord":
+        """Rebuilds a record from its `to_dict()` form (the fragment cache stores it as JSON)."""
+        record = object.__new__(cls)
+        for name in cls.__slots__:
+            value = data[name]
+            record_class = cls._record_fields.get(name)
+            if record_class is not None and value is not None:
+                value = [record_class.from_dict(v) for v in value] if isinstance(value, list) else record_class.from_dict(value)
+            elif isinstance(value, str):
+                value = _intern(value)
+            setattr(record, name, value)
+        return record
 
-class DslTag(BaseModel):
-    name: str
-    # Filename for this tag, e.g., users.py
-    py_module_name: str = ""
-    # Requirements applied to all endpoints in this tag
-    complex_req_names: List[str] = []
-    endpoints: List[DslEndpoint] = []
-
-class DslFile(BaseModel):
-    type_definitions: Dict[str, DslTypeDefinition] = {} # name: DslTypeDefinition
-    complex_requirements: Dict[str, DslComplexRequirement] = {} # name: DslComplexRequirement
-    tags: List[DslTag] = []
-    # For generating a models.py or types.py
-    pydantic_models_code: str = ""
-    type_aliases_code: str = ""
-    custom_imports_code: str = ""
+    def copy(self, **changes: Any) -> "IrRecord":
+        """Shallow copy with some fields replaced."""
+        clone = object.__new__(type(self))
+        for name in self.__slots__:
+            setattr(clone, name, changes.get(name, getattr(self, name)))
+        return clone
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    __hash__ = None # Records are mutable during resolution
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+def _ir_to_plain(value: Any) -> Any:
+    if isinstance(value, IrRecord):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        if value and isinstance(value[0], IrRecord):
+            return [v.to_dict() for v in value]
+        return [_ir_to_plain(v) for v in value]
+    if isinstance(value, dict):
+        return {k: _ir_to_plain(v) for k, v in value.items()}
+    return value
+
+_intern = sys.intern
+
+class DslStructField(IrRecord):
+    __slots__ = ("name", "dsl_type")
+
+    def __init__(self, name: str, dsl_type: str):
+        self.name = _intern(name)
+        self.dsl_type = _intern(dsl_type)
+
+class DslTypeDefinition(IrRecord):
+    __slots__ = ("name", "definition", "is_alias", "fields", "py_type_str", "py_import_stmt", "pydantic_model_def",
+                 "py_adapter_name")
+    _record_fields = {"fields": DslStructField}
+
+    def __init__(self, name: str, definition: str, is_alias: bool, fields: Optional[List[DslStructField]] = None,
+                 py_type_str: Optional[str] = None, py_import_stmt: Optional[str] = None,
+                 pydantic_model_def: Optional[str] = None, py_adapter_name: Optional[str] = None):
+        self.name = _intern(name)
+        self.definition = _intern(definition)
+        self.is_alias = is_alias
+        self.fields = fields # Set for `struct { ... }` definitions, which become Pydantic models
+        # For Python codegen
+        self.py_type_str = py_type_str
+        self.py_import_stmt = py_import_stmt
+        self.pydantic_model_def = pydantic_model_def
+        self.py_adapter_name = py_adapter_name # Module-level TypeAdapter of a container alias
+
+class DslParameter(IrRecord): # Common fields for incoming/outgoing params
+    __slots__ = ("param_type", "name", "dsl_type", "py_type", "is_hidden", "content_type", "is_rest_path")
+
+    def __init__(self, param_type: str, name: str, dsl_type: str, py_type: Optional[str] = None,
+                 is_hidden: bool = False, content_type: Optional[str] = None, is_rest_path: bool = False):
+        self.param_type = _intern(param_type) # 'header', 'query', 'cookie', 'path', 'body_json', 'body_file', 'form_param', etc.
+        self.name = _intern(name) # Name of header, query key, path variable, cookie name, form key
+        self.dsl_type = _intern(dsl_type) # Original DSL type string (e.g., "u64", "Vec<String>", "MyData")
+        self.py_type = py_type # Translated Python type (e.g., "int", "List[str]", "MyData")
+        self.is_hidden = is_hidden # For OpenAPI spec
+        # For body/file specifically
+        self.content_type = content_type # e.g. application/json, application/octet-stream
+        # For path params
+        self.is_rest_path = is_rest_path # for {**rest_path}
+
+    def to_dict(self) -> Dict[str, Any]: # Hot path of .api.json and fingerprints
+        return {"param_type": self.param_type, "name": self.name, "dsl_type": self.dsl_type, "py_type": self.py_type,
+                "is_hidden": self.is_hidden, "content_type": self.content_type, "is_rest_path": self.is_rest_path}
+
+class DslBody(IrRecord):
+    __slots__ = ("body_type", "dsl_type", "py_type", "file_form_key")
+
+    def __init__(self, body_type: str, dsl_type: Optional[str] = None, py_type: Optional[str] = None,
+                 file_form_key: Optional[str] = None):
+        self.body_type = _intern(body_type) # 'json', 'msgpack', 'ndjson', 'file', 'plain', 'html', 'ok'
+        self.dsl_type = _intern(dsl_type) if dsl_type else dsl_type # For json/msgpack, e.g., "MyData", "Vec<OtherData>"; item type of ndjson
+        self.py_type = py_type # Translated Python type
+        self.file_form_key = file_form_key # For b/file/<form_key>
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"body_type": self.body_type, "dsl_type": self.dsl_type, "py_type": self.py_type,
+                "file_form_key": self.file_form_key}
+
+class DslCachePolicy(IrRecord):
+    __slots__ = ("ttl_seconds", "max_entries", "vary_headers")
+
+    def __init__(self, ttl_seconds: Optional[float] = None, max_entries: Optional[int] = None,
+                 vary_headers: Optional[List[str]] = None):
+        self.ttl_seconds = ttl_seconds # From cache/<ttl>; None if only vary/ items were given
+        self.max_entries = max_entries # From cache/<ttl>/<max_entries>
+        self.vary_headers: List[str] = vary_headers if vary_headers is not None else [] # From vary/<header>
+
+class DslRequestLimits(IrRecord):
+    __slots__ = ("max_body_bytes", "max_in_flight", "retry_after_seconds")
+
+    def __init__(self, max_body_bytes: Optional[int] = None, max_in_flight: Optional[int] = None,
+                 retry_after_seconds: Optional[int] = None):
+        self.max_body_bytes = max_body_bytes # From maxbody/<size>
+        self.max_in_flight = max_in_flight # From inflight/<n>
+        self.retry_after_seconds = retry_after_seconds # From inflight/<n>/<retry_after>
+
+class DslCompressionPolicy(IrRecord):
+    __slots__ = ("algorithms", "min_size", "level")
+
+    def __init__(self, algorithms: List[str], min_size: int, level: Optional[int] = None):
+        self.algorithms = algorithms # Content codings in order of preference, e.g. ["br", "gzip"]
+        self.min_size = min_size # Smaller response bodies are sent as is
+        self.level = level # None for each algorithm's default
+
+class DslEndpoint(IrRecord):
+    __slots__ = (
+        "raw_definition", "is_hidden_openapi", "http_method", "path_template",
+        "path_params", "query_params", "header_params", "cookie_params", "form_params",
+        "request_body", "response_body", "response_headers", "response_cookies",
+        "func_name", "complex_req_names", "cache", "limits",
+        "final_path_params", "final_query_params", "final_header_params", "final_cookie_params", "final_form_params",
+        "final_request_body", "final_response_body", "final_response_headers", "final_response_cookies",
+        "final_cache", "final_limits",
+    )
+    _record_fields = {
+        **{name: DslParameter for name in __slots__ if name.endswith(("_params", "_headers", "_cookies"))},
+        **{name: DslBody for name in ("request_body", "response_body", "final_request_body", "final_response_body")},
+        "cache": DslCachePolicy, "final_cache": DslCachePolicy, "limits": DslRequestLimits, "final_limits": DslRequestLimits,
+    }
+
+    def __init__(self, raw_definition: str, http_method: str, path_template: str, response_body: DslBody,
+                 is_hidden_openapi: bool = False, path_params: Optional[List[DslParameter]] = None,
+                 complex_req_names: Optional[List[str]] = None, func_name: str = ""):
+        self.raw_definition = raw_definition
+        self.is_hidden_openapi = is_hidden_openapi # from api/hidden
+
+        self.http_method = _intern(http_method)
+        self.path_template = path_template # e.g., "/users/{id}"
+
+        self.path_params: List[DslParameter] = path_params if path_params is not None else []
+        self.query_params: List[DslParameter] = []
+        self.header_params: List[DslParameter] = []
+        self.cookie_params: List[DslParameter] = []
+        self.form_params: List[DslParameter] = [] # from f/<type>/<key>
+
+        self.request_body: Optional[DslBody] = None # Parsed from b/...
+
+        self.response_body = response_body # Parsed from -> b/... or -> ok
+        self.response_headers: List[DslParameter] = []
+        self.response_cookies: List[DslParameter] = []
+
+        # For linking and generation
+        self.func_name = func_name
+        self.complex_req_names: List[str] = complex_req_names if complex_req_names is not None else []
+        self.cache: Optional[DslCachePolicy] = None # From cache/ and vary/ items
+        self.limits: Optional[DslRequestLimits] = None # From maxbody/ and inflight/ items
+
+        # Populated after resolving complex requirements. Lists without requirement
+        # parameters are the very same list objects as the endpoint's own ones.
+        self.final_path_params: List[DslParameter] = []
+        self.final_query_params: List[DslParameter] = []
+        self.final_header_params: List[DslParameter] = []
+        self.final_cookie_params: List[DslParameter] = []
+        self.final_form_params: List[DslParameter] = []
+        self.final_request_body: Optional[DslBody] = None
+
+        self.final_response_body: Optional[DslBody] = None
+        self.final_response_headers: List[DslParameter] = []
+        self.final_response_cookies: List[DslParameter] = []
+        self.final_cache: Optional[DslCachePolicy] = None # Tag policy merged in, GET endpoints only
+        self.final_limits: Optional[DslRequestLimits] = None # Tag maxbody/ merged in; the tag's inflight/ is shared
+
+    def to_dict(self) -> Dict[str, Any]:
+        # Endpoints dominate the IR, so the field walk is spelled out; shared lists convert once
+        converted: Dict[int, List[Dict[str, Any]]] = {}
+        def params(param_list: List[DslParameter]) -> List[Dict[str, Any]]:
+            plain = converted.get(id(param_list))
+            if plain is None:
+                plain = converted[id(param_list)] = [p.to_dict() for p in param_list]
+            return plain
+        def body(value: Optional[IrRecord]) -> Optional[Dict[str, Any]]:
+            return value.to_dict() if value is not None else None
+        return {
+            "raw_definition": self.raw_definition, "is_hidden_openapi": self.is_hidden_openapi,
+            "http_method": self.http_method, "path_template": self.path_template,
+            "path_params": params(self.path_params), "query_params": params(self.query_params),
+            "header_params": params(self.header_params), "cookie_params": params(self.cookie_params),
+            "form_params": params(self.form_params), "request_body": body(self.request_body),
+            "response_body": body(self.response_body), "response_headers": params(self.response_headers),
+            "response_cookies": params(self.response_cookies),
+            "func_name": self.func_name, "complex_req_names": list(self.complex_req_names), "cache": body(self.cache),
+            "limits": body(self.limits),
+            "final_path_params": params(self.final_path_params), "final_query_params": params(self.final_query_params),
+            "final_header_params": params(self.final_header_params), "final_cookie_params": params(self.final_cookie_params),
+            "final_form_params": params(self.final_form_params), "final_request_body": body(self.final_request_body),
+            "final_response_body": body(self.final_response_body),
+            "final_response_headers": params(self.final_response_headers),
+            "final_response_cookies": params(self.final_response_cookies),
+            "final_cache": body(self.final_cache), "final_limits": body(self.final_limits),
+        }
+
+
+class DslComplexRequirement(IrRecord):
+    __slots__ = ("name", "is_hidden_openapi", "header_params", "query_params", "cookie_params",
+                 "response_headers", "response_cookies")
+    _record_fields = {name: DslParameter for name in __slots__[2:]}
+
+    def __init__(self, name: str, is_hidden_openapi: bool):
+        self.name = _intern(name)
+        self.is_hidden_openapi = is_hidden_openapi # From req/hidden
+
+        # Note: DSL spec says complex reqs cannot have body, form, path params [cite: 23]
+        self.header_params: List[DslParameter] = []
+        self.query_params: List[DslParameter] = [] # Though spec doesn't explicitly list, it could be useful
+        self.cookie_params: List[DslParameter] = []
+
+        self.response_headers: List[DslParameter] = []
+        self.response_cookies: List[DslParameter] = []
+
+
+class DslTag(IrRecord):
+    __slots__ = ("name", "py_module_name", "complex_req_names", "cache", "limits", "compression", "batch_max_requests",
+                 "endpoints")
+    _record_fields = {"cache": DslCachePolicy, "limits": DslRequestLimits, "compression": DslCompressionPolicy,
+                      "endpoints": DslEndpoint}
+
+    def __init__(self, name: str, py_module_name: str = ""):
+        self.name = _intern(name)
+        # Filename for this tag, e.g., users.py
+        self.py_module_name = py_module_name
+        # Requirements applied to all endpoints in this tag
+        self.complex_req_names: List[str] = []
+        # Response cache policy of the tag's GET endpoints
+        self.cache: Optional[DslCachePolicy] = None
+        # Default body size limit of its endpoints, and the in-flight limit shared by all of them
+        self.limits: Optional[DslRequestLimits] = None
+        # Response compression of its endpoints with complete (not streamed or file) bodies
+        self.compression: Optional[DslCompressionPolicy] = None
+        # Sub-requests allowed per call of its POST /batch route; None without `batch` on the tag line
+        self.batch_max_requests: Optional[int] = None
+        self.endpoints: List[DslEndpoint] = []
+
+class DslFragment(IrRecord):
+    """Unresolved parse result of a single DSL file (see `include`)."""
+    __slots__ = ("type_definitions", "complex_requirements", "tags", "includes", "definition_lines")
+
+    def __init__(self):
+        # Both tables are ordered by the line of each name's last definition
+        self.type_definitions: Dict[str, DslTypeDefinition] = {}
+        self.complex_requirements: Dict[str, DslComplexRequirement] = {}
+        self.tags: List[DslTag] = []
+        # (number of tags opened before the directive, line of the directive, path as written)
+        self.includes: List[Tuple[int, int, str]] = []
+        self.definition_lines: Dict[Tuple[str, str], int] = {} # ("type" | "req", name): line of the last definition
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"type_definitions": [d.to_dict() for d in self.type_definitions.values()],
+                "complex_requirements": [r.to_dict() for r in self.complex_requirements.values()],
+                "tags": [tag.to_dict() for tag in self.tags], "includes": [list(i) for i in self.includes],
+                "definition_lines": [[kind, name, line] for (kind, name), line in self.definition_lines.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "DslFragment":
+        fragment = cls()
+        for type_data in data["type_definitions"]:
+            type_def = DslTypeDefinition.from_dict(type_data)
+            fragment.type_definitions[type_def.name] = type_def
+        for req_data in data["complex_requirements"]:
+            req = DslComplexRequirement.from_dict(req_data)
+            fragment.complex_requirements[req.name] = req
+        fragment.tags = [DslTag.from_dict(tag_data) for tag_data in data["tags"]]
+        fragment.includes = [tuple(include) for include in data["includes"]]
+        fragment.definition_lines = {(kind, name): line for kind, name, line in data["definition_lines"]}
+        return fragment
+
+class DslFile(IrRecord):
+    __slots__ = ("type_definitions", "complex_requirements", "tags",
+                 "pydantic_models_code", "type_definitions_code", "type_adapters_code", "custom_imports_code")
+
+    def __init__(self, type_definitions: Optional[Dict[str, DslTypeDefinition]] = None,
+                 complex_requirements: Optional[Dict[str, DslComplexRequirement]] = None,
+                 tags: Optional[List[DslTag]] = None):
+        self.type_definitions = type_definitions if type_definitions is not None else {} # name: DslTypeDefinition
+        self.complex_requirements = complex_requirements if complex_requirements is not None else {} # name: DslComplexRequirement
+        self.tags: List[DslTag] = tags if tags is not None else []
+        # For generating a models.py or types.py
+        self.pydantic_models_code = ""
+        self.type_definitions_code = "" # Aliases and struct models, dependencies first
+        self.type_adapters_code = ""
+        self.custom_imports_code = ""
+
+def dump_api_json(dsl_file: DslFile) -> str:
+    """Serializes the IR for .api.json. Pydantic is only needed at this boundary."""
+    from pydantic_core import to_json
+    return to_json(dsl_file.to_dict(), indent=2).decode("utf-8")
 
 
 # --- Type Translation (Normally in a separate type_translator.py) ---
+TYPING_IMPORTS = "from typing import List, Dict, Optional, Any, Tuple"
+
+DSL_PRIMITIVE_TYPES = {
+    "str": "str", "String": "str",
+    "i8": "int", "u8": "int", "i16": "int", "u16": "int",
+    "i32": "int", "u32": "int", "i64": "int", "u64": "int",
+    "f32": "float", "f64": "float",
+    "bool": "bool",
+}
+
 def translate_dsl_primitive_type_to_python(dsl_type: str) -> Optional[str]:
-    mapping = {
-        "str": "str", "String": "str",
-        "i8": "int", "u8": "int", "i16": "int", "u16": "int",
-        "i32": "int", "u32": "int", "i64": "int", "u64": "int",
-        "f32": "float", "f64": "float",
-        "bool": "bool",
-    }
-    return mapping.get(dsl_type)
+    return DSL_PRIMITIVE_TYPES.get(dsl_type)
 
-def parse_complex_dsl_type(dsl_type: str) -> Dict[str, Any]:
-    """
-    Parses types like "Vec<MyType>", "HashMap<String, u32>"
-    Returns a dict like {'container': 'List', 'inner': 'MyType'} or
-                       {'container': 'Dict', 'key_type': 'str', 'value_type': 'int'}
-                       or {'type': 'MySimpleType'}
-    This is a simplified parser. A robust one would use regex or a proper tokenizer.
-    """
-    dsl_type = dsl_type.strip()
-    if dsl_type.startswith("Vec<") and dsl_type.endswith(">"):
-        inner = dsl_type[4:-1]
-        return {"container": "List", "inner_dsl": inner}
-    if dsl_type.startswith("HashMap<") and dsl_type.endswith(">"):
-        parts = dsl_type[8:-1].split(",", 1)
-        if len(parts) == 2:
-            return {"container": "Dict", "key_dsl": parts[0].strip(), "value_dsl": parts[1].strip()}
-    # Add more complex types if needed (Option, Result etc.)
-    return {"type": dsl_type}
-
-
-def dsl_type_to_python_type_str(dsl_type_name: str, defined_types: Dict[str, DslTypeDefinition]) -> str:
-    """Converts a DSL type string to a Python type string, resolving custom types."""
-    parsed_generic = parse_complex_dsl_type(dsl_type_name)
-
-    if "container" in parsed_generic:
-        container = parsed_generic["container"]
-        if container == "List":
-            inner_py = dsl_type_to_python_type_str(parsed_generic["inner_dsl"], defined_types)
-            return f"List[{inner_py}]"
-        elif container == "Dict":
-            key_py = dsl_type_to_python_type_str(parsed_generic["key_dsl"], defined_types)
-            value_py = dsl_type_to_python_type_str(parsed_generic["value_dsl"], defined_types)
-            return f"Dict[{key_py}, {value_py}]"
-    else: # Simple type or custom type
-        simple_type = parsed_generic["type"]
-        primitive_py = translate_dsl_primitive_type_to_python(simple_type)
+# Integer types by (signed, bits). Struct fields use a strict, range-checked int per width
+DSL_INTEGER_WIDTHS = {"i8": (True, 8), "u8": (False, 8), "i16": (True, 16), "u16": (False, 16),
+                      "i32": (True, 32), "u32": (False, 32), "i64": (True, 64), "u64": (False, 64)}
+
+def strict_int_type_name(dsl_type: str) -> str:
+    return f"Strict{dsl_type.upper()}" # u64 -> StrictU64
+
+def strict_int_type_code(dsl_type: str) -> str:
+    """`StrictU64 = Annotated[int, Strict(), Field(ge=0, le=2**64 - 1)]`: no coercion from
+    strings or floats, and out-of-range values fail validation instead of overflowing later."""
+    signed, bits = DSL_INTEGER_WIDTHS[dsl_type]
+    low, high = (f"-2**{bits - 1}", f"2**{bits - 1} - 1") if signed else ("0", f"2**{bits} - 1")
+    return f"{strict_int_type_name(dsl_type)} = Annotated[int, Strict(), Field(ge={low}, le={high})]"
+
+class DslTypeExpr(NamedTuple):
+    """Parse tree node of a DSL type expression, e.g. `HashMap<String, Vec<u8>>`.
+    Tuple types `(A, B)` use the name "()"."""
+    name: str
+    args: Tuple["DslTypeExpr", ...] = ()
+
+# (generic name) -> (Python typing name, number of type arguments)
+DSL_GENERIC_TYPES = {"Vec": ("List", 1), "HashMap": ("Dict", 2), "Option": ("Optional", 1)}
+
+_TYPE_TOKEN_RE = re.compile(r"[A-Za-z_]\w*(?:::[A-Za-z_]\w*)*|\S")
+_interned_type_exprs: Dict[DslTypeExpr, DslTypeExpr] = {}
+
+def tokenize_dsl_type(dsl_type: str) -> List[str]:
+    """Splits a type expression into names (`crate::a::B` is one name) and punctuation."""
+    return _TYPE_TOKEN_RE.findall(dsl_type)
+
+@functools.lru_cache(maxsize=None)
+def parse_dsl_type_expr(dsl_type: str) -> DslTypeExpr:
+    """Parses a DSL type expression. Equal (sub)trees are interned, so every distinct
+    type is parsed once and shared. Raises ValueError on malformed expressions."""
+    tokens = tokenize_dsl_type(dsl_type)
+    expr, pos = _parse_type_tokens(tokens, 0)
+    if pos != len(tokens):
+        raise ValueError(f"unexpected '{tokens[pos]}'")
+    return expr
+
+def _parse_type_tokens(tokens: List[str], pos: int) -> Tuple[DslTypeExpr, int]:
+    if pos >= len(tokens):
+        raise ValueError("unexpected end of type")
+    token = tokens[pos]
+    if token == "(": # (A, B) tuple, () unit
+        args, pos = _parse_type_list(tokens, pos + 1, ")")
+        return _interned_type_exprs.setdefault(DslTypeExpr("()", args), DslTypeExpr("()", args)), pos
+    if not (token[0].isalpha() or token[0] == "_"):
+        raise ValueError(f"unexpected '{token}'")
+    pos += 1
+    args: Tuple[DslTypeExpr, ...] = ()
+    if pos < len(tokens) and tokens[pos] == "<":
+        args, pos = _parse_type_list(tokens, pos + 1, ">")
+        if not args:
+            raise ValueError(f"'{token}<>' has no type arguments")
+    expr = DslTypeExpr(token, args)
+    return _interned_type_exprs.setdefault(expr, expr), pos
+
+def _parse_type_list(tokens: List[str], pos: int, closing: str) -> Tuple[Tuple[DslTypeExpr, ...], int]:
+    args = []
+    while True:
+        if pos < len(tokens) and tokens[pos] == closing:
+            return tuple(args), pos + 1
+        arg, pos = _parse_type_tokens(tokens, pos)
+        args.append(arg)
+        if pos >= len(tokens):
+            raise ValueError(f"missing '{closing}'")
+        if tokens[pos] == ",":
+            pos += 1
+        elif tokens[pos] != closing:
+            raise ValueError(f"unexpected '{tokens[pos]}'")
+
+def type_expr_names(expr: DslTypeExpr) -> List[str]:
+    """All type names used in an expression, including generic names."""
+    names = [expr.name]
+    for arg in expr.args:
+        names.extend(type_expr_names(arg))
+    return names
+
+def order_type_definitions(defined_types: Dict[str, "DslTypeDefinition"]) -> Tuple[List[str], set]:
+    """Orders type definitions so that every alias and struct comes after the types it refers to.
+    Returns the order and the set of aliases that are part of a cycle. Cycles through a struct
+    are fine: Pydantic resolves the forward references of models."""
+    order: List[str] = []
+    cyclic: set = set()
+    done: set = set()
+    visiting: List[str] = []
+
+    def dependencies(name: str) -> List[str]:
+        type_def = defined_types[name]
+        if type_def.fields is not None:
+            dsl_types = [field.dsl_type for field in type_def.fields]
+        elif type_def.is_alias:
+            dsl_types = [type_def.definition]
+        else:
+            return []
+        names = []
+        for dsl_type in dsl_types:
+            try:
+                expr = parse_dsl_type_expr(dsl_type)
+            except ValueError:
+                continue
+            names.extend(n for n in type_expr_names(expr) if n in defined_types)
+        return names
+
+    def visit(name: str) -> None:
+        if name in done:
+            return
+        if name in visiting:
+            cycle = visiting[visiting.index(name):]
+            if any(defined_types[n].fields is not None for n in cycle):
+                return
+            print(f"Error: Type alias cycle: {' -> '.join(cycle + [name])}. Using 'Any'.")
+            cyclic.update(cycle)
+            return
+        visiting.append(name)
+        for dependency in dependencies(name):
+            visit(dependency)
+        visiting.pop()
+        done.add(name)
+        order.append(name)
+
+    for name in defined_types:
+        visit(name)
+    return order, cyclic
+
+class DslTypeResolver:
+    """Translates DSL type strings to Python type strings for one set of type definitions.
+    Translations are memoized by type string, and alias chains are checked once."""
+
+    def __init__(self, defined_types: Dict[str, "DslTypeDefinition"]):
+        self.defined_types = defined_types
+        self._py_types: Dict[str, str] = {}
+        self._strict_py_types: Dict[str, str] = {}
+        self._warned: set = set()
+        self._order: Optional[Tuple[List[str], set]] = None
+        self.strict_ints_used: set = set() # DSL integer types rendered by to_python_strict
+
+    @property
+    def definition_order(self) -> List[str]:
+        """Type names, dependencies first."""
+        if self._order is None:
+            self._order = order_type_definitions(self.defined_types)
+        return self._order[0]
+
+    @property
+    def cyclic_aliases(self) -> set:
+        if self._order is None:
+            self._order = order_type_definitions(self.defined_types)
+        return self._order[1]
+
+    def to_python(self, dsl_type: str) -> str:
+        py_type = self._py_types.get(dsl_type)
+        if py_type is None:
+            try:
+                py_type = self._render(parse_dsl_type_expr(dsl_type))
+            except ValueError as e:
+                self._warn(dsl_type, f"Warning: Could not parse DSL type '{dsl_type}' ({e}). Using 'Any'.")
+                py_type = "Any"
+            self._py_types[dsl_type] = py_type
+        return py_type
+
+    def to_python_strict(self, dsl_type: str) -> str:
+        """Like to_python, with integers as their strict width types (e.g. `StrictU64`). For struct fields."""
+        py_type = self._strict_py_types.get(dsl_type)
+        if py_type is None:
+            try:
+                py_type = self._render(parse_dsl_type_expr(dsl_type), strict=True)
+            except ValueError as e:
+                self._warn(dsl_type, f"Warning: Could not parse DSL type '{dsl_type}' ({e}). Using 'Any'.")
+                py_type = "Any"
+            self._strict_py_types[dsl_type] = py_type
+        return py_type
+
+    def _render(self, expr: DslTypeExpr, strict: bool = False) -> str:
+        if expr.name == "()":
+            if not expr.args:
+                return "None"
+            return f"Tuple[{', '.join(self._render(arg, strict) for arg in expr.args)}]"
+        generic = DSL_GENERIC_TYPES.get(expr.name)
+        if generic:
+            py_name, arity = generic
+            if len(expr.args) != arity:
+                self._warn(expr.name, f"Warning: '{expr.name}' takes {arity} type argument(s), got {len(expr.args)}. Using 'Any'.")
+                return "Any"
+            return f"{py_name}[{', '.join(self._render(arg, strict) for arg in expr.args)}]"
+        if expr.args:
+            self._warn(expr.name, f"Warning: Unknown generic DSL type '{expr.name}'. Using 'Any'.")
+            return "Any"
+        if strict and expr.name in DSL_INTEGER_WIDTHS:
+            self.strict_ints_used.add(expr.name)
+            return strict_int_type_name(expr.name)
+        primitive_py = translate_dsl_primitive_type_to_python(expr.name)
         if primitive_py:
             return primitive_py
-        if simple_type in defined_types: # It's a custom defined type
-            return simple_type # Use the name, Pydantic will handle it
-    
-    # Fallback or error
-    # print(f"Warning: Could not fully translate DSL type '{dsl_type_name}' to Python. Using 'Any'.")
-    return "Any" # Fallback for unknown types
+        if expr.name in self.defined_types: # It's a custom defined type
+            return "Any" if expr.name in self.cyclic_aliases else expr.name # Use the name, Pydantic will handle it
+        self._warn(expr.name, f"Warning: Unknown DSL type '{expr.name}'. Using 'Any'.")
+        return "Any" # Fallback for unknown types
+
+    def _warn(self, key: str, message: str) -> None:
+        if key not in self._warned:
+            self._warned.add(key)
+            print(message)
+
+
+def dsl_type_to_python_type_str(dsl_type_name: str, defined_types: Dict[str, "DslTypeDefinition"],
+                                resolver: Optional[DslTypeResolver] = None) -> str:
+    """Converts a DSL type string to a Python type string, resolving custom types.
+    Pass a shared `resolver` when translating many types of the same file."""
+    return (resolver or DslTypeResolver(defined_types)).to_python(dsl_type_name)
+
+@functools.lru_cache(maxsize=None)
+def python_import_statement(definition: str, name: str) -> Optional[str]:
+    """`crate::a::B` imported as `name`, or None for a definition that is not a path.
+    Cached per process: contracts of a --batch run mostly import the same shared types."""
+    parts = definition.split("::")
+    if len(parts) < 2:
+        return None
+    module_path, class_name = ".".join(parts[:-1]), parts[-1]
+    if class_name == name:
+        return f"from {module_path} import {class_name}"
+    return f"from {module_path} import {class_name} as {name}"
 
-def generate_pydantic_model_for_dsl_type(type_def: DslTypeDefinition, defined_types: Dict[str, DslTypeDefinition]) -> str:
+CONTAINER_PY_TYPES = ("List[", "Dict[", "Tuple[", "Optional[")
+
+def struct_field_py_name(name: str) -> str:
+    """Python attribute of a struct field: `user-id` -> `user_id`, `from` -> `from_`, `_id` -> `id_`.
+    Pydantic treats names with a leading underscore as private attributes, not fields."""
+    py_name = re.sub(r"\W", "_", name)
+    if py_name.startswith("_"):
+        py_name = py_name.lstrip("_") + "_"
+    if py_name == "_":
+        return "field_"
+    return f"{py_name}_" if keyword.iskeyword(py_name) else py_name
+
+def is_hashable_dsl_type(expr: DslTypeExpr, defined_types: Dict[str, DslTypeDefinition], seen: frozenset = frozenset()) -> bool:
+    """Whether values of the type are immutable all the way down, so a model holding them can be frozen.
+    Imported types are unknown, and recursive structs are not treated as hashable."""
+    if expr.name == "()":
+        return all(is_hashable_dsl_type(arg, defined_types, seen) for arg in expr.args)
+    if expr.name == "Option" and len(expr.args) == 1:
+        return is_hashable_dsl_type(expr.args[0], defined_types, seen)
+    if expr.args:
+        return False # Vec, HashMap
+    if expr.name in DSL_PRIMITIVE_TYPES:
+        return True
+    type_def = defined_types.get(expr.name)
+    if type_def is None or expr.name in seen:
+        return False
+    try:
+        if type_def.fields is not None:
+            return all(is_hashable_dsl_type(parse_dsl_type_expr(field.dsl_type), defined_types, seen | {expr.name})
+                       for field in type_def.fields)
+        if type_def.is_alias:
+            return is_hashable_dsl_type(parse_dsl_type_expr(type_def.definition), defined_types, seen | {expr.name})
+    except ValueError:
+        pass
+    return False
+
+def generate_struct_model_code(type_def: DslTypeDefinition, defined_types: Dict[str, DslTypeDefinition],
+                               resolver: DslTypeResolver) -> str:
+    """A Pydantic model for `type X struct { ... }`. Integer fields are strict and range-checked
+    by width, `Option<T>` fields default to None, and a model whose fields are all immutable is
+    frozen (hashable, so it can be a dict key or a set member). Field names that are not valid
+    Python attributes keep their DSL spelling as the alias."""
+    lines = [f"class {type_def.name}(BaseModel):"]
+    config = []
+    if is_hashable_dsl_type(DslTypeExpr(type_def.name), defined_types):
+        config.append("frozen=True")
+    if any(struct_field_py_name(field.name) != field.name for field in type_def.fields):
+        config.append("populate_by_name=True")
+    if config:
+        lines.append(f"    model_config = ConfigDict({', '.join(config)})")
+    for field in type_def.fields:
+        py_type = resolver.to_python_strict(field.dsl_type)
+        py_name = struct_field_py_name(field.name)
+        optional = py_type.startswith("Optional[")
+        if py_name != field.name:
+            default = f" = Field({'None, ' if optional else ''}alias={field.name!r})"
+        else:
+            default = " = None" if optional else ""
+        lines.append(f"    {py_name}: {py_type}{default}")
+    if len(lines) == 1:
+        lines.append("    pass")
+    return "\n".join(lines) + "\n"
+
+def generate_pydantic_model_for_dsl_type(type_def: DslTypeDefinition, defined_types: Dict[str, DslTypeDefinition],
+                                        resolver: Optional[DslTypeResolver] = None) -> str:
     """
     Generates a Pydantic model string if the type is not a simple alias to existing Python types.
     Example: `type MyType crate::types::MyType` would ideally mean MyType is already a Pydantic model.
@@ -171,21 +656,24 @@ def generate_pydantic_model_for_dsl_type(type_def: DslTypeDefinition, defined_ty
              The Rust DSL's `type MyType crate::types::MyType` suggests an existing type[cite: 8].
              If `MyType` is used as a request/response body, it MUST be a Pydantic model.
     """
+    if type_def.fields is not None: # e.g. type User struct { id: u64, name: String }
+        type_def.pydantic_model_def = generate_struct_model_code(type_def, defined_types,
+                                                                 resolver or DslTypeResolver(defined_types))
+        type_def.py_type_str = type_def.name
+        return type_def.pydantic_model_def
     if type_def.is_alias: # e.g. type MyList Vec<i32>
-        py_equiv = dsl_type_to_python_type_str(type_def.definition, defined_types)
+        py_equiv = dsl_type_to_python_type_str(type_def.definition, defined_types, resolver)
         type_def.py_type_str = f"{type_def.name} = {py_equiv}"
+        # Containers get a TypeAdapter built once at import, shared by every user of the alias
+        if py_equiv.startswith(CONTAINER_PY_TYPES) and f"{type_def.name}Adapter" not in defined_types:
+            type_def.py_adapter_name = f"{type_def.name}Adapter"
         return "" # It's an alias, not a new model
     else: # e.g. type User crate::models::User
           # This implies User is a Pydantic model defined elsewhere or needs to be.
           # For now, we'll assume it means an import.
-        parts = type_def.definition.split("::")
-        if len(parts) > 1:
-            module_path = ".".join(parts[:-1])
-            class_name = parts[-1]
-            if class_name == type_def.name:
-                type_def.py_import_stmt = f"from {module_path} import {class_name}"
-            else:
-                type_def.py_import_stmt = f"from {module_path} import {class_name} as {type_def.name}"
+        import_stmt = python_import_statement(type_def.definition, type_def.name)
+        if import_stmt:
+            type_def.py_import_stmt = import_stmt
             type_def.py_type_str = type_def.name # The type is now available via import
         else: # Not a path, maybe an opaque type that should be a Pydantic model
               # For simplicity, we create a placeholder Pydantic model
@@ -196,7 +684,50 @@ def generate_pydantic_model_for_dsl_type(type_def: DslTypeDefinition, defined_ty
 
 # --- DSL Parser (Normally in a separate dsl_parser.py) ---
 
-def parse_requirement_item(item_str: str, is_outgoing: bool) -> Union[DslParameter, DslBody, None]:
+_STRUCT_FIELD_NAME_RE = re.compile(r"[A-Za-z_][\w-]*$")
+
+def split_top_level(text: str, separator: str = ",") -> List[str]:
+    """Splits at separators outside of `<...>` and `(...)`, e.g. the fields of a struct."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(text):
+        if char in "<(":
+            depth += 1
+        elif char in ">)":
+            depth -= 1
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def parse_struct_fields(definition: str) -> List[DslStructField]:
+    """Fields of `struct { name: Type, ... }`, in order. Raises ValueError if malformed."""
+    body = definition[len("struct"):].strip()
+    if not (body.startswith("{") and body.endswith("}")):
+        raise ValueError("expected 'struct { name: Type, ... }'")
+    fields: List[DslStructField] = []
+    for part in split_top_level(body[1:-1]):
+        if not part.strip():
+            continue # Trailing comma, or an empty struct
+        name, colon, dsl_type = part.partition(":")
+        name, dsl_type = name.strip(), dsl_type.strip()
+        if not colon or not dsl_type or not _STRUCT_FIELD_NAME_RE.match(name):
+            raise ValueError(f"bad field '{part.strip()}'")
+        if any(field.name == name for field in fields):
+            raise ValueError(f"duplicate field '{name}'")
+        parse_dsl_type_expr(dsl_type) # Checks the syntax only, the names are resolved later
+        fields.append(DslStructField(name, dsl_type))
+    return fields
+
+def parse_requirement_item(item_str: str, is_outgoing: bool,
+                           item_pool: Optional[Dict[Tuple[str, bool], Any]] = None) -> Union[DslParameter, DslBody, None]:
+    # Within one file, equal items (e.g. the same header in many endpoints) share one object
+    if item_pool is not None:
+        key = (item_str, is_outgoing)
+        if key not in item_pool:
+            item_pool[key] = parse_requirement_item(item_str, is_outgoing)
+        return item_pool[key]
+
     parts = item_str.split('/')
     if not parts: return None
 
@@ -231,17 +762,128 @@ def parse_requirement_item(item_str: str, is_outgoing: bool) -> Union[DslParamet
             return DslParameter(param_type='header', name=parts[2], dsl_type=parts[1])
         elif prefix == 'c' and len(parts) == 2: # c/<key> [cite: 9]
             return DslParameter(param_type='cookie', name=parts[1], dsl_type='str')
-        elif prefix == 'b': # b/<plain|html|file> or b/<json|msgpack>/<type> [cite: 8]
+        elif prefix == 'b': # b/<plain|html|file> or b/<json|msgpack|ndjson>/<type> [cite: 8]
             if len(parts) >= 2:
                 body_format = parts[1]
                 if body_format in ['plain', 'html', 'file'] and len(parts) == 2:
                      return DslBody(body_type=body_format)
-                elif body_format in ['json', 'msgpack'] and len(parts) == 3:
+                elif body_format in ['json', 'msgpack', 'ndjson'] and len(parts) == 3:
                     return DslBody(body_type=body_format, dsl_type=parts[2])
     return None
 
 
-def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinition]) -> Optional[DslEndpoint]:
+CACHE_TTL_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+DEFAULT_CACHE_ENTRIES = 1024
+_CACHE_SPEC_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)?(?:/(\d+))?")
+
+def is_cache_item(item_str: str) -> bool:
+    return item_str.startswith(("cache/", "vary/"))
+
+def parse_cache_items(items: List[str], line: str) -> Optional[DslCachePolicy]:
+    """cache/<ttl>[/<max_entries>] and vary/<header> items of an `api` or `api tag` line.
+    The TTL takes an ms, s, m or h suffix (seconds without one): cache/30s, cache/5m/256."""
+    if not items:
+        return None
+    policy = DslCachePolicy()
+    for item_str in items:
+        kind, _, spec = item_str.partition('/')
+        if kind == "vary" and spec:
+            policy.vary_headers.append(spec)
+            continue
+        match = _CACHE_SPEC_RE.fullmatch(spec) if kind == "cache" else None
+        if match is None:
+            print(f"Warning: Invalid cache item '{item_str}' in: {line}")
+            continue
+        ttl, unit, max_entries = match.groups()
+        policy.ttl_seconds = float(ttl) * CACHE_TTL_UNITS[unit or "s"]
+        if max_entries:
+            policy.max_entries = int(max_entries)
+    return policy
+
+
+BODY_SIZE_UNITS = {"b": 1, "k": 1024, "kb": 1024, "m": 1024 ** 2, "mb": 1024 ** 2, "g": 1024 ** 3, "gb": 1024 ** 3}
+DEFAULT_RETRY_AFTER = 1
+_BODY_SIZE_RE = re.compile(r"(\d+)(b|kb?|mb?|gb?)?", re.IGNORECASE)
+_IN_FLIGHT_RE = re.compile(r"(\d+)(?:/(\d+(?:\.\d+)?)(ms|s|m|h)?)?")
+
+def is_limit_item(item_str: str) -> bool:
+    return item_str.startswith(("maxbody/", "inflight/"))
+
+def parse_limit_items(items: List[str], line: str) -> Optional[DslRequestLimits]:
+    """maxbody/<size> and inflight/<n>[/<retry_after>] items of an `api` or `api tag` line.
+    Sizes take a b, k(b), m(b) or g(b) suffix (bytes without one, 1k = 1024 bytes): maxbody/8mb.
+    Retry-After takes the cache/ TTL units and is rounded up to whole seconds: inflight/64/2s."""
+    if not items:
+        return None
+    limits = DslRequestLimits()
+    for item_str in items:
+        kind, _, spec = item_str.partition('/')
+        match = (_BODY_SIZE_RE if kind == "maxbody" else _IN_FLIGHT_RE).fullmatch(spec)
+        if match is None or int(match.group(1)) == 0:
+            print(f"Warning: Invalid limit item '{item_str}' in: {line}")
+            continue
+        if kind == "maxbody":
+            size, unit = match.groups()
+            limits.max_body_bytes = int(size) * BODY_SIZE_UNITS[(unit or "b").lower()]
+            continue
+        limit, retry_after, unit = match.groups()
+        limits.max_in_flight = int(limit)
+        if retry_after:
+            limits.retry_after_seconds = max(1, math.ceil(float(retry_after) * CACHE_TTL_UNITS[unit or "s"]))
+    return limits
+
+
+COMPRESSION_ALGORITHMS = {"br": 11, "gzip": 9, "deflate": 9} # Highest level of each
+DEFAULT_COMPRESSION_MIN_SIZE = 1024
+_COMPRESSION_SPEC_RE = re.compile(r"([a-z]+(?:,[a-z]+)*)(?:/(\d+(?:b|kb?|mb?)?)(?:/(\d+))?)?", re.IGNORECASE)
+
+def parse_compression_items(items: List[str], line: str) -> Optional[DslCompressionPolicy]:
+    """compress/<algorithm>[,<algorithm>...][/<min_size>[/<level>]] on an `api tag` line,
+    e.g. compress/br,gzip/2kb/5. Algorithms are br, gzip and deflate, in order of preference."""
+    policy = None
+    for item_str in items:
+        match = _COMPRESSION_SPEC_RE.fullmatch(item_str.partition('/')[2])
+        algorithms = match.group(1).lower().split(',') if match else []
+        unknown = [algorithm for algorithm in algorithms if algorithm not in COMPRESSION_ALGORITHMS]
+        if match is None or unknown:
+            print(f"Warning: Invalid compression item '{item_str}' in: {line}")
+            continue
+        min_size, level = DEFAULT_COMPRESSION_MIN_SIZE, None
+        if match.group(2):
+            size, unit = _BODY_SIZE_RE.fullmatch(match.group(2)).groups()
+            min_size = int(size) * BODY_SIZE_UNITS[(unit or "b").lower()]
+        if match.group(3):
+            level = int(match.group(3))
+            too_high = [algorithm for algorithm in algorithms if level > COMPRESSION_ALGORITHMS[algorithm]]
+            if too_high:
+                print(f"Warning: Compression level {level} is above the highest level of {', '.join(too_high)}, "
+                      f"which is used instead, in: {line}")
+        policy = DslCompressionPolicy(list(dict.fromkeys(algorithms)), min_size, level)
+    return policy
+
+
+DEFAULT_BATCH_MAX_REQUESTS = 20
+
+def is_batch_item(item_str: str) -> bool:
+    return item_str == "batch" or item_str.startswith("batch/")
+
+def parse_batch_items(items: List[str], line: str) -> Optional[int]:
+    """batch[/<max_requests>] on an `api tag` line: the tag gets a POST /batch route running up
+    to max_requests (default 20) requests to its endpoints per call. Returns None without it."""
+    max_requests = None
+    for item_str in items:
+        spec = item_str.partition('/')[2]
+        if not spec:
+            max_requests = DEFAULT_BATCH_MAX_REQUESTS
+        elif spec.isdigit() and int(spec) > 0:
+            max_requests = int(spec)
+        else:
+            print(f"Warning: Invalid batch item '{item_str}' in: {line}")
+    return max_requests
+
+
+def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinition],
+                            item_pool: Optional[Dict[Tuple[str, bool], Any]] = None) -> Optional[DslEndpoint]:
     # Example: api get/chats q/i64/chat_id -> b/json/Vec<ChatData> [cite: 14]
     # Example: api/hidden post/submit -> ok [cite: 19]
     # Example: api req/master get/test -> ok c/C3A-Sign [cite: 22]
@@ -259,7 +901,15 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
         return None # Not an api line
 
     complex_req_names = []
-    while parts and parts[0].startswith("req/"): # [cite: 21]
+    cache_items = []
+    limit_items = []
+    while parts and (parts[0].startswith("req/") or is_cache_item(parts[0]) or is_limit_item(parts[0])): # [cite: 21]
+        if is_cache_item(parts[0]):
+            cache_items.append(parts.pop(0))
+            continue
+        if is_limit_item(parts[0]):
+            limit_items.append(parts.pop(0))
+            continue
         complex_req_names.append(parts[0].split('/', 1)[1])
         parts.pop(0)
 
@@ -270,6 +920,12 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
     incoming_dsl_parts = parts[:arrow_index]
     outgoing_dsl_parts = parts[arrow_index+1:]
 
+    # cache/, vary/, maxbody/ and inflight/ may also follow the method and path
+    cache_items.extend(item_str for item_str in incoming_dsl_parts if is_cache_item(item_str))
+    limit_items.extend(item_str for item_str in incoming_dsl_parts if is_limit_item(item_str))
+    incoming_dsl_parts = [item_str for item_str in incoming_dsl_parts
+                          if not is_cache_item(item_str) and not is_limit_item(item_str)]
+
     if not incoming_dsl_parts: return None # Must have at least path
 
     # First incoming part is method and path
@@ -291,6 +947,10 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
     i = 0
     while i < len(current_path_segments):
         segment = current_path_segments[i]
+        if segment.startswith('{') and not segment.endswith('}') and i + 1 < len(current_path_segments) \
+                and current_path_segments[i + 1].endswith('}'): # {u64/id} was split on its '/'
+            segment = f"{segment}/{current_path_segments[i + 1]}"
+            i += 1
         if segment.startswith('{') and segment.endswith('}'):
             is_rest_path = False
             if segment.startswith('{**'): # {**rest_path}
@@ -337,7 +997,7 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
                     param_name = segment[1:-1]
             
             path_params_list.append(DslParameter(param_type='path', name=param_name, dsl_type=param_type, is_rest_path=is_rest_path))
-            path_template_parts.append(f"{{{param_name}}}")
+            path_template_parts.append(f"{{{param_name}:path}}" if is_rest_path else f"{{{param_name}}}")
         else:
             path_template_parts.append(segment)
         i += 1
@@ -355,10 +1015,12 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
         complex_req_names=complex_req_names,
         response_body=DslBody(body_type='ok') # Default, will be overwritten
     )
+    ep.cache = parse_cache_items(cache_items, line)
+    ep.limits = parse_limit_items(limit_items, line)
 
     # Parse other incoming items
     for item_str in incoming_dsl_parts:
-        item = parse_requirement_item(item_str, is_outgoing=False)
+        item = parse_requirement_item(item_str, is_outgoing=False, item_pool=item_pool)
         if isinstance(item, DslParameter):
             if item.param_type == 'query': ep.query_params.append(item)
             elif item.param_type == 'header': ep.header_params.append(item)
@@ -377,7 +1039,7 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
     # Parse outgoing items
     has_response_body = False
     for item_str in outgoing_dsl_parts:
-        item = parse_requirement_item(item_str, is_outgoing=True)
+        item = parse_requirement_item(item_str, is_outgoing=True, item_pool=item_pool)
         if isinstance(item, DslParameter):
             if item.param_type == 'header': ep.response_headers.append(item)
             elif item.param_type == 'cookie': ep.response_cookies.append(item)
@@ -391,26 +1053,34 @@ def parse_api_endpoint_line(line: str, defined_types: Dict[str, DslTypeDefinitio
         print(f"Error: No response body provided for API: {line}")
         return None # Must have a response body
 
-    # Generate function name (simplified from Rust version [cite: 49])
+    # Generate function name (as in the Rust version [cite: 49]): get/chat/{u64/id}/audio-request
+    # becomes get_chat_by_id_audio_request
+    clean_path = re.sub(r"\{([^}:]+)(:path)?\}", r"by_\1", ep.path_template)
     name_parts = [ep.http_method]
-    clean_path = ep.path_template.replace('{', '').replace('}', '').replace('**', '')
-    name_parts.extend(s for s in clean_path.split('/') if s)
-    ep.func_name = "_".join(name_parts) if name_parts else "root_handler"
+    name_parts.extend(s for s in re.split(r"[/\-]", clean_path) if s)
+    ep.func_name = re.sub(r"\W", "_", "_".join(name_parts))
     
     return ep
 
 
-def parse_dsl_file_content(content: str) -> DslFile:
-    dsl_file = DslFile()
+def parse_dsl_fragment(content: str) -> DslFragment:
+    """Line pass over a single DSL file. Types and requirements are resolved later, globally."""
+    dsl_file = DslFragment()
     current_tag: Optional[DslTag] = None
+    item_pool: Dict[Tuple[str, bool], Any] = {}
 
     for line_num, raw_line in enumerate(content.splitlines()):
         line = raw_line.strip()
         if not line or line.startswith('#'): # Skip empty lines and comments
             continue
 
-        # [cite: 6] Lines start with type, req, or api
-        if line.startswith("type "): # type MyType crate::types::MyType OR type MyList Vec<String> [cite: 8]
+        # [cite: 6] Lines start with type, req, or api (or include another DSL file)
+        if line.startswith("include "): # include <path>, relative to the including file
+            include_path = line.split(maxsplit=1)[1].strip().strip('"\'')
+            tags_opened = len(dsl_file.tags) + (1 if current_tag else 0)
+            dsl_file.includes.append((tags_opened, line_num, include_path))
+
+        elif line.startswith("type "): # type MyType crate::types::MyType OR type MyList Vec<String> [cite: 8]
             parts = line.split(maxsplit=2)
             if len(parts) == 3:
                 _, name, definition = parts
@@ -423,8 +1093,18 @@ def parse_dsl_file_content(content: str) -> DslFile:
                 # The Rust code: `if typedesc.contains("::")` [cite: 201] implies usage. Otherwise alias.
                 is_alias_by_rust_logic = "::" not in definition
 
-                type_def = DslTypeDefinition(name=name, definition=definition, is_alias=is_alias_by_rust_logic)
+                if definition.startswith("struct") and definition[6:7] in ("", " ", "{"): # type User struct { id: u64 }
+                    try:
+                        fields = parse_struct_fields(definition)
+                    except ValueError as e:
+                        print(f"Warning: Malformed struct '{name}' at line {line_num+1} ({e}). Skipping.")
+                        continue
+                    type_def = DslTypeDefinition(name=name, definition=definition, is_alias=False, fields=fields)
+                else:
+                    type_def = DslTypeDefinition(name=name, definition=definition, is_alias=is_alias_by_rust_logic)
+                dsl_file.type_definitions.pop(name, None) # Keep definitions in source order (see `include`)
                 dsl_file.type_definitions[name] = type_def
+                dsl_file.definition_lines[("type", name)] = line_num
             else:
                 print(f"Warning: Malformed type definition at line {line_num+1}: {line}")
 
@@ -457,7 +1137,7 @@ def parse_dsl_file_content(content: str) -> DslFile:
                 out_items_str = []
 
             for item_str in in_items_str:
-                item = parse_requirement_item(item_str, is_outgoing=False)
+                item = parse_requirement_item(item_str, is_outgoing=False, item_pool=item_pool)
                 if isinstance(item, DslParameter):
                     if item.param_type == 'header': cr.header_params.append(item)
                     elif item.param_type == 'query': cr.query_params.append(item)
@@ -466,17 +1146,19 @@ def parse_dsl_file_content(content: str) -> DslFile:
                 else: print(f"Warning: Invalid incoming item '{item_str}' in complex req '{req_name}' (line {line_num+1})")
             
             for item_str in out_items_str:
-                item = parse_requirement_item(item_str, is_outgoing=True)
+                item = parse_requirement_item(item_str, is_outgoing=True, item_pool=item_pool)
                 if isinstance(item, DslParameter):
                     if item.param_type == 'header': cr.response_headers.append(item)
                     elif item.param_type == 'cookie': cr.response_cookies.append(item)
                     else: print(f"Warning: Invalid outgoing item '{item_str}' in complex req '{req_name}' (line {line_num+1})")
                 else: print(f"Warning: Invalid outgoing item '{item_str}' in complex req '{req_name}' (line {line_num+1})")
 
+            dsl_file.complex_requirements.pop(req_name, None)
             dsl_file.complex_requirements[req_name] = cr
+            dsl_file.definition_lines[("req", req_name)] = line_num
 
 
-        elif line.startswith("api tag"): # api tag <tag_name> [req/<req_name>...] [cite: 12, 21]
+        elif line.startswith("api tag"): # api tag <tag_name> [req/<req_name>...] [cache/<ttl> vary/<header>...] [maxbody/<size> inflight/<n>] [compress/<algorithms>] [batch[/<n>]] [cite: 12, 21]
             if current_tag:
                 dsl_file.tags.append(current_tag)
             
@@ -496,43 +1178,259 @@ def parse_dsl_file_content(content: str) -> DslFile:
                 if part.startswith("req/"):
                     tag_req_names.append(part.split('/',1)[1])
             current_tag.complex_req_names = tag_req_names
+            current_tag.cache = parse_cache_items([part for part in parts[3:] if is_cache_item(part)], line)
+            current_tag.limits = parse_limit_items([part for part in parts[3:] if is_limit_item(part)], line)
+            current_tag.compression = parse_compression_items([part for part in parts[3:] if part.startswith("compress/")], line)
+            current_tag.batch_max_requests = parse_batch_items([part for part in parts[3:] if is_batch_item(part)], line)
 
         elif line.startswith("api"): # api[/hidden] [req/<req_name>...] <def...> [cite: 13]
             if current_tag:
-                endpoint = parse_api_endpoint_line(line, dsl_file.type_definitions)
+                endpoint = parse_api_endpoint_line(line, dsl_file.type_definitions, item_pool)
                 if endpoint:
                     current_tag.endpoints.append(endpoint)
             else:
                 print(f"Warning: API endpoint defined outside of a tag at line {line_num+1}: {line}")
         
         else: # [cite: 6] only lines starting with type, req, api are processed.
-            print(f"Info: Skipping line {line_num+1} (doesn't start with type, req, or api): {line}")
+            print(f"Info: Skipping line {line_num+1} (doesn't start with include, type, req, or api): {line}")
 
 
     if current_tag: # Add the last parsed tag
         dsl_file.tags.append(current_tag)
-        
+
+    return dsl_file
+
+
+# --- Multi-file DSL (Normally in a separate dsl_loader.py) ---
+# `include <path>` splits a contract across files. Every file is parsed on its own into a
+# DslFragment, cached on disk by content hash, and all fragments are merged before resolution.
+# The cache holds the fragment's `to_dict()` form as JSON: data only, nothing is executed on load.
+
+def load_dsl_fragment(path: Path, cache_dir: Optional[Path] = None) -> DslFragment:
+    """Parses one DSL file, reusing the cached fragment if its content hash is known.
+    The key also covers this translator's source, so any parser change invalidates it."""
+    content = path.read_bytes()
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.sha256(f"{generator_fingerprint()}:".encode("utf-8") + content).hexdigest()
+        cache_path = cache_dir / f"{key}.json"
+        try:
+            return DslFragment.from_dict(json.loads(cache_path.read_bytes()))
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    fragment = parse_dsl_fragment(content.decode("utf-8"))
+    if cache_path is not None:
+        try:
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(fragment.to_dict(), separators=(",", ":")), encoding="utf-8")
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Warning: Could not cache parsed DSL for '{path}': {e}")
+    return fragment
+
+def merge_dsl_fragment(dsl_file: DslFile, fragment: DslFragment) -> None:
+    """Adds all type definitions and requirements of a fragment, ignoring its includes."""
+    merge_dsl_definitions(dsl_file, list(fragment.type_definitions.values()), list(fragment.complex_requirements.values()))
+
+def merge_dsl_definitions(dsl_file: DslFile, type_definitions: List[DslTypeDefinition],
+                          complex_requirements: List[DslComplexRequirement]) -> None:
+    """Adds type definitions and requirements in source order. Later definitions win."""
+    for type_def in type_definitions:
+        previous = dsl_file.type_definitions.get(type_def.name)
+        if previous is not None and previous.definition != type_def.definition:
+            print(f"Warning: Type '{type_def.name}' is redefined, using '{type_def.definition}'.")
+        dsl_file.type_definitions[type_def.name] = type_def
+    for complex_req in complex_requirements:
+        if complex_req.name in dsl_file.complex_requirements:
+            print(f"Warning: Requirement '{complex_req.name}' is redefined.")
+        dsl_file.complex_requirements[complex_req.name] = complex_req
+
+def merge_dsl_tags(dsl_file: DslFile, tags: List[DslTag]) -> None:
+    """Appends tags; a tag declared again in another file continues the existing one."""
+    existing = {tag.name: tag for tag in dsl_file.tags}
+    for tag in tags:
+        if tag.name in existing:
+            target = existing[tag.name]
+            target.endpoints.extend(tag.endpoints)
+            target.complex_req_names.extend(n for n in tag.complex_req_names if n not in target.complex_req_names)
+            if tag.cache is not None:
+                target.cache = tag.cache
+            if tag.limits is not None:
+                target.limits = tag.limits
+            if tag.compression is not None:
+                target.compression = tag.compression
+            if tag.batch_max_requests is not None:
+                target.batch_max_requests = tag.batch_max_requests
+        else:
+            dsl_file.tags.append(tag)
+            existing[tag.name] = tag
+
+def collect_dsl_files(path: Path, cache_dir: Optional[Path] = None) -> Tuple[DslFile, List[Path]]:
+    """Loads `path` and everything it includes into one unresolved DslFile.
+    Returns the file together with all DSL files that were read."""
+    dsl_file = DslFile()
+    visited: List[Path] = []
+    _merge_included_file(dsl_file, path, cache_dir, visited, [])
+    return dsl_file, visited
+
+def _merge_included_file(dsl_file: DslFile, file_path: Path, cache_dir: Optional[Path],
+                         visited: List[Path], stack: List[Path]) -> None:
+    file_path = file_path.resolve()
+    if file_path in stack:
+        cycle = " -> ".join(str(p) for p in stack + [file_path])
+        print(f"Error: Include cycle detected: {cycle}")
+        return
+    if file_path in visited: # Each file is merged once, even if included from several places
+        return
+    if not file_path.exists():
+        print(f"Error: Included file '{file_path}' not found.")
+        return
+    visited.append(file_path)
+    stack.append(file_path)
+    fragment = load_dsl_fragment(file_path, cache_dir)
+    _merge_fragment_tree(dsl_file, fragment, file_path.parent, cache_dir, visited, stack)
+    stack.pop()
+
+def _merge_fragment_tree(dsl_file: DslFile, fragment: DslFragment, base_dir: Path, cache_dir: Optional[Path],
+                         visited: List[Path], stack: List[Path]) -> None:
+    # Included definitions and tags are placed where the include directive appeared, so a
+    # definition after the directive overrides the included one and vice versa
+    type_defs = list(fragment.type_definitions.values())
+    complex_reqs = list(fragment.complex_requirements.values())
+    tag_cursor = type_cursor = req_cursor = 0
+    for tags_opened, include_line, include_path in fragment.includes:
+        types_defined = type_cursor
+        while types_defined < len(type_defs) and fragment.definition_lines[("type", type_defs[types_defined].name)] < include_line:
+            types_defined += 1
+        reqs_defined = req_cursor
+        while reqs_defined < len(complex_reqs) and fragment.definition_lines[("req", complex_reqs[reqs_defined].name)] < include_line:
+            reqs_defined += 1
+        merge_dsl_definitions(dsl_file, type_defs[type_cursor:types_defined], complex_reqs[req_cursor:reqs_defined])
+        merge_dsl_tags(dsl_file, fragment.tags[tag_cursor:tags_opened])
+        tag_cursor, type_cursor, req_cursor = max(tag_cursor, tags_opened), types_defined, reqs_defined
+        _merge_included_file(dsl_file, base_dir / include_path, cache_dir, visited, stack)
+    merge_dsl_definitions(dsl_file, type_defs[type_cursor:], complex_reqs[req_cursor:])
+    merge_dsl_tags(dsl_file, fragment.tags[tag_cursor:])
+
+def parse_dsl_file(path: Path, cache_dir: Optional[Path] = None) -> DslFile:
+    """Parses a DSL file with its includes and resolves the merged contract."""
+    dsl_file, _ = collect_dsl_files(path, cache_dir)
+    return resolve_dsl_file(dsl_file)
+
+def parse_dsl_file_content(content: str, base_dir: Path = Path(".")) -> DslFile:
+    """Parses DSL text; `include` directives are resolved relative to `base_dir`."""
+    dsl_file = DslFile()
+    _merge_fragment_tree(dsl_file, parse_dsl_fragment(content), base_dir, None, [], [])
+    return resolve_dsl_file(dsl_file)
+
+
+class MergedRequirements(NamedTuple):
+    """Parameters contributed by a combination of complex requirements, de-duplicated by name."""
+    header_params: List[DslParameter]
+    query_params: List[DslParameter]
+    cookie_params: List[DslParameter]
+    response_headers: List[DslParameter]
+    response_cookies: List[DslParameter]
+
+def merge_complex_requirements(req_names: Tuple[str, ...], complex_requirements: Dict[str, DslComplexRequirement]) -> MergedRequirements:
+    """Unites the parameters of `req_names` in order; the first parameter with a name wins.
+    Parameters coming from a `req/hidden` requirement are copied with `is_hidden` set. [cite: 24, 187]"""
+    merged = MergedRequirements([], [], [], [], [])
+    seen_names: Tuple[set, ...] = tuple(set() for _ in merged)
+    for req_name in req_names:
+        complex_req = complex_requirements.get(req_name)
+        if complex_req is None:
+            print(f"Warning: Unknown complex requirement 'req/{req_name}'.")
+            continue
+        sources = (complex_req.header_params, complex_req.query_params, complex_req.cookie_params,
+                   complex_req.response_headers, complex_req.response_cookies)
+        for target, seen, params in zip(merged, seen_names, sources):
+            for param in params:
+                if param.name in seen:
+                    continue
+                seen.add(param.name)
+                if complex_req.is_hidden_openapi and not param.is_hidden:
+                    param = param.copy(is_hidden=True)
+                target.append(param)
+    return merged
+
+def _extend_unique(own: List[DslParameter], extra: List[DslParameter]) -> List[DslParameter]:
+    if not extra:
+        return own # Shared with the endpoint's own list, nothing to add
+    own_names = {p.name for p in own}
+    return own + [p for p in extra if p.name not in own_names]
+
+def unite_endpoint_requirements(endpoint: DslEndpoint, merged: MergedRequirements) -> None:
+    """Fills the `final_*` fields: the endpoint's own definitions win over requirement ones."""
+    endpoint.final_path_params = endpoint.path_params
+    endpoint.final_query_params = _extend_unique(endpoint.query_params, merged.query_params)
+    endpoint.final_header_params = _extend_unique(endpoint.header_params, merged.header_params)
+    endpoint.final_cookie_params = _extend_unique(endpoint.cookie_params, merged.cookie_params)
+    endpoint.final_form_params = endpoint.form_params
+    endpoint.final_request_body = endpoint.request_body
+
+    endpoint.final_response_body = endpoint.response_body
+    endpoint.final_response_headers = _extend_unique(endpoint.response_headers, merged.response_headers)
+    endpoint.final_response_cookies = _extend_unique(endpoint.response_cookies, merged.response_cookies)
+
+
+def resolve_dsl_file(dsl_file: DslFile) -> DslFile:
+    """Global resolution pass over the merged contract."""
     # --- Post-parsing processing: Resolve types and requirements ---
-    # 1. Process Type Definitions
-    pydantic_defs = ["from pydantic import BaseModel", "from typing import List, Dict, Optional, Any", "\n"]
-    type_aliases = ["from typing import List, Dict, Optional, Any", "\n"]
+    resolver = resolve_type_definitions(dsl_file)
+    resolve_param_types(dsl_file, resolver)
+    resolve_requirements(dsl_file)
+    resolve_cache_policies(dsl_file)
+    resolve_request_limits(dsl_file)
+    return dsl_file
+
+def _ends_with_class(code: str) -> bool:
+    return code.rstrip().rsplit("\n", 1)[-1].startswith(" ") # Last line is a class body line
+
+def join_model_code(blocks: List[str], separator: str = "\n") -> str:
+    """Joins models.py code blocks with `separator`, or with two empty lines next to a class."""
+    code = ""
+    for block in blocks:
+        if code:
+            code += "\n\n\n" if block.startswith("class ") or _ends_with_class(code) else separator
+        code += block
+    return code
+
+def resolve_type_definitions(dsl_file: DslFile) -> DslTypeResolver:
+    """1. Process Type Definitions: fills the models.py code parts of `dsl_file`."""
+    # Aliases and structs are emitted after the types they refer to (see order_type_definitions)
+    resolver = DslTypeResolver(dsl_file.type_definitions)
+    pydantic_defs = []
+    type_defs = []
+    type_adapters = []
     custom_imports = set()
 
-    for type_name, type_def in dsl_file.type_definitions.items():
-        model_code = generate_pydantic_model_for_dsl_type(type_def, dsl_file.type_definitions)
-        if type_def.pydantic_model_def:
-            pydantic_defs.append(type_def.pydantic_model_def)
+    for type_name in resolver.definition_order:
+        type_def = dsl_file.type_definitions[type_name]
+        generate_pydantic_model_for_dsl_type(type_def, dsl_file.type_definitions, resolver)
+        if type_def.fields is not None:
+            type_defs.append(type_def.pydantic_model_def.rstrip())
+        elif type_def.pydantic_model_def:
+            pydantic_defs.append(type_def.pydantic_model_def.rstrip())
         elif type_def.py_type_str and type_def.is_alias : # It's a type alias
-             type_aliases.append(type_def.py_type_str)
+             type_defs.append(type_def.py_type_str)
+        if type_def.py_adapter_name:
+            type_adapters.append(f"{type_def.py_adapter_name} = TypeAdapter({type_def.name})")
         if type_def.py_import_stmt:
             custom_imports.add(type_def.py_import_stmt)
-            
-    dsl_file.pydantic_models_code = "\n".join(pydantic_defs)
-    dsl_file.type_aliases_code = "\n".join(type_aliases)
-    dsl_file.custom_imports_code = "\n".join(sorted(list(custom_imports)))
 
+    strict_ints = [strict_int_type_code(t) for t in DSL_INTEGER_WIDTHS if t in resolver.strict_ints_used]
+    dsl_file.pydantic_models_code = join_model_code(pydantic_defs)
+    dsl_file.type_definitions_code = join_model_code(strict_ints + type_defs)
+    # After every definition: a struct may refer to a later struct, which Pydantic resolves on first use
+    dsl_file.type_adapters_code = "\n".join(type_adapters)
+    dsl_file.custom_imports_code = "\n".join(sorted(list(custom_imports)))
+    return resolver
 
-    # 2. Resolve Python types for all parameters and bodies
+def resolve_param_types(dsl_file: DslFile, resolver: DslTypeResolver) -> None:
+    """2. Resolve Python types for all parameters and bodies"""
     all_entities_with_params = []
     for tag in dsl_file.tags:
         all_entities_with_params.extend(tag.endpoints)
@@ -551,7 +1449,7 @@ def parse_dsl_file_content(content: str) -> DslFile:
 
         for param_list in param_lists_to_update:
             for param in param_list:
-                param.py_type = dsl_type_to_python_type_str(param.dsl_type, dsl_file.type_definitions)
+                param.py_type = resolver.to_python(param.dsl_type)
 
         body_attributes_to_update = []
         if hasattr(entity, 'request_body') and entity.request_body: body_attributes_to_update.append('request_body')
@@ -560,59 +1458,91 @@ def parse_dsl_file_content(content: str) -> DslFile:
         for attr_name in body_attributes_to_update:
             body_obj = getattr(entity, attr_name)
             if body_obj and body_obj.dsl_type:
-                body_obj.py_type = dsl_type_to_python_type_str(body_obj.dsl_type, dsl_file.type_definitions)
+                body_obj.py_type = resolver.to_python(body_obj.dsl_type)
+
+def resolve_requirements(dsl_file: DslFile) -> None:
+    """3. Resolve/Unite requirements for each endpoint (like Rust's unite_requirements)
+    Every distinct combination of requirement names is merged once and shared."""
+    merged_cache: Dict[Tuple[str, ...], MergedRequirements] = {}
+    for tag in dsl_file.tags:
+        for endpoint in tag.endpoints:
+            # Endpoint requirements first, then the tag's, without repeats
+            req_names = tuple(dict.fromkeys(endpoint.complex_req_names + tag.complex_req_names))
+            merged = merged_cache.get(req_names)
+            if merged is None:
+                merged = merge_complex_requirements(req_names, dsl_file.complex_requirements)
+                merged_cache[req_names] = merged
+            unite_endpoint_requirements(endpoint, merged)
 
 
-    # 3. Resolve/Unite requirements for each endpoint (like Rust's unite_requirements)
+def resolve_cache_policy(endpoint: DslEndpoint, tag: DslTag) -> Optional[DslCachePolicy]:
+    """The endpoint's cache/ overrides the tag's TTL and size; vary/ headers of both apply."""
+    if endpoint.http_method != "get":
+        if endpoint.cache is not None:
+            print(f"Warning: cache/ and vary/ only apply to GET endpoints, ignored for: {endpoint.raw_definition}")
+        return None
+    if endpoint.final_response_body and endpoint.final_response_body.body_type in ("ndjson", "file"):
+        if endpoint.cache is not None:
+            print(f"Warning: cache/ and vary/ do not apply to streamed b/ndjson and b/file responses, ignored for: {endpoint.raw_definition}")
+        return None
+    policies = [policy for policy in (endpoint.cache, tag.cache) if policy is not None]
+    if not policies:
+        return None
+    ttl = next((policy.ttl_seconds for policy in policies if policy.ttl_seconds is not None), None)
+    if ttl is None:
+        print(f"Warning: vary/ without cache/<ttl> is ignored for: {endpoint.raw_definition}")
+        return None
+    max_entries = next((policy.max_entries for policy in policies if policy.max_entries is not None), DEFAULT_CACHE_ENTRIES)
+    vary_headers = list(dict.fromkeys(header for policy in reversed(policies) for header in policy.vary_headers))
+    declared = {param.name.lower() for param in endpoint.final_header_params}
+    for header in vary_headers:
+        if header.lower() not in declared:
+            print(f"Warning: vary/{header} is not an incoming h/ item of '{endpoint.http_method}/{endpoint.path_template.lstrip('/')}' or its requirements.")
+    return DslCachePolicy(ttl, max_entries, vary_headers)
+
+def resolve_cache_policies(dsl_file: DslFile) -> None:
+    """4. Resolve the response cache policy of each GET endpoint (needs the united headers)"""
     for tag in dsl_file.tags:
         for endpoint in tag.endpoints:
-            # Start with direct endpoint definitions
-            endpoint.final_path_params.extend(endpoint.path_params)
-            endpoint.final_query_params.extend(endpoint.query_params)
-            endpoint.final_header_params.extend(endpoint.header_params)
-            endpoint.final_cookie_params.extend(endpoint.cookie_params)
-            endpoint.final_form_params.extend(endpoint.form_params)
-            endpoint.final_request_body = endpoint.request_body
-            
-            endpoint.final_response_body = endpoint.response_body
-            endpoint.final_response_headers.extend(endpoint.response_headers)
-            endpoint.final_response_cookies.extend(endpoint.response_cookies)
-
-            # Collect all complex requirement names (endpoint + tag level)
-            all_req_names_for_endpoint = set(endpoint.complex_req_names)
-            all_req_names_for_endpoint.update(tag.complex_req_names)
-
-            for req_name in all_req_names_for_endpoint:
-                if req_name in dsl_file.complex_requirements:
-                    complex_req = dsl_file.complex_requirements[req_name]
-                    
-                    # Add incoming from complex_req (headers, queries, cookies)
-                    # Ensure no duplicates by name and type (simplification: just extend for now)
-                    endpoint.final_header_params.extend(h for h in complex_req.header_params if not any(e_h.name == h.name for e_h in endpoint.final_header_params))
-                    endpoint.final_query_params.extend(q for q in complex_req.query_params if not any(e_q.name == q.name for e_q in endpoint.final_query_params))
-                    endpoint.final_cookie_params.extend(c for c in complex_req.cookie_params if not any(e_c.name == c.name for e_c in endpoint.final_cookie_params))
-                    
-                    # Add outgoing from complex_req (headers, cookies)
-                    endpoint.final_response_headers.extend(h for h in complex_req.response_headers if not any(e_h.name == h.name for e_h in endpoint.final_response_headers))
-                    endpoint.final_response_cookies.extend(c for c in complex_req.response_cookies if not any(e_c.name == c.name for e_c in endpoint.final_response_cookies))
-                    
-                    # Mark params from hidden complex reqs as hidden for OpenAPI if the req itself is hidden [cite: 24, 187]
-                    if complex_req.is_hidden_openapi:
-                        for param_list_name in ['final_header_params', 'final_query_params', 'final_cookie_params', 'final_response_headers', 'final_response_cookies']:
-                            param_list_attr = getattr(endpoint, param_list_name)
-                            for param_in_list in param_list_attr:
-                                # Check if this param originated from *this* hidden complex_req
-                                # This check is tricky. For now, if any complex req is hidden, its params could be considered hidden.
-                                # Rust logic: `header.hidden = true` if from complex req. [cite: 187]
-                                # We will set `param.is_hidden = complex_req.is_hidden_openapi` when copying.
-                                # (This logic needs refinement to trace param origin for accurate hiding)
-                                pass # This needs better tracking or a simpler rule.
+            endpoint.final_cache = resolve_cache_policy(endpoint, tag)
 
-    return dsl_file
+
+def accepts_request_body(endpoint: DslEndpoint) -> bool:
+    return endpoint.final_request_body is not None or bool(endpoint.final_form_params)
+
+def resolve_endpoint_limits(endpoint: DslEndpoint, tag: DslTag) -> Optional[DslRequestLimits]:
+    """The endpoint's maxbody/ overrides the tag's; its inflight/ is its own bound, checked
+    together with the one the tag's endpoints share."""
+    own = endpoint.limits or DslRequestLimits()
+    max_body_bytes = own.max_body_bytes
+    if max_body_bytes is None and tag.limits is not None:
+        max_body_bytes = tag.limits.max_body_bytes
+    if max_body_bytes is not None and not accepts_request_body(endpoint):
+        if own.max_body_bytes is not None:
+            print(f"Warning: maxbody/ needs a request body or form keys, ignored for: {endpoint.raw_definition}")
+        max_body_bytes = None
+    if max_body_bytes is None and own.max_in_flight is None:
+        return None
+    return DslRequestLimits(max_body_bytes, own.max_in_flight, own.retry_after_seconds)
+
+def resolve_request_limits(dsl_file: DslFile) -> None:
+    """5. Resolve the body size and in-flight limits of each endpoint (needs the united body and form)"""
+    for tag in dsl_file.tags:
+        for endpoint in tag.endpoints:
+            endpoint.final_limits = resolve_endpoint_limits(endpoint, tag)
 
 
 # --- Code Generation (Normally in a separate codegen.py) ---
 
+class CodegenOptions(NamedTuple):
+    """Generator switches that change the emitted code (part of every tag fingerprint)."""
+    fast_json: bool = False # TypeAdapter bodies/responses and FastJSONResponse as default response class
+    stream_files: bool = False # b/file as raw body chunk iterator (in) and ranged chunked response (out)
+    file_chunk_size: int = 64 * 1024
+    metrics: bool = False # Per-route counters and latency histograms, served on /metrics
+    lazy_routers: bool = False # Tag modules imported on the first request under their prefix
+
+
 def generate_fastapi_param_string(param: DslParameter, for_openapi_spec: bool = False) -> str:
     """Generates a FastAPI function parameter string e.g., 'user_id: int = Query(...)' """
     py_type = param.py_type or "Any"
@@ -646,7 +1576,129 @@ def generate_fastapi_param_string(param: DslParameter, for_openapi_spec: bool =
         return f"{param_name_py}: {py_type} = Form({default_val_str}, {desc}{include_in_schema_str})"
     return f"{param_name_py}: {py_type}" # Fallback
 
-def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_name:str) -> str:
+def requirement_class_name(req_name: str) -> str:
+    """`req api-tokens` -> ApiTokensRequirement"""
+    words = [word for word in re.split(r"[\W_]+", req_name) if word]
+    return "".join(word[0].upper() + word[1:] for word in words) + "Requirement"
+
+def requirement_param_name(req_name: str) -> str:
+    return re.sub(r"\W", "_", req_name) + "_req"
+
+def describe_requirement_items(complex_req: DslComplexRequirement) -> str:
+    groups = [("headers", complex_req.header_params), ("query", complex_req.query_params),
+              ("cookies", complex_req.cookie_params), ("sets headers", complex_req.response_headers),
+              ("sets cookies", complex_req.response_cookies)]
+    return "; ".join(f"{label} {', '.join(p.name for p in params)}" for label, params in groups if params)
+
+def generate_requirement_class_code(complex_req: DslComplexRequirement) -> str:
+    """One dependency class per `req` block: the incoming items are the parameters of its
+    `__init__`, the outgoing ones the keyword arguments of its `set_outgoing` hook."""
+    incoming = complex_req.header_params + complex_req.query_params + complex_req.cookie_params
+    if complex_req.is_hidden_openapi: # [cite: 24]
+        incoming = [p if p.is_hidden else p.copy(is_hidden=True) for p in incoming]
+    req_line = f"req{'/hidden' if complex_req.is_hidden_openapi else ''} {complex_req.name}"
+    items = describe_requirement_items(complex_req)
+    lines = [
+        f"class {requirement_class_name(complex_req.name)}(Requirement):",
+        f'    """`{req_line}`{": " + items if items else ""}"""',
+        "",
+        f"    def __init__({', '.join(['self', 'request: Request'] + [generate_fastapi_param_string(p) for p in incoming])}):",
+        "        super().__init__(request)",
+    ]
+    for param in incoming:
+        param_name_py = param.name.replace('-', '_')
+        lines.append(f"        self.{param_name_py} = {param_name_py}")
+
+    outgoing = complex_req.response_headers + complex_req.response_cookies
+    if outgoing:
+        keyword_params = [f"{p.name.replace('-', '_')}: Optional[{p.py_type or 'Any'}] = None" for p in outgoing]
+        lines.append("")
+        lines.append(f"    def set_outgoing(self, *, {', '.join(keyword_params)}) -> None:")
+        lines.append('        """Adds the given outgoing items to the response of the endpoint."""')
+        for param in complex_req.response_headers:
+            lines.append(f"        if {param.name.replace('-', '_')} is not None:")
+            lines.append(f'            self.set_response_header("{param.name}", {param.name.replace("-", "_")})')
+        for param in complex_req.response_cookies:
+            lines.append(f"        if {param.name.replace('-', '_')} is not None:")
+            lines.append(f'            self.set_response_cookie("{param.name}", {param.name.replace("-", "_")})')
+    return "\n".join(lines) + "\n"
+
+def generate_requirements_module_code(dsl_file: DslFile) -> str:
+    """Generates requirements.py: the dependency classes shared by all tag modules."""
+    code_lines = [
+        "from fastapi import Query, Header, Cookie, Request",
+        TYPING_IMPORTS,
+        "from .models import * # Generated types/models of this version",
+        "from .runtime import Requirement",
+        "\n",
+    ]
+    for complex_req in dsl_file.complex_requirements.values():
+        code_lines.append(generate_requirement_class_code(complex_req))
+        code_lines.append("")
+    return "\n".join(code_lines)
+
+def names_tuple(names: List[str]) -> str:
+    """Python tuple literal of strings, e.g. ("a", "b") or ("a",)."""
+    return "(" + ", ".join('"' + name + '"' for name in names) + ("," if len(names) == 1 else "") + ")"
+
+def compresses_response(endpoint: DslEndpoint, compression: Optional[DslCompressionPolicy]) -> bool:
+    """Whether the tag's compression applies: complete bodies only, never b/file or streams."""
+    body = endpoint.final_response_body
+    return compression is not None and body is not None and body.body_type in ("json", "msgpack", "plain", "html")
+
+def generate_response_compression_code(compression: DslCompressionPolicy) -> str:
+    args = [names_tuple(compression.algorithms), f"min_size={compression.min_size}"]
+    if compression.level is not None:
+        args.append(f"level={compression.level}")
+    return f"ResponseCompression({', '.join(args)})"
+
+def generate_response_cache_code(endpoint: DslEndpoint, compressed: bool = False) -> str:
+    """ResponseCache constructor of a cached GET endpoint (see resolve_cache_policy)."""
+    policy = endpoint.final_cache
+    vary_headers = list(policy.vary_headers)
+    if endpoint.final_response_body and endpoint.final_response_body.body_type == "msgpack":
+        vary_headers.append("Accept") # The response format is negotiated
+    if compressed:
+        vary_headers.append("Accept-Encoding") # Stored as sent, compressed or not
+    args = [f"ttl={policy.ttl_seconds!r}", f"max_entries={policy.max_entries}"]
+    if endpoint.final_query_params:
+        args.append(f"query={names_tuple([p.name for p in endpoint.final_query_params])}")
+    if vary_headers:
+        args.append(f"vary={names_tuple(vary_headers)}")
+    if any(p.name.lower() == "cache-control" for p in endpoint.final_response_headers):
+        args.append("cache_control=True")
+    return f"ResponseCache({', '.join(args)})"
+
+def in_flight_limit_code(limits: DslRequestLimits) -> str:
+    if limits.retry_after_seconds is None:
+        return f"InFlightLimit({limits.max_in_flight})"
+    return f"InFlightLimit({limits.max_in_flight}, retry_after={limits.retry_after_seconds})"
+
+def generate_request_limits_code(endpoint: DslEndpoint, tag_limits: Optional[DslRequestLimits]) -> str:
+    """RequestLimits constructor of an endpoint (see resolve_endpoint_limits), or "" without limits.
+    TAG_IN_FLIGHT is the tag's shared InFlightLimit (see generate_tag_module_code)."""
+    limits = endpoint.final_limits
+    in_flight = [in_flight_limit_code(limits)] if limits is not None and limits.max_in_flight else []
+    if tag_limits is not None and tag_limits.max_in_flight:
+        in_flight.append("TAG_IN_FLIGHT")
+    args = []
+    if limits is not None and limits.max_body_bytes is not None:
+        args.append(f"max_body={limits.max_body_bytes}")
+    if in_flight:
+        args.append(f"in_flight=({', '.join(in_flight)}{',' if len(in_flight) == 1 else ''})")
+    return f"RequestLimits({', '.join(args)})" if args else ""
+
+def type_adapter_code(py_type: str, dsl_file: DslFile) -> str:
+    """A TypeAdapter for `py_type`: the one of models.py for container aliases, or a new one."""
+    type_def = dsl_file.type_definitions.get(py_type)
+    if type_def is not None and type_def.py_adapter_name:
+        return type_def.py_adapter_name
+    return f"TypeAdapter({py_type})"
+
+def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_name:str,
+                                options: CodegenOptions = CodegenOptions(),
+                                tag_limits: Optional[DslRequestLimits] = None,
+                                tag_compression: Optional[DslCompressionPolicy] = None) -> str:
     lines = []
     
     # Function signature
@@ -655,6 +1707,10 @@ def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_na
     # Path parameters first
     for p_param in endpoint.final_path_params:
         func_params.append(f"{p_param.name.replace('-', '_')}: {p_param.py_type or 'Any'}")
+    streams_response_file = options.stream_files and endpoint.final_response_body is not None \
+        and endpoint.final_response_body.body_type == "file"
+    if streams_response_file:
+        func_params.append("request: Request") # Read for its Range header
 
     # Request Body (if any)
     # b/json/<type> -> body: PyType [cite: 8]
@@ -662,16 +1718,25 @@ def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_na
     if endpoint.final_request_body:
         body = endpoint.final_request_body
         body_py_type = body.py_type or "Any"
-        if body.body_type == 'json' or body.body_type == 'msgpack':
-             func_params.append(f"payload: {body_py_type}") # FastAPI handles parsing from request
+        if body.body_type == 'json' and options.fast_json and body.py_type:
+             func_params.append(f"payload: Annotated[{body_py_type}, PREVALIDATED, Body()]") # Validated once, by the body adapter
+        elif body.body_type == 'json' or body.body_type == 'msgpack':
+             func_params.append(f"payload: {body_py_type} = Body(...)") # FastAPI handles parsing from request
+        elif body.body_type == 'file' and body.file_form_key and options.stream_files:
+             func_params.append(f"{body.file_form_key.replace('-','_')}: FileStream = Depends(file_stream)") # Raw body chunks
         elif body.body_type == 'file' and body.file_form_key:
              func_params.append(f"{body.file_form_key.replace('-','_')}: UploadFile = File(...)")
 
-    # Query, Header, Cookie, Form parameters
-    for q_param in endpoint.final_query_params: func_params.append(generate_fastapi_param_string(q_param))
-    for h_param in endpoint.final_header_params: func_params.append(generate_fastapi_param_string(h_param))
-    for c_param in endpoint.final_cookie_params: func_params.append(generate_fastapi_param_string(c_param))
+    # Query, Header, Cookie, Form parameters. Requirement ones are read by the requirement
+    # dependency classes instead (see generate_requirement_class_code)
+    for q_param in endpoint.query_params: func_params.append(generate_fastapi_param_string(q_param))
+    for h_param in endpoint.header_params: func_params.append(generate_fastapi_param_string(h_param))
+    for c_param in endpoint.cookie_params: func_params.append(generate_fastapi_param_string(c_param))
     for f_param in endpoint.final_form_params: func_params.append(generate_fastapi_param_string(f_param))
+    # Endpoint requirements; the tag's ones are router dependencies (see generate_tag_module_code)
+    for req_name in endpoint.complex_req_names:
+        if req_name in dsl_file.complex_requirements:
+            func_params.append(f"{requirement_param_name(req_name)}: {requirement_class_name(req_name)} = Depends()")
 
     # Response model
     # -> b/json/Vec<ChatData> [cite: 14] means response_model=List[ChatData]
@@ -691,11 +1756,54 @@ def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_na
     decorator_params = [f'"{endpoint.path_template}"']
     if response_model_str != "None" and endpoint.final_response_body.body_type not in ['file', 'plain', 'html', 'ok']:
          decorator_params.append(f"response_model={response_model_str}")
+    if endpoint.final_response_body and endpoint.final_response_body.body_type == "msgpack":
+        decorator_params.append("response_class=MsgPackResponse") # Negotiated with the Accept header
+    if endpoint.final_response_body and endpoint.final_response_body.body_type == "ndjson":
+        decorator_params.append("response_class=NDJSONResponse")
     decorator_params.append(f'tags=["{openapi_tag_name}"]')
     if endpoint.is_hidden_openapi: # [cite: 19]
         decorator_params.append("include_in_schema=False")
+    if options.stream_files and endpoint.final_request_body and endpoint.final_request_body.body_type == "file":
+        decorator_params.append("openapi_extra=STREAMED_BODY_OPENAPI")
     
+    route_option_args = []
+    if endpoint.final_request_body and endpoint.final_request_body.body_type == "msgpack":
+        route_option_args.append("msgpack_body=True") # Also accepts a JSON body, by Content-Type
+    if options.fast_json:
+        # TypeAdapters are built once at import: bodies are validated from the raw bytes and
+        # responses dumped to bytes, both in one pydantic-core call
+        adapter_prefix = endpoint.func_name.upper()
+        request_body, response_body = endpoint.final_request_body, endpoint.final_response_body
+        if request_body and request_body.body_type == "json" and request_body.py_type:
+            lines.append(f"{adapter_prefix}_BODY = {type_adapter_code(request_body.py_type, dsl_file)}")
+            route_option_args.append(f"body_adapter={adapter_prefix}_BODY")
+        if response_body and response_body.body_type == "json" and response_body.py_type:
+            if f"{adapter_prefix}_BODY = {type_adapter_code(response_body.py_type, dsl_file)}" in lines:
+                lines.append(f"{adapter_prefix}_RESPONSE = {adapter_prefix}_BODY")
+            else:
+                lines.append(f"{adapter_prefix}_RESPONSE = {type_adapter_code(response_body.py_type, dsl_file)}")
+            route_option_args.append(f"response_adapter={adapter_prefix}_RESPONSE")
+    if endpoint.final_response_body and endpoint.final_response_body.body_type == "ndjson":
+        # Items are validated and dumped one by one, as the handler produces them
+        item_adapter = type_adapter_code(endpoint.final_response_body.py_type or 'Any', dsl_file)
+        lines.append(f"{endpoint.func_name.upper()}_ITEM = {item_adapter}")
+        route_option_args.append(f"ndjson_item={endpoint.func_name.upper()}_ITEM")
+    compressed = compresses_response(endpoint, tag_compression)
+    if endpoint.final_cache is not None:
+        lines.append(f"{endpoint.func_name.upper()}_CACHE = {generate_response_cache_code(endpoint, compressed)}")
+        route_option_args.append(f"cache={endpoint.func_name.upper()}_CACHE")
+    limits_code = generate_request_limits_code(endpoint, tag_limits)
+    if limits_code:
+        lines.append(f"{endpoint.func_name.upper()}_LIMITS = {limits_code}")
+        route_option_args.append(f"limits={endpoint.func_name.upper()}_LIMITS")
+    if compressed:
+        route_option_args.append("compression=TAG_COMPRESSION")
+    if lines:
+        lines.append("")
+
     lines.append(f"@router.{endpoint.http_method}({', '.join(decorator_params)})")
+    if route_option_args:
+        lines.append(f"@route_options({', '.join(route_option_args)})")
     lines.append(f"async def {endpoint.func_name}({', '.join(func_params)}):")
     
     # Function body (placeholder like todo!(); [cite: 16, 17])
@@ -717,12 +1825,19 @@ def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_na
         elif rb.body_type == "html":
             lines.append(f"    # TODO: return HTMLResponse(content=...)")
             lines.append("    pass")
+        elif rb.body_type == "file" and streams_response_file:
+            lines.append("    # TODO: Point this at the file to send; Range requests are answered with 206")
+            lines.append("    return stream_file(\"path/to/your/file\", request, chunk_size=FILE_CHUNK_SIZE)")
         elif rb.body_type == "file": # This implies returning a file path
             lines.append(f"    # TODO: return FileResponse(path='path/to/your/file')")
             lines.append("    pass")
         elif rb.body_type in ["json", "msgpack"]:
              lines.append(f"    # TODO: Implement logic and return data for {rb.py_type or 'response'}")
              lines.append("    pass")
+        elif rb.body_type == "ndjson":
+            lines.append(f"    items: List[{rb.py_type or 'Any'}] = [] # TODO: Yield items from an async source (or return an iterable)")
+            lines.append("    for item in items:")
+            lines.append("        yield item # Sent as one JSON line right away")
         else:
             lines.append("    pass # TODO: Implement endpoint logic")
     else: # Should not happen based on parser [cite: 53]
@@ -731,170 +1846,2535 @@ def generate_endpoint_func_code(endpoint: DslEndpoint, dsl_file: DslFile, tag_na
     return "\n".join(lines) + "\n"
 
 
-def generate_tag_module_code(tag: DslTag, dsl_file: DslFile) -> str:
-    # Initial imports
-    code_lines = [
-        "from fastapi import APIRouter, Query, Header, Cookie, File, Form, UploadFile, Depends, HTTPException, status, Response",
-        "from fastapi.responses import PlainTextResponse, HTMLResponse, FileResponse",
-        "from typing import List, Dict, Optional, Any",
-        f"from ..models import * # Assuming generated types/models are in ..models.py or similar",
-        "\nrouter = APIRouter()\n"
-    ]
+# Support module written into every version folder as runtime.py. Tag routers use its route
+# class; per-endpoint behaviour is switched on with `@route_options(...)` below the route decorator.
+RUNTIME_MODULE_CODE = '''"""Runtime support for the generated routers of this API version (generated by skdsl-py)."""
+import base64
+import functools
+import gzip
+import importlib
+import inspect
+import json
+import mimetypes
+import re
+import time
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, unquote
 
-    for endpoint in tag.endpoints:
-        code_lines.append(generate_endpoint_func_code(endpoint, dsl_file, tag.name))
-        code_lines.append("\n")
-    
-    return "\n".join(code_lines)
+import anyio
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import core_schema, to_json
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
+try:
+    import msgpack
+except ImportError: # Only needed by b/msgpack endpoints
+    msgpack = None
 
-def generate_main_app_code(dsl_file: DslFile, version: str) -> str:
-    """Generates a main.py for the specific API version."""
-    lines = [
-        "from fastapi import FastAPI",
-        "\napp = FastAPI(title=\"Generated API\", version=f\"{version}\")\n"
-    ]
-    for tag in dsl_file.tags:
-        module_name = tag.py_module_name.replace(".py", "")
-        lines.append(f"from .{module_name} import router as {module_name}_router")
-        lines.append(f"app.include_router({module_name}_router, prefix='/api/{version}/{tag.name}')\n") # Example prefix
-    
-    lines.append("\n# To run: uvicorn main:app --reload (if this file is main.py in the version folder)")
-    return "\n".join(lines)
+try:
+    import brotli
+except ImportError: # Only needed by compress/br tags
+    brotli = None
 
-def generate_models_file_code(dsl_file: DslFile) -> str:
-    """Generates the content for the models.py file."""
-    
-    # Ensure BaseModel is imported if any Pydantic models are defined
-    base_imports_needed = False
-    if dsl_file.pydantic_models_code and "BaseModel" in dsl_file.pydantic_models_code :
-        base_imports_needed = True
-    
-    header = []
-    if base_imports_needed or dsl_file.type_aliases_code: # Basic typing imports
-        header.append("from typing import List, Dict, Optional, Any")
-    if base_imports_needed:
-        header.append("from pydantic import BaseModel")
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"})
 
-    # Add custom imports from type definitions
-    if dsl_file.custom_imports_code:
-        header.append(dsl_file.custom_imports_code)
-    
-    full_code = "\n".join(header) + "\n\n"
-    
-    if dsl_file.type_aliases_code.strip():
-        # Remove the default "from typing import..." if already added
-        aliases_code_cleaned = dsl_file.type_aliases_code.replace("from typing import List, Dict, Optional, Any\n\n","")
-        full_code += aliases_code_cleaned.strip() + "\n\n"
-        
-    if dsl_file.pydantic_models_code.strip():
-        # Remove the default imports if already added
-        pydantic_code_cleaned = dsl_file.pydantic_models_code.replace("from pydantic import BaseModel\n","").replace("from typing import List, Dict, Optional, Any\n\n","")
-        full_code += pydantic_code_cleaned.strip() + "\n\n"
-        
-    return full_code.strip()
+# Response format negotiated for the request being handled, read by MsgPackResponse
+_respond_with_msgpack: ContextVar[bool] = ContextVar("skdsl_respond_with_msgpack", default=True)
 
 
-# --- Main Script Logic ---
-def main():
-    # CLI arguments
-    parser = argparse.ArgumentParser(description="DSL to FastAPI Translator")
-    parser.add_argument("-i", "--input", required=True, help="Input DSL file")
-    parser.add_argument("-o", "--output", required=True, help="Output folder for generated code")
-    parser.add_argument("-v", "--version", help="API version (e.g., v1). Auto-increments if not set.")
-    parser.add_argument("-r", "--regenerate", action="store_true", help="Don't bump version, rewrite all files.")
-    args = parser.parse_args()
+def route_options(**options: Any) -> Callable:
+    """Per-endpoint options for SkdslRoute. Must be applied below the router decorator."""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__skdsl_options__ = {**getattr(endpoint, "__skdsl_options__", {}), **options}
+        return endpoint
+    return decorate
 
-    input_file = Path(args.input)
-    output_dir = Path(args.output)
-    
-    if not input_file.exists():
-        print(f"Error: Input file '{input_file}' not found.")
-        return
 
-    dsl_content = input_file.read_text()
-    parsed_dsl = parse_dsl_file_content(dsl_content) # [cite: 31]
-
-    # Version decision logic (simplified from Rust)
-    # For Python, we'll use provided version or default to "v1" and manage via folder.
-    # A full breaking change detection is complex.
-    api_version_str = args.version
-    if not api_version_str:
-        # Simplified versioning: find highest existing v_num and increment if not regenerating
-        # Or, if regenerate is true and version exists, use that. Otherwise, find next.
-        # For this example, let's default or use provided.
-        api_version_str = "v1" 
-        # A more robust version would be: `crate::entities::versions::decide_version` [cite: 32]
-        # This involves reading .api.json from previous versions [cite: 35, 260]
-        # and comparing with `parsed_dsl.no_breaking_changes(new_version)` logic
-        
-        # Basic auto-increment if not regenerating
-        if not args.regenerate:
-            current_max_v = 0
-            for item in output_dir.iterdir():
-                if item.is_dir() and item.name.startswith("v"):
-                    try:
-                        current_max_v = max(current_max_v, int(item.name[1:]))
-                    except ValueError:
-                        pass
-            api_version_str = f"v{current_max_v + 1}"
-        else: # Regenerating, find highest existing or default v1
-             current_max_v = 0
-             found = False
-             for item in output_dir.iterdir():
-                if item.is_dir() and item.name.startswith("v"):
-                    found = True
-                    try:
-                        current_max_v = max(current_max_v, int(item.name[1:]))
-                    except ValueError:
-                        pass
-             api_version_str = f"v{current_max_v}" if found and current_max_v > 0 else "v1"
+def media_type_of(header_value: Optional[str]) -> str:
+    return (header_value or "").split(";", 1)[0].strip().lower()
 
 
-    version_output_dir = output_dir / api_version_str
+def weighted_values(header_value: str) -> List[Tuple[str, float]]:
+    """(value, q) pairs of an Accept-style header, values lowercased."""
+    weighted = []
+    for item in header_value.split(","):
+        value, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, param_value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(param_value)
+                except ValueError:
+                    q = 0.0
+        weighted.append((value.strip().lower(), q))
+    return weighted
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """MessagePack unless the Accept header prefers JSON (or only lists other types)."""
+    if not accept:
+        return True
+    msgpack_q = json_q = wildcard_q = 0.0
+    for media_type, q in weighted_values(accept):
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == "application/json" or media_type.endswith("+json"):
+            json_q = max(json_q, q)
+        elif media_type in ("*/*", "application/*"):
+            wildcard_q = max(wildcard_q, q)
+    if msgpack_q > 0 and msgpack_q >= json_q:
+        return True
+    return json_q == 0 and wildcard_q > 0
+
+
+class MsgPackRequest(Request):
+    """Presents a MessagePack body to FastAPI as an already decoded JSON body."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+
+def as_msgpack_request(request: Request) -> MsgPackRequest:
+    # FastAPI only hands JSON content types to request.json(), so the decoded request says it is one
+    headers = [(key, value) for key, value in request.scope["headers"] if key != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return MsgPackRequest({**request.scope, "headers": headers}, request.receive, request._send)
+
+
+class ValidatedBody:
+    """A request body already validated by the endpoint's TypeAdapter (see ValidatedJSONRequest)."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class PreValidated:
+    """`Annotated` marker of a --fast-json body parameter. A ValidatedBody is passed through as
+    its value, so FastAPI does not validate the body again; anything else (e.g. a body with a
+    non-JSON content type) is validated by the field as usual. The OpenAPI schema is unchanged.
+    FastAPI keeps the marker only with `Body()` inside the same `Annotated`, not as the default."""
+
+    @staticmethod
+    def __get_pydantic_core_schema__(source: Any, handler: Callable) -> Any:
+        return core_schema.no_info_wrap_validator_function(_unwrap_validated_body, handler(source))
+
+
+PREVALIDATED = PreValidated()
+
+
+def _unwrap_validated_body(value: Any, validate: Callable) -> Any:
+    return value.value if type(value) is ValidatedBody else validate(value)
+
+
+def takes_validated_body(endpoint: Callable) -> bool:
+    return any(isinstance(metadata, PreValidated)
+               for parameter in inspect.signature(endpoint).parameters.values()
+               for metadata in getattr(parameter.annotation, "__metadata__", ()))
+
+
+class BodyValidationError(HTTPException):
+    """422 of a body that failed the endpoint's TypeAdapter, in the format of FastAPI's request
+    validation errors. An HTTPException, since FastAPI turns other errors of request.json() into 400."""
+
+    def __init__(self, error: ValidationError):
+        detail = [{**item, "loc": ["body", *item["loc"]]} for item in json.loads(error.json(include_url=False))]
+        super().__init__(status_code=422, detail=detail)
+
+
+class ValidatedJSONRequest(Request):
+    """Parses and validates a JSON body in one step, straight from the raw bytes, with the
+    endpoint's TypeAdapter. The body parameter (marked PREVALIDATED) receives the result as is."""
+    body_adapter: TypeAdapter
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = ValidatedBody(self.body_adapter.validate_json(await self.body()))
+            except ValidationError as e:
+                raise BodyValidationError(e) from None
+        return self._json
+
+
+def as_validated_json_request(request: Request, body_adapter: TypeAdapter) -> ValidatedJSONRequest:
+    validated = ValidatedJSONRequest(request.scope, request.receive, request._send)
+    validated.body_adapter = body_adapter
+    return validated
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core in one call, models included."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def dump_json_with(endpoint: Callable, response_adapter: TypeAdapter) -> Callable:
+    """Wraps an endpoint so that its result is validated and dumped to JSON bytes by
+    `response_adapter`, instead of going through FastAPI's response serialization."""
+    def respond(result: Any) -> Response:
+        if isinstance(result, Response):
+            return result
+        return Response(response_adapter.dump_json(response_adapter.validate_python(result), by_alias=True),
+                        media_type="application/json")
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    return endpoint_wrapper
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class NDJSONResponse(StreamingResponse):
+    """Newline-delimited JSON, one item per line, sent as it is produced (b/ndjson endpoints)."""
+    media_type = NDJSON_MEDIA_TYPE
+
+
+async def ndjson_lines(items: Any, item_adapter: TypeAdapter) -> AsyncIterator[bytes]:
+    if not hasattr(items, "__aiter__"):
+        items = iterate_in_threadpool(iter(items)) # Sync sources may block
+    async for item in items:
+        yield item_adapter.dump_json(item_adapter.validate_python(item), by_alias=True) + b"\\n"
+
+
+def stream_ndjson_with(endpoint: Callable, item_adapter: TypeAdapter) -> Callable:
+    """Wraps an endpoint that yields items (or returns an iterable of them) so that they are
+    streamed as JSON lines, each validated and dumped by `item_adapter` when it is produced."""
+    def respond(result: Any) -> Response:
+        if isinstance(result, Response):
+            return result
+        return NDJSONResponse(ndjson_lines(result, item_adapter))
+
+    if inspect.isasyncgenfunction(endpoint) or inspect.isgeneratorfunction(endpoint):
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    elif inspect.iscoroutinefunction(endpoint):
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(await endpoint(*args, **kwargs))
+    else:
+        def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    functools.update_wrapper(endpoint_wrapper, endpoint)
+    # FastAPI unwraps endpoints to find generators, which it would stream by itself
+    del endpoint_wrapper.__wrapped__
+    endpoint_wrapper.__signature__ = inspect.signature(endpoint)
+    return endpoint_wrapper
+
+
+class MsgPackResponse(Response):
+    """Encodes the response as MessagePack, or as JSON if the request's Accept header prefers it."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        self.as_msgpack = _respond_with_msgpack.get()
+        if not self.as_msgpack:
+            self.media_type = "application/json"
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        if self.as_msgpack:
+            return msgpack.packb(content, use_bin_type=True)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# OpenAPI description of a streamed b/file upload: the file is the raw request body
+STREAMED_BODY_OPENAPI = {"requestBody": {"required": True, "content": {
+    "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}}}
+
+
+class FileStream:
+    """A streamed b/file upload: the raw request body as an async iterator of chunks, as they
+    arrive. Nothing is spooled to memory or disk, so it can be iterated only once."""
+
+    def __init__(self, request: Request):
+        self._request = request
+        self.media_type = media_type_of(request.headers.get("content-type")) or "application/octet-stream"
+        length = request.headers.get("content-length", "")
+        self.size: Optional[int] = int(length) if length.isdigit() else None
+        match = re.search(r'filename="?([^";]+)"?', request.headers.get("content-disposition", ""))
+        self.filename: Optional[str] = match.group(1) if match else None
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        async for chunk in self._request.stream():
+            if chunk:
+                yield chunk
+
+
+async def file_stream(request: Request) -> FileStream:
+    """Dependency for streamed b/file uploads."""
+    return FileStream(request)
+
+
+def requested_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single `bytes=` Range, or None to send the whole file.
+    Raises 416 for a range outside the file."""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None # No range, or several ranges: the whole file is sent
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start, end = int(start_text), int(end_text) if end_text else size - 1
+        else: # bytes=-N is the last N bytes
+            start, end = max(size - int(end_text), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+async def read_file_chunks(path: Path, offset: int, length: int, chunk_size: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(offset)
+        while length > 0:
+            chunk = await file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def stream_file(path: Union[str, Path], request: Optional[Request] = None, chunk_size: int = 64 * 1024,
+                media_type: Optional[str] = None, filename: Optional[str] = None) -> StreamingResponse:
+    """Streams a file in `chunk_size` pieces, answering a single-range Range header with 206."""
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    headers = {"Accept-Ranges": "bytes"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    byte_range = requested_byte_range(request.headers.get("range") if request is not None else None, size)
+    status_code, (start, end) = (200, (0, size - 1)) if byte_range is None else (206, byte_range)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(read_file_chunks(path, start, end - start + 1, chunk_size), status_code=status_code,
+                             media_type=media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                             headers=headers)
+
+
+def cache_control_ttl(cache_control: Optional[str], default: float) -> float:
+    """TTL allowed by a Cache-Control response header: 0 for no-store, no-cache or private,
+    else its s-maxage or max-age, else `default`."""
+    if not cache_control:
+        return default
+    directives = {}
+    for item in cache_control.split(","):
+        name, _, value = item.strip().partition("=")
+        directives[name.lower()] = value.strip('" ')
+    if directives.keys() & {"no-store", "no-cache", "private"}:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return float(directives[name])
+    return default
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache of one GET endpoint's responses (`cache/<ttl>` in the DSL).
+    Keyed on method, path, the declared query parameters and the `vary` headers. Only complete
+    200 responses without cookies are stored. A hit skips the handler, not its dependencies
+    (see serve_cached_with), and outgoing requirement items are never stored."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024, query: Tuple[str, ...] = (),
+                 vary: Tuple[str, ...] = (), cache_control: bool = False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.query = query
+        self.vary = tuple(name.lower() for name in vary)
+        self.cache_control = cache_control # Honour the handler's Cache-Control header
+        # key -> (expires at, stored at, status code, raw headers, body), least recently used first
+        self._entries: "OrderedDict[Tuple, Tuple[float, float, int, List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def key_for(self, request: Request) -> Tuple:
+        query_params, headers = request.query_params, request.headers
+        return (request.method, request.url.path, tuple(tuple(query_params.getlist(name)) for name in self.query),
+                tuple(headers.get(name) for name in self.vary))
+
+    def lookup(self, key: Tuple) -> Optional[Response]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, stored_at, status_code, raw_headers, body = entry
+        now = time.monotonic()
+        if now >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        response = Response(body, status_code)
+        response.raw_headers = raw_headers + [(b"age", str(int(now - stored_at)).encode("latin-1"))]
+        return response
+
+    def store(self, key: Tuple, response: Response, raw_headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+        """Stores `response` with `raw_headers` (default: all of its headers). The TTL honours
+        the Cache-Control header of the whole response."""
+        body = getattr(response, "body", None) # Streamed responses have none
+        raw_headers = list(response.raw_headers if raw_headers is None else raw_headers)
+        if response.status_code != 200 or body is None or any(name == b"set-cookie" for name, _ in raw_headers):
+            return
+        ttl = cache_control_ttl(response.headers.get("cache-control"), self.ttl) if self.cache_control else self.ttl
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, now, response.status_code, raw_headers, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations}
+
+
+# Scope key of the ResponseCache key of a miss, read back by SkdslRoute to store the response
+CACHE_KEY_SCOPE_KEY = "skdsl.cache_key"
+
+
+def serve_cached_with(endpoint: Callable, cache: ResponseCache) -> Callable:
+    """Wraps an endpoint so that a stored response of `cache` is returned instead of calling
+    it. FastAPI calls the wrapper once the route's dependencies (requirements included) and
+    parameters are resolved, so a hit is only answered to requests the endpoint would accept.
+    On a miss, the key is left in the request scope and SkdslRoute stores the final response."""
+    signature = inspect.signature(endpoint)
+    request_parameter = inspect.Parameter("skdsl_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+    async def endpoint_wrapper(*args: Any, skdsl_request: Request, **kwargs: Any) -> Any:
+        key = cache.key_for(skdsl_request)
+        cached = cache.lookup(key)
+        if cached is not None:
+            return cached
+        skdsl_request.scope[CACHE_KEY_SCOPE_KEY] = key
+        if inspect.iscoroutinefunction(endpoint):
+            return await endpoint(*args, **kwargs)
+        return await run_in_threadpool(endpoint, *args, **kwargs)
+
+    functools.update_wrapper(endpoint_wrapper, endpoint)
+    endpoint_wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_parameter])
+    return endpoint_wrapper
+
+# Content coding -> (compress(body, level), default level, highest level)
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes, int], bytes], int, int]] = {
+    "br": (lambda body, level: brotli.compress(body, quality=level), 4, 11),
+    "gzip": (lambda body, level: gzip.compress(body, compresslevel=level, mtime=0), 6, 9),
+    "deflate": (lambda body, level: zlib.compress(body, level), 6, 9),
+}
+# Media types that are compressed already
+COMPRESSED_MEDIA_PREFIXES = ("image/", "audio/", "video/", "font/woff")
+COMPRESSED_MEDIA_TYPES = frozenset({"application/gzip", "application/x-gzip", "application/zip", "application/zstd",
+                                    "application/x-bzip2", "application/x-xz", "application/x-7z-compressed"})
+
+
+class ResponseCompression:
+    """Compression of a tag's responses (`compress/...` on the `api tag` line). Complete bodies
+    of at least `min_size` bytes are compressed with the first of `algorithms` the request's
+    Accept-Encoding allows. Streamed and file responses, and bodies that are encoded or
+    compressed already, are sent as is."""
+
+    def __init__(self, algorithms: Tuple[str, ...] = ("gzip",), min_size: int = 1024, level: Optional[int] = None):
+        unknown = [algorithm for algorithm in algorithms if algorithm not in COMPRESSORS]
+        if unknown:
+            raise ValueError(f"Unknown compression algorithms: {', '.join(unknown)}")
+        if "br" in algorithms and brotli is None:
+            raise RuntimeError("compress/br needs the 'brotli' package")
+        self.algorithms = algorithms
+        self.min_size = min_size
+        self.level = level
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        weights = dict(weighted_values(accept_encoding)) if accept_encoding else {}
+        wildcard = weights.get("*", 0.0)
+        return next((algorithm for algorithm in self.algorithms if weights.get(algorithm, wildcard) > 0), None)
+
+    def apply(self, request: Request, response: Response) -> None:
+        body = getattr(response, "body", None) # Streamed and file responses have none
+        if body is None or len(body) < self.min_size or "content-encoding" in response.headers:
+            return
+        media_type = media_type_of(response.headers.get("content-type"))
+        if media_type.startswith(COMPRESSED_MEDIA_PREFIXES) or media_type in COMPRESSED_MEDIA_TYPES:
+            return
+        vary = response.headers.get("vary")
+        if not vary:
+            response.headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            response.headers["Vary"] = f"{vary}, Accept-Encoding"
+        algorithm = self.negotiate(request.headers.get("accept-encoding"))
+        if algorithm is None:
+            return
+        compress, default_level, highest_level = COMPRESSORS[algorithm]
+        response.body = compress(body, min(self.level, highest_level) if self.level is not None else default_level)
+        response.headers["Content-Encoding"] = algorithm
+        response.headers["Content-Length"] = str(len(response.body))
+
+
+class InFlightLimit:
+    """Bound on the requests that one route (`inflight/<n>` in the DSL), or all routes of a tag,
+    handle at once. Requests over it are answered 503 with a Retry-After header instead of queueing."""
+    __slots__ = ("limit", "retry_after", "active")
+
+    def __init__(self, limit: int, retry_after: int = 1):
+        self.limit = limit
+        self.retry_after = retry_after # Seconds
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+
+class BodyTooLarge(HTTPException):
+    def __init__(self, max_body: int):
+        super().__init__(status_code=413, detail=f"Request body is larger than {max_body} bytes")
+
+
+class RequestLimits:
+    """ASGI guard in front of one route (`maxbody/<size>` and `inflight/<n>` in the DSL), applied
+    before anything of the request body is read. A declared Content-Length over `max_body` and a
+    request over any of the `in_flight` limits are rejected without calling the route; a body
+    without Content-Length is counted while it streams in and cut off with 413 at the limit."""
+
+    def __init__(self, max_body: Optional[int] = None, in_flight: Tuple[InFlightLimit, ...] = ()):
+        self.max_body = max_body
+        self.in_flight = in_flight
+        self.shed = 0 # Answered 503
+        self.too_large = 0 # Answered 413
+
+    async def guard(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        """Calls `app` unless the request is over a limit."""
+        if self.max_body is not None:
+            length = Headers(scope=scope).get("content-length", "")
+            if length.isdigit() and int(length) > self.max_body:
+                self.too_large += 1
+                await reject(BodyTooLarge(self.max_body), scope, receive, send)
+                return
+            receive = self.limited_receive(receive)
+        acquired = []
+        try:
+            for limit in self.in_flight:
+                if not limit.try_acquire():
+                    self.shed += 1
+                    await reject(HTTPException(status_code=503, detail="Too many requests in flight",
+                                               headers={"Retry-After": str(limit.retry_after)}), scope, receive, send)
+                    return
+                acquired.append(limit)
+            await app(scope, receive, send)
+        finally:
+            for limit in acquired:
+                limit.release()
+
+    def limited_receive(self, receive: Receive) -> Receive:
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    self.too_large += 1
+                    raise BodyTooLarge(self.max_body) # Turned into the 413 response by the app's exception handlers
+            return message
+
+        return receive_limited
+
+
+async def reject(exc: HTTPException, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+    await response(scope, receive, send)
+
+
+# Scope key of the outgoing requirement items collected while a request is handled
+OUTGOING_SCOPE_KEY = "skdsl.outgoing"
+
+
+class OutgoingItems:
+    """Response headers and cookies set through requirement dependencies."""
+    __slots__ = ("headers", "cookies")
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {}
+        self.cookies: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    def apply(self, response: Response) -> None:
+        for name, value in self.headers.items():
+            response.headers[name] = value
+        for key, value, cookie_options in self.cookies:
+            response.set_cookie(key, value, **cookie_options)
+
+
+class Requirement:
+    """Base of the dependency classes generated for `req` blocks (see requirements.py).
+    FastAPI builds one instance per request, however many dependencies of the route name the
+    class. Outgoing headers and cookies set on it are added by SkdslRoute to the response the
+    endpoint returns, whichever response class it is."""
+
+    def __init__(self, request: Request):
+        self.request = request
+
+    def _outgoing(self) -> OutgoingItems:
+        return self.request.scope.setdefault(OUTGOING_SCOPE_KEY, OutgoingItems())
+
+    def set_response_header(self, name: str, value: Any) -> None:
+        self._outgoing().headers[name] = str(value)
+
+    def set_response_cookie(self, key: str, value: Any, **cookie_options: Any) -> None:
+        self._outgoing().cookies.append((key, str(value), cookie_options))
+
+
+def uses_requirements(dependant: Any) -> bool:
+    """Whether a route (or any of its sub-dependencies) depends on a Requirement class."""
+    return any((isinstance(dependency.call, type) and issubclass(dependency.call, Requirement))
+               or uses_requirements(dependency) for dependency in dependant.dependencies)
+
+
+class SkdslRoute(APIRoute):
+    """Route class of the generated routers. Per endpoint (see route_options) it adds
+    MessagePack request decoding and response negotiation, TypeAdapter-based JSON bodies and
+    responses, streamed NDJSON responses, a ResponseCache, RequestLimits and ResponseCompression.
+    Routes depending on a Requirement get its outgoing headers and cookies."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        options = getattr(endpoint, "__skdsl_options__", {})
+        if options.get("body_adapter") is not None and not takes_validated_body(endpoint):
+            raise RuntimeError(f"{path}: a body_adapter needs the body parameter annotated with PREVALIDATED")
+        if options.get("response_adapter") is not None:
+            endpoint = dump_json_with(endpoint, options["response_adapter"])
+        elif options.get("ndjson_item") is not None:
+            endpoint = stream_ndjson_with(endpoint, options["ndjson_item"])
+        if options.get("cache") is not None: # Outermost, so that a hit skips the response dump too
+            endpoint = serve_cached_with(endpoint, options["cache"])
+        self.limits: Optional[RequestLimits] = options.get("limits")
+        super().__init__(path, endpoint, **kwargs)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.limits is None:
+            await super().handle(scope, receive, send)
+        else: # Matched, but nothing of the request is read yet
+            await self.limits.guard(super().handle, scope, receive, send)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        options = getattr(self.endpoint, "__skdsl_options__", {})
+        msgpack_body = options.get("msgpack_body", False)
+        body_adapter = options.get("body_adapter")
+        msgpack_response = isinstance(self.response_class, type) and issubclass(self.response_class, MsgPackResponse)
+        sets_outgoing = uses_requirements(self.dependant)
+        cache = options.get("cache")
+        compression = options.get("compression")
+        if not (msgpack_body or msgpack_response or body_adapter or sets_outgoing or cache is not None
+                or compression is not None):
+            return handler
+        if (msgpack_body or msgpack_response) and msgpack is None:
+            raise RuntimeError(f"{self.path}: b/msgpack endpoints need the 'msgpack' package")
+
+        async def route_handler(request: Request) -> Response:
+            content_type = media_type_of(request.headers.get("content-type"))
+            if msgpack_body and content_type in MSGPACK_MEDIA_TYPES:
+                request = as_msgpack_request(request)
+            elif body_adapter is not None: # FastAPI only calls request.json() for JSON content types
+                request = as_validated_json_request(request, body_adapter)
+            if not msgpack_response:
+                response = await handler(request)
+            else:
+                token = _respond_with_msgpack.set(accepts_msgpack(request.headers.get("accept")))
+                try:
+                    response = await handler(request)
+                finally:
+                    _respond_with_msgpack.reset(token)
+            cache_key = request.scope.pop(CACHE_KEY_SCOPE_KEY, None) # Only set on a cache miss
+            if compression is not None and (cache is None or cache_key is not None): # Hits are stored as sent
+                compression.apply(request, response)
+            raw_headers = list(response.raw_headers) # Without the outgoing items of this request
+            outgoing = request.scope.get(OUTGOING_SCOPE_KEY) if sets_outgoing else None
+            if outgoing is not None:
+                outgoing.apply(response)
+            if cache_key is not None:
+                cache.store(cache_key, response, raw_headers)
+            return response
+
+        return route_handler
+
+
+class BatchCall(BaseModel):
+    """One request of a batch, to an endpoint of the batch route's tag."""
+    method: str = "GET"
+    path: str # Below the tag's prefix, optionally with a query string: "/chat/5", "/chats?chat_id=1"
+    headers: Dict[str, str] = {}
+    body: Any = None # Sent as JSON
+
+
+class BatchResult(BaseModel):
+    status: int
+    headers: Dict[str, str] = {} # Repeated headers are joined with ", "
+    body: Any = None # JSON bodies as is, NDJSON as a list, text as a string, anything else in base64
+    encoding: Optional[str] = None # "base64" for binary bodies
+
+
+# Headers of the batch request that are not passed on to its sub-requests. Their bodies are
+# embedded in the batch response, so they are answered uncompressed and as JSON by default.
+BATCH_REQUEST_ONLY_HEADERS = frozenset({"content-length", "content-type", "accept", "accept-encoding",
+                                        "transfer-encoding", "expect"})
+BATCH_JSON_HEADERS = [(b"content-type", b"application/json")]
+BATCH_SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "app", "state")
+
+
+class BatchDispatcher:
+    """POST /batch of a tag (`batch` on the `api tag` line). Runs up to `max_requests`
+    sub-requests to the tag's endpoints concurrently and in-process. Each one goes through the
+    whole app as a request of its own: middleware, routing, validation, requirements, caches
+    and limits. The results are answered in one JSON array, in request order. The batch
+    request's headers (tokens, cookies) are passed on to every sub-request, below its own."""
+
+    def __init__(self, max_requests: int = 20):
+        self.max_requests = max_requests
+
+    async def dispatch(self, request: Request, calls: List[BatchCall]) -> Response:
+        if len(calls) > self.max_requests:
+            raise HTTPException(413, f"A batch takes at most {self.max_requests} requests, got {len(calls)}")
+        base_path = request.scope["path"][:-len("/batch")]
+        inherited = [(name, value) for name, value in request.scope["headers"]
+                     if name.decode("latin-1").lower() not in BATCH_REQUEST_ONLY_HEADERS]
+        results: List[bytes] = [b"null"] * len(calls)
+
+        async def run(index: int, call: BatchCall) -> None:
+            results[index] = await self.call(request.scope, base_path, inherited, call)
+
+        async with anyio.create_task_group() as tasks:
+            for index, call in enumerate(calls):
+                tasks.start_soon(run, index, call)
+        return Response(b"[" + b",".join(results) + b"]", media_type="application/json")
+
+    async def call(self, outer_scope: Scope, base_path: str, inherited: List[Tuple[bytes, bytes]],
+                   call: BatchCall) -> bytes:
+        path, _, query = call.path.partition("?")
+        if not path.startswith("/") or unquote(path).rstrip("/") == "/batch":
+            return self.encode_result(400, BATCH_JSON_HEADERS, to_json({"detail": f"Invalid batch path: {call.path}"}))
+        own_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in call.headers.items()]
+        overridden = {name for name, _ in own_headers}
+        headers = [(name, value) for name, value in inherited if name.lower() not in overridden] + own_headers
+        if b"accept" not in overridden:
+            headers.append((b"accept", b"application/json"))
+        body = b""
+        if call.body is not None:
+            body = to_json(call.body)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-type"]
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        scope = {key: outer_scope[key] for key in BATCH_SCOPE_KEYS if key in outer_scope}
+        scope.update(method=call.method.upper(), path=base_path + unquote(path),
+                     raw_path=(quote(base_path) + path).encode("latin-1"), query_string=query.encode("latin-1"),
+                     headers=headers)
+
+        responded = anyio.Event()
+        request_sent = False
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await responded.wait() # Streaming responses listen for a disconnect meanwhile
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await outer_scope["app"](scope, receive, send)
+        except Exception:
+            if not start: # Otherwise the 500 was answered already, by ServerErrorMiddleware
+                return self.encode_result(500, BATCH_JSON_HEADERS, to_json({"detail": "Internal Server Error"}))
+        finally:
+            responded.set()
+        return self.encode_result(start.get("status", 500), start.get("headers", []), b"".join(chunks))
+
+    @staticmethod
+    def encode_result(status: int, raw_headers: List[Tuple[bytes, bytes]], content: bytes) -> bytes:
+        headers: Dict[str, str] = {}
+        for raw_name, raw_value in raw_headers:
+            name, value = raw_name.decode("latin-1").lower(), raw_value.decode("latin-1")
+            if name not in ("content-length", "transfer-encoding"):
+                headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        media_type = media_type_of(headers.get("content-type"))
+        encoding = None
+        if not content:
+            body = b"null"
+        elif media_type == "application/json" or media_type.endswith("+json"):
+            body = content # Embedded as is, not parsed again
+        elif media_type == "application/x-ndjson":
+            body = b"[" + b",".join(line for line in content.splitlines() if line.strip()) + b"]"
+        elif media_type.startswith("text/"):
+            body = to_json(content.decode("utf-8", errors="replace"))
+        else:
+            body, encoding = to_json(base64.b64encode(content).decode("ascii")), "base64"
+        result = b'{"status":' + str(status).encode() + b',"headers":' + to_json(headers) + b',"body":' + body
+        if encoding:
+            result += b',"encoding":"' + encoding.encode() + b'"'
+        return result + b"}"
+
+
+# Upper bounds (seconds) of the latency histogram buckets, plus an implicit +Inf one
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RouteMetrics:
+    """Counters of one route: requests per status code, a fixed-bucket histogram of the
+    seconds until the handler returned its response, requests in flight and response bytes."""
+    __slots__ = ("tag", "endpoint", "statuses", "buckets", "latency_sum", "in_flight", "response_bytes", "cache", "limits")
+
+    def __init__(self, tag: str, endpoint: str):
+        self.tag = tag
+        self.endpoint = endpoint
+        self.statuses: Dict[int, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.in_flight = 0
+        self.response_bytes = 0
+        self.cache: Optional[ResponseCache] = None
+        self.limits: Optional[RequestLimits] = None
+
+    def observe(self, status_code: int, seconds: float, size: int) -> None:
+        self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.response_bytes += size
+
+
+# (tag, endpoint) -> metrics of every metered route of this process
+ROUTE_METRICS: Dict[Tuple[str, str], RouteMetrics] = {}
+
+
+def response_size(response: Response) -> int:
+    body = getattr(response, "body", None)
+    if body is not None:
+        return len(body)
+    length = response.headers.get("content-length", "") # Streamed responses
+    return int(length) if length.isdigit() else 0
+
+
+class MeteredRoute(SkdslRoute):
+    """SkdslRoute that records RouteMetrics under its tag and endpoint name (the DSL func_name)."""
+    metrics_tag = ""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        key = (self.metrics_tag, self.name)
+        metrics = ROUTE_METRICS.get(key) or ROUTE_METRICS.setdefault(key, RouteMetrics(*key))
+        options = getattr(self.endpoint, "__skdsl_options__", {})
+        metrics.cache = options.get("cache")
+        metrics.limits = options.get("limits") # Its 503s and early 413s never reach the handler
+
+        async def metered_handler(request: Request) -> Response:
+            metrics.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Exception as exc: # Turned into an error response by the app's exception handlers
+                status_code = 422 if isinstance(exc, RequestValidationError) else getattr(exc, "status_code", 500)
+                metrics.observe(status_code, time.perf_counter() - start, 0)
+                raise
+            finally:
+                metrics.in_flight -= 1
+            metrics.observe(response.status_code, time.perf_counter() - start, response_size(response))
+            return response
+
+        return metered_handler
+
+
+@functools.lru_cache(maxsize=None)
+def metered_route(tag: str) -> type:
+    """Route class of a tag router generated with --metrics."""
+    return type("MeteredRoute", (MeteredRoute,), {"metrics_tag": tag})
+
+
+def render_metrics() -> str:
+    """All route metrics in the Prometheus text exposition format."""
+    routes = sorted(ROUTE_METRICS.values(), key=lambda metrics: (metrics.tag, metrics.endpoint))
+    lines = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def labels(metrics: RouteMetrics, **extra: Any) -> str:
+        pairs = [("tag", metrics.tag), ("endpoint", metrics.endpoint), *extra.items()]
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    family("skdsl_requests_total", "counter", "Requests handled, by status code.")
+    for metrics in routes:
+        for status_code, count in sorted(metrics.statuses.items()):
+            lines.append(f"skdsl_requests_total{labels(metrics, status=status_code)} {count}")
+    family("skdsl_request_duration_seconds", "histogram", "Seconds until the handler returned its response.")
+    for metrics in routes:
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), metrics.buckets):
+            cumulative += count
+            lines.append(f"skdsl_request_duration_seconds_bucket{labels(metrics, le=bound)} {cumulative}")
+        lines.append(f"skdsl_request_duration_seconds_sum{labels(metrics)} {metrics.latency_sum:.6f}")
+        lines.append(f"skdsl_request_duration_seconds_count{labels(metrics)} {cumulative}")
+    family("skdsl_requests_in_flight", "gauge", "Requests being handled.")
+    for metrics in routes:
+        lines.append(f"skdsl_requests_in_flight{labels(metrics)} {metrics.in_flight}")
+    family("skdsl_response_bytes_total", "counter", "Response body bytes (Content-Length of streamed responses).")
+    for metrics in routes:
+        lines.append(f"skdsl_response_bytes_total{labels(metrics)} {metrics.response_bytes}")
+
+    cached_routes = [metrics for metrics in routes if metrics.cache is not None]
+    for counter in ("hits", "misses", "evictions", "expirations"):
+        if cached_routes:
+            family(f"skdsl_cache_{counter}_total", "counter", f"Response cache {counter}.")
+        for metrics in cached_routes:
+            lines.append(f"skdsl_cache_{counter}_total{labels(metrics)} {getattr(metrics.cache, counter)}")
+
+    limited_routes = [metrics for metrics in routes if metrics.limits is not None]
+    if limited_routes:
+        family("skdsl_rejected_total", "counter", "Requests rejected by the route's limits: 503 over an in-flight limit, 413 over the body size.")
+    for metrics in limited_routes:
+        for reason, count in (("in_flight", metrics.limits.shed), ("body_size", metrics.limits.too_large)):
+            lines.append(f"skdsl_rejected_total{labels(metrics, reason=reason)} {count}")
+    return "\\n".join(lines) + "\\n"
+
+
+async def metrics_endpoint() -> Response:
+    return Response(render_metrics(), media_type=METRICS_MEDIA_TYPE)
+
+
+class LazyRouter(BaseRoute):
+    """Stands in for a tag router of main_app.py (--lazy-routers) until the first request under
+    its prefix. That request imports the tag module, includes its router in the app and is
+    routed again; from then on the placeholder matches nothing."""
+
+    def __init__(self, app: FastAPI, module: str, package: Optional[str], prefix: str):
+        self.app = app
+        self.module = module
+        self.package = package
+        self.prefix = prefix
+        self.loaded = False
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if self.loaded or scope["type"] != "http":
+            return Match.NONE, {}
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if path == self.prefix or path.startswith(self.prefix + "/"):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def load(self) -> None:
+        if not self.loaded:
+            router = importlib.import_module(self.module, self.package).router
+            self.app.include_router(router, prefix=self.prefix)
+            self.app.openapi_schema = None
+            self.loaded = True
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.load()
+        await self.app.router(scope, receive, send)
+
+
+def lazy_include_router(app: FastAPI, module: str, package: Optional[str], prefix: str) -> LazyRouter:
+    """Like `app.include_router(import_module(module, package).router, prefix=prefix)`, but the
+    import happens on the first request under `prefix`. The OpenAPI schema loads every router."""
+    lazy_router = LazyRouter(app, module, package, prefix)
+    app.router.routes.append(lazy_router)
+    if not hasattr(app, "skdsl_lazy_routers"):
+        app.skdsl_lazy_routers = []
+        build_openapi = app.openapi
+
+        def openapi() -> Dict[str, Any]:
+            load_lazy_routers(app)
+            return build_openapi()
+
+        app.openapi = openapi
+    app.skdsl_lazy_routers.append(lazy_router)
+    return lazy_router
+
+
+def load_lazy_routers(app: FastAPI) -> None:
+    """Imports every tag router that is still lazy, e.g. to warm a worker up before it serves."""
+    for lazy_router in getattr(app, "skdsl_lazy_routers", ()):
+        lazy_router.load()
+'''
+
+def generate_runtime_module_code() -> str:
+    return RUNTIME_MODULE_CODE
+
+
+@functools.lru_cache(maxsize=256)
+def tag_module_imports(runtime_names: Tuple[str, ...], type_adapters: bool, requirement_classes: Tuple[str, ...]) -> str:
+    """Import header of a tag module. Most tags (of every contract in a --batch run) share a few
+    distinct headers, so they are built once per process."""
+    lines = [
+        "from fastapi import APIRouter, Query, Header, Cookie, Body, File, Form, UploadFile, Depends, HTTPException, status, Request, Response",
+        "from fastapi.responses import PlainTextResponse, HTMLResponse, FileResponse",
+        TYPING_IMPORTS,
+        f"from .models import * # Generated types/models of this version",
+    ]
+    if "PREVALIDATED" in runtime_names:
+        lines.insert(3, "from typing import Annotated")
+    if type_adapters:
+        lines.append("from pydantic import TypeAdapter")
+    lines.append(f"from .runtime import {', '.join(runtime_names)}")
+    if requirement_classes:
+        lines.append(f"from .requirements import {', '.join(requirement_classes)}")
+    return "\n".join(lines)
+
+def generate_tag_module_code(tag: DslTag, dsl_file: DslFile, options: CodegenOptions = CodegenOptions()) -> str:
+    runtime_names = ["SkdslRoute", "MsgPackResponse", "route_options"]
+    router_args = ["route_class=SkdslRoute"]
+    if options.metrics:
+        runtime_names.append("metered_route")
+        router_args[0] = f'route_class=metered_route("{tag.name}")'
+    streams_ndjson = any(endpoint.final_response_body and endpoint.final_response_body.body_type == "ndjson"
+                         for endpoint in tag.endpoints)
+    if streams_ndjson:
+        runtime_names.append("NDJSONResponse")
+    if options.fast_json:
+        runtime_names.append("FastJSONResponse")
+        router_args.append("default_response_class=FastJSONResponse")
+        if any(endpoint.final_request_body and endpoint.final_request_body.body_type == "json"
+               and endpoint.final_request_body.py_type for endpoint in tag.endpoints):
+            runtime_names.append("PREVALIDATED")
+    if options.stream_files:
+        runtime_names.extend(["FileStream", "file_stream", "stream_file", "STREAMED_BODY_OPENAPI"])
+    if any(endpoint.final_cache is not None for endpoint in tag.endpoints):
+        runtime_names.append("ResponseCache")
+    tag_in_flight = tag.limits is not None and tag.limits.max_in_flight is not None
+    if tag_in_flight or any(endpoint.final_limits is not None for endpoint in tag.endpoints):
+        runtime_names.append("RequestLimits")
+    if tag_in_flight or any(endpoint.final_limits is not None and endpoint.final_limits.max_in_flight
+                            for endpoint in tag.endpoints):
+        runtime_names.append("InFlightLimit")
+    tag_compression = tag.compression is not None and any(compresses_response(endpoint, tag.compression)
+                                                          for endpoint in tag.endpoints)
+    if tag_compression:
+        runtime_names.append("ResponseCompression")
+    if tag.batch_max_requests is not None:
+        runtime_names.extend(["BatchCall", "BatchResult", "BatchDispatcher"])
+    # Tag requirements are router dependencies, resolved once per request by FastAPI's dependency cache
+    tag_req_names = [name for name in tag.complex_req_names if name in dsl_file.complex_requirements]
+    used_req_names = dict.fromkeys(tag_req_names + [name for endpoint in tag.endpoints
+                                                    for name in endpoint.complex_req_names
+                                                    if name in dsl_file.complex_requirements])
+    code_lines = [tag_module_imports(tuple(runtime_names), options.fast_json or streams_ndjson,
+                                     tuple(requirement_class_name(name) for name in used_req_names))]
+    if tag_req_names:
+        router_args.append(f"dependencies=[{', '.join(f'Depends({requirement_class_name(name)})' for name in tag_req_names)}]")
+    code_lines.append(f"\nrouter = APIRouter({', '.join(router_args)})\n")
+    if options.stream_files:
+        code_lines.append(f"FILE_CHUNK_SIZE = {options.file_chunk_size} # Bytes per chunk of streamed file responses\n")
+    if tag_in_flight:
+        code_lines.append(f"TAG_IN_FLIGHT = {in_flight_limit_code(tag.limits)} # Shared by all endpoints of the tag\n")
+    if tag_compression:
+        code_lines.append(f"TAG_COMPRESSION = {generate_response_compression_code(tag.compression)} # Not for b/file or streams\n")
+
+    for endpoint in tag.endpoints:
+        code_lines.append(generate_endpoint_func_code(endpoint, dsl_file, tag.name, options, tag.limits, tag.compression))
+        code_lines.append("\n")
+    if tag.batch_max_requests is not None:
+        code_lines.append(generate_batch_route_code(tag, tag_compression))
+    
+    return "\n".join(code_lines)
+
+def generate_batch_route_code(tag: DslTag, compressed: bool) -> str:
+    """POST /batch of a `batch` tag. The tag's in-flight limit is left to the sub-requests: the
+    batch itself holding a slot could starve them."""
+    if any(endpoint.http_method == "post" and endpoint.path_template == "/batch" for endpoint in tag.endpoints):
+        print(f"Warning: Tag '{tag.name}' declares post/batch itself, which shadows its batch route.")
+    openapi_tag_name = tag.name.replace('_', ' ').replace('-', ' ').title()
+    lines = [f"TAG_BATCH = BatchDispatcher(max_requests={tag.batch_max_requests})", "", ""]
+    lines.append(f'@router.post("/batch", response_model=List[BatchResult], tags=["{openapi_tag_name}"])')
+    if compressed:
+        lines.append("@route_options(compression=TAG_COMPRESSION)")
+    lines.extend([
+        "async def batch(request: Request, calls: List[BatchCall] = Body(...)):",
+        f'    """Runs up to {tag.batch_max_requests} requests to endpoints of this tag concurrently and answers their results in order."""',
+        "    return await TAG_BATCH.dispatch(request, calls)",
+    ])
+    return "\n".join(lines) + "\n"
+
+
+def generate_main_app_code(dsl_file: DslFile, version: str, options: CodegenOptions = CodegenOptions()) -> str:
+    """Generates a main.py for the specific API version."""
+    runtime_names = []
+    app_args = ['title="Generated API"', f'version="{version}"']
+    if options.fast_json:
+        runtime_names.append("FastJSONResponse")
+        app_args.append("default_response_class=FastJSONResponse")
+    if options.metrics:
+        runtime_names.append("metrics_endpoint")
+    if options.lazy_routers:
+        runtime_names.append("lazy_include_router")
+    lines = ["from fastapi import FastAPI"]
+    if runtime_names:
+        lines.append(f"from .runtime import {', '.join(runtime_names)}")
+    lines.append(f"\napp = FastAPI({', '.join(app_args)})\n")
+    for tag in dsl_file.tags:
+        module_name = tag.py_module_name.replace(".py", "")
+        if options.lazy_routers: # Imported, with the models, on the first request under the prefix
+            lines.append(f"lazy_include_router(app, '.{module_name}', __package__, prefix='/api/{version}/{tag.name}')\n")
+            continue
+        lines.append(f"from .{module_name} import router as {module_name}_router")
+        lines.append(f"app.include_router({module_name}_router, prefix='/api/{version}/{tag.name}')\n") # Example prefix
+    if options.metrics: # Kept out of the OpenAPI schema like api/hidden endpoints
+        lines.append(f"app.add_api_route('/api/{version}/metrics', metrics_endpoint, include_in_schema=False)\n")
+    
+    lines.append("\n# To run: uvicorn main:app --reload (if this file is main.py in the version folder)")
+    return "\n".join(lines)
+
+# Load-test script written into every version folder as loadtest.py. The table of cases is
+# generated from the resolved endpoints; inputs are sampled from the types when it runs.
+LOADTEST_MODULE_CODE = r'''"""In-process load test of API version $version (generated by skdsl-py).
+
+Sends requests to every endpoint of `main_app.app` through httpx's ASGI transport, so no
+server or network is involved. Inputs are synthetic but valid: path, query, header and
+cookie values, form fields and JSON bodies are sampled from the types of the DSL. Reports
+requests per second and p50/p99 latency per endpoint.
+
+    python -m $version.loadtest --requests 500
+    python -m $version.loadtest --json $version.json
+    python -m <next version>.loadtest --baseline $version.json
+"""
+import argparse
+import asyncio
+import enum
+import json
+import sys
+import time
+import types
+import typing
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union, get_args, get_origin
+
+import httpx
+from pydantic import BaseModel
+
+from .main_app import app
+from .models import * # Generated types/models of this version
+
+
+class LoadCase(NamedTuple):
+    tag: str
+    endpoint: str # DSL func_name
+    method: str
+    path: str # With {name} placeholders for the path parameters
+    path_params: Dict[str, Any] # Name -> Python type, like the other mappings
+    query: Dict[str, Any]
+    headers: Dict[str, Any] # The endpoint's own headers and those of its requirements
+    cookies: Dict[str, Any]
+    body_kind: Optional[str] # "json", "form", "raw" or "file:<form key>"
+    body_type: Any
+
+
+CASES = []
+
+
+def sample(tp: Any, depth: int = 0) -> Any:
+    """A valid value of `tp`: the first member of unions, literals and enums, one item per container."""
+    origin, args = get_origin(tp), get_args(tp)
+    if origin is typing.Annotated:
+        return sample(args[0], depth)
+    if origin in (Union, types.UnionType):
+        return sample(next((arg for arg in args if arg is not type(None)), str), depth)
+    if origin is typing.Literal:
+        return args[0]
+    if origin in (list, set, frozenset, tuple):
+        if origin is tuple and args and args[-1] is not Ellipsis:
+            return [sample(arg, depth + 1) for arg in args]
+        return [sample(args[0], depth + 1)] if args and depth < 4 else []
+    if origin is dict:
+        return {str(sample(args[0], depth + 1)): sample(args[1], depth + 1)} if args and depth < 4 else {}
+    if isinstance(tp, type):
+        if issubclass(tp, BaseModel):
+            return {field.alias or name: sample(field.annotation, depth + 1) for name, field in tp.model_fields.items()}
+        if issubclass(tp, enum.Enum):
+            return next(iter(tp)).value
+        if issubclass(tp, bool):
+            return True
+        if issubclass(tp, int):
+            return 1
+        if issubclass(tp, float):
+            return 1.5
+    return "sample"
+
+
+def as_texts(value: Any) -> List[str]:
+    """Query, form and header text of a sampled value; lists repeat the key."""
+    values = value if isinstance(value, list) else [value]
+    return [json.dumps(item) if not isinstance(item, str) else item for item in values]
+
+
+def build_request(case: LoadCase) -> Tuple[str, Dict[str, Any]]:
+    path = case.path.format(**{name: as_texts(sample(tp))[0] for name, tp in case.path_params.items()})
+    headers = {name: as_texts(sample(tp))[0] for name, tp in case.headers.items()}
+    if case.cookies:
+        headers["Cookie"] = "; ".join(f"{name}={as_texts(sample(tp))[0]}" for name, tp in case.cookies.items())
+    request: Dict[str, Any] = {"params": [(name, text) for name, tp in case.query.items() for text in as_texts(sample(tp))],
+                               "headers": headers}
+    if case.body_kind == "json":
+        request["json"] = sample(case.body_type)
+    elif case.body_kind == "form":
+        request["data"] = {name: as_texts(sample(tp)) for name, tp in case.body_type.items()}
+    elif case.body_kind == "raw":
+        request["content"] = b"sample" * 1024
+        headers["Content-Type"] = "application/octet-stream"
+    elif case.body_kind and case.body_kind.startswith("file:"):
+        request["files"] = {case.body_kind[len("file:"):]: ("sample.bin", b"sample" * 1024, "application/octet-stream")}
+    return path, request
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))]
+
+
+async def run_case(client: httpx.AsyncClient, case: LoadCase, requests: int, warmup: int,
+                   concurrency: int) -> Dict[str, Any]:
+    path, request = build_request(case)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(record: bool) -> None:
+        start = time.perf_counter()
+        response = await client.request(case.method, path, **request)
+        if record:
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    for _ in range(warmup):
+        await send(False)
+    start = time.perf_counter()
+    for offset in range(0, requests, concurrency):
+        await asyncio.gather(*(send(True) for _ in range(min(concurrency, requests - offset))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"tag": case.tag, "endpoint": case.endpoint, "method": case.method, "path": path,
+            "requests": requests, "statuses": statuses, "rps": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.5) * 1000, "p99_ms": percentile(latencies, 0.99) * 1000}
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    cases = [case for case in CASES if not args.match or args.match in f"{case.tag}.{case.endpoint}"]
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False) # Handler errors count as 500s
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        return [await run_case(client, case, args.requests, args.warmup, args.concurrency) for case in cases]
+
+
+def format_report(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_slowdown: float) -> str:
+    lines = [f"{'endpoint':<40}{'statuses':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"]
+    for result in results:
+        key = f"{result['tag']}.{result['endpoint']}"
+        statuses = ",".join(f"{code}x{count}" for code, count in sorted(result["statuses"].items()))
+        line = f"{key:<40}{statuses:<16}{result['rps']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        previous = baseline.get(key)
+        if previous:
+            ratio = result["p50_ms"] / previous["p50_ms"]
+            line += f"  p50 {ratio:.2f}x baseline" + ("  SLOWER" if ratio > max_slowdown else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="In-process load test of the generated endpoints")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight per endpoint")
+    parser.add_argument("--match", help="Only endpoints whose '<tag>.<func_name>' contains this")
+    parser.add_argument("--json", help="Write the results to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="Results of an earlier run (--json) to compare p50 latency with")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="p50 ratio flagged as SLOWER")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+        return 0
+    baseline = {}
+    if args.baseline:
+        baseline = {f"{r['tag']}.{r['endpoint']}": r for r in json.loads(Path(args.baseline).read_text())}
+    print(format_report(results, baseline, args.max_slowdown))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+'''
+
+def generate_load_case_code(tag: DslTag, endpoint: DslEndpoint, version: str, options: CodegenOptions) -> str:
+    """One LoadCase of loadtest.py: parameter names with their Python types."""
+    def types_of(params: List[DslParameter]) -> str:
+        return "{" + ", ".join(f'"{p.name}": {p.py_type or "Any"}' for p in params) + "}"
+    body_kind, body_type = "None", "None"
+    request_body = endpoint.final_request_body
+    if request_body and request_body.body_type in ("json", "msgpack"):
+        body_kind, body_type = '"json"', request_body.py_type or "Any" # b/msgpack also accepts JSON
+    elif request_body and request_body.body_type == "file":
+        body_kind = '"raw"' if options.stream_files else f'"file:{request_body.file_form_key}"'
+    elif endpoint.final_form_params:
+        body_kind, body_type = '"form"', types_of(endpoint.final_form_params)
+    path = f"/api/{version}/{tag.name}{endpoint.path_template}".replace(":path}", "}")
+    return (f'LoadCase("{tag.name}", "{endpoint.func_name}", "{endpoint.http_method.upper()}", "{path}", '
+            f"{types_of(endpoint.final_path_params)}, {types_of(endpoint.final_query_params)}, "
+            f"{types_of(endpoint.final_header_params)}, {types_of(endpoint.final_cookie_params)}, "
+            f"{body_kind}, {body_type})")
+
+def generate_loadtest_module_code(dsl_file: DslFile, version: str, options: CodegenOptions = CodegenOptions()) -> str:
+    """Generates loadtest.py for the specific API version."""
+    cases = [generate_load_case_code(tag, endpoint, version, options) for tag in dsl_file.tags for endpoint in tag.endpoints]
+    cases_code = "CASES = [\n" + "".join(f"    {case},\n" for case in cases) + "]"
+    return LOADTEST_MODULE_CODE.replace("$version", version).replace("CASES = []", cases_code, 1)
+
+# Async client written into every version folder as client.py. The support code below is
+# fixed; the REQUIREMENTS table, one class per tag and ApiClient are generated after it.
+CLIENT_MODULE_CODE = r'''"""Async client of API version $version (generated by skdsl-py).
+
+`ApiClient` owns one pooled, keep-alive `httpx.AsyncClient` and has a client per tag as
+attribute (e.g. `api.users`), with a method per endpoint named like its handler. Values
+of `req` items, e.g. access tokens, are given once to `ApiClient` and sent with every
+endpoint that requires them. Non-2xx responses raise `httpx.HTTPStatusError`.
+
+    async with ApiClient("http://users-service:8000", x_access=token) as api:
+        answer = await api.users.post_sign_in(payload=hello, user_id=1)
+
+    async with ApiClient.for_app(app) as api: # In-process, through httpx's ASGI transport
+        ...
+"""
+import contextlib
+from typing import Any, AsyncIterator, Dict, IO, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+import httpx
+from pydantic import TypeAdapter
+
+from .models import * # Generated types/models of this version
+
+try:
+    import msgpack
+except ImportError: # b/msgpack endpoints then exchange JSON, which the server accepts too
+    msgpack = None
+
+API_PREFIX = "/api/$version"
+# Connections are kept alive and reused across calls (and tags) of one ApiClient
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+DEFAULT_TIMEOUT = httpx.Timeout(10.0)
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+REQUIREMENTS = {}
+
+
+def path_segment(value: Any, rest: bool = False) -> str:
+    """A path parameter, percent-encoded. `{**rest}` parameters keep their slashes."""
+    return quote(str(value), safe="/" if rest else "")
+
+
+def encode_body(adapter: TypeAdapter, payload: Any, as_msgpack: bool = False) -> Tuple[bytes, str]:
+    if as_msgpack and msgpack is not None:
+        return msgpack.packb(adapter.dump_python(payload, mode="json", by_alias=True), use_bin_type=True), MSGPACK_MEDIA_TYPE
+    return adapter.dump_json(payload, by_alias=True), JSON_MEDIA_TYPE
+
+
+def decode_body(adapter: TypeAdapter, response: httpx.Response) -> Any:
+    if response.headers.get("content-type", "").split(";")[0].strip() == MSGPACK_MEDIA_TYPE:
+        return adapter.validate_python(msgpack.unpackb(response.content, raw=False))
+    return adapter.validate_json(response.content)
+
+
+class TagClient:
+    """Base of the tag clients. Requests go through the connection pool of the ApiClient."""
+    prefix = ""
+
+    def __init__(self, api: "ApiClient"):
+        self._api = api
+
+    def _build(self, method: str, path: str, requirements: Sequence[str] = (), params: Optional[Dict[str, Any]] = None,
+               headers: Optional[Dict[str, Any]] = None, cookies: Optional[Dict[str, Any]] = None,
+               **kwargs: Any) -> httpx.Request:
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        headers = {name: str(value) for name, value in (headers or {}).items() if value is not None}
+        cookies = {name: str(value) for name, value in (cookies or {}).items() if value is not None}
+        for requirement in requirements:
+            for kind, name, keyword in REQUIREMENTS[requirement]:
+                value = self._api.requirement_values.get(keyword)
+                if value is not None:
+                    target = {"header": headers, "query": params, "cookie": cookies}[kind]
+                    target.setdefault(name, value if kind == "query" else str(value))
+        if cookies: # Per-request cookies of httpx are deprecated
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+        return self._api.http.build_request(method, f"{API_PREFIX}{self.prefix}{path}", params=params,
+                                            headers=headers, **kwargs)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        response = await self._api.http.send(request)
+        response.raise_for_status()
+        return response
+
+    @contextlib.asynccontextmanager
+    async def _stream(self, request: httpx.Request) -> AsyncIterator[httpx.Response]:
+        response = await self._api.http.send(request, stream=True)
+        try:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+'''
+
+def client_class_name(tag_name: str) -> str:
+    """`api tag chat-rooms` -> ChatRoomsClient"""
+    return requirement_class_name(tag_name)[:-len("Requirement")] + "Client"
+
+def client_requirement_names(tag: DslTag, endpoint: DslEndpoint, dsl_file: DslFile) -> List[str]:
+    names = []
+    for name in tag.complex_req_names + endpoint.complex_req_names:
+        if name in dsl_file.complex_requirements and name not in names:
+            names.append(name)
+    return names
+
+def generate_client_method_code(tag: DslTag, endpoint: DslEndpoint, dsl_file: DslFile,
+                                options: CodegenOptions = CodegenOptions()) -> List[str]:
+    """A method of a tag client: path parameters are positional, the endpoint's own items are
+    keyword arguments, and the items of its requirements come from the ApiClient."""
+    prefix = endpoint.func_name.upper()
+    adapters: List[str] = []
+    args = ["self"] + [f"{p.name.replace('-', '_')}: {p.py_type or 'Any'}" for p in endpoint.final_path_params]
+    keyword_args: List[str] = []
+    call_args: List[str] = []
+    body_lines: List[str] = []
+    request_body, response_body = endpoint.final_request_body, endpoint.final_response_body
+
+    if request_body and request_body.body_type in ("json", "msgpack"):
+        keyword_args.append(f"payload: {request_body.py_type or 'Any'}")
+        adapters.append(f"{prefix}_BODY = {type_adapter_code(request_body.py_type or 'Any', dsl_file)}")
+        as_msgpack = ", as_msgpack=True" if request_body.body_type == "msgpack" else ""
+        body_lines.append(f"content, content_type = encode_body(self.{prefix}_BODY, payload{as_msgpack})")
+        call_args.append("content=content")
+    elif request_body and request_body.body_type == "file" and request_body.file_form_key:
+        file_arg = request_body.file_form_key.replace('-', '_')
+        if options.stream_files: # The server reads the raw request body
+            keyword_args.append(f"{file_arg}: Union[bytes, AsyncIterator[bytes]]")
+            call_args.append(f"content={file_arg}")
+        else:
+            keyword_args.append(f"{file_arg}: Union[bytes, IO[bytes], Tuple[str, Any, str]]")
+            call_args.append(f'files={{"{request_body.file_form_key}": {file_arg}}}')
+
+    def mapping(params: List[DslParameter]) -> str:
+        return "{" + ", ".join(f'"{p.name}": {p.name.replace("-", "_")}' for p in params) + "}"
+
+    keyword_args.extend(f"{p.name.replace('-', '_')}: {p.py_type or 'Any'}" for p in endpoint.query_params)
+    keyword_args.extend(f"{p.name.replace('-', '_')}: {p.py_type or 'Any'}" for p in endpoint.final_form_params)
+    keyword_args.extend(f"{p.name.replace('-', '_')}: Optional[{p.py_type or 'Any'}] = None"
+                        for p in endpoint.header_params + endpoint.cookie_params)
+    if endpoint.query_params:
+        call_args.append(f"params={mapping(endpoint.query_params)}")
+    if endpoint.final_form_params:
+        call_args.append(f"data={mapping(endpoint.final_form_params)}")
+    header_items = [f'"{p.name}": {p.name.replace("-", "_")}' for p in endpoint.header_params]
+    if request_body and request_body.body_type in ("json", "msgpack"):
+        header_items.append('"Content-Type": content_type')
+    elif request_body and request_body.body_type == "file" and options.stream_files:
+        header_items.append('"Content-Type": "application/octet-stream"')
+    response_type, accept = "None", None
+    if response_body and response_body.body_type in ("json", "msgpack", "ndjson"):
+        kind = "ITEM" if response_body.body_type == "ndjson" else "RESPONSE"
+        adapter = type_adapter_code(response_body.py_type or "Any", dsl_file)
+        if f"{prefix}_BODY = {adapter}" in adapters:
+            adapter = f"{prefix}_BODY"
+        adapters.append(f"{prefix}_{kind} = {adapter}")
+        response_type = response_body.py_type or "Any"
+        accept = {"json": '"application/json"', "ndjson": '"application/x-ndjson"',
+                  "msgpack": "MSGPACK_MEDIA_TYPE if msgpack is not None else JSON_MEDIA_TYPE"}[response_body.body_type]
+    elif response_body and response_body.body_type in ("plain", "html"):
+        response_type = "str"
+    elif response_body and response_body.body_type == "file":
+        response_type = "bytes"
+    if accept:
+        header_items.append(f'"Accept": {accept}')
+    if header_items:
+        call_args.append("headers={" + ", ".join(header_items) + "}")
+    if endpoint.cookie_params:
+        call_args.append(f"cookies={mapping(endpoint.cookie_params)}")
+    requirements = client_requirement_names(tag, endpoint, dsl_file)
+    if requirements:
+        call_args.insert(0, "requirements=(" + "".join(f'"{name}", ' for name in requirements).rstrip(" ") + ")")
+
+    path = re.sub(r"\{([^}:]+)(:path)?\}",
+                  lambda m: f"{{path_segment({m.group(1).replace('-', '_')}{', rest=True' if m.group(2) else ''})}}",
+                  endpoint.path_template)
+    path_code = f'f"{path}"' if endpoint.final_path_params else f'"{path}"'
+    method_code = f'"{endpoint.http_method.upper()}"'
+    request_code = f"self._build({', '.join([method_code, path_code] + call_args)})"
+    if keyword_args:
+        args.append("*")
+    is_stream = response_body is not None and response_body.body_type == "ndjson"
+    returns = f"AsyncIterator[{response_type}]" if is_stream else response_type
+    lines = [f"    async def {endpoint.func_name}({', '.join(args + keyword_args)}) -> {returns}:",
+             f'        """`{endpoint.raw_definition}`"""']
+    lines.extend(f"        {line}" for line in body_lines)
+    if is_stream:
+        lines.append(f"        async with self._stream({request_code}) as response:")
+        lines.append("            async for line in response.aiter_lines():")
+        lines.append("                if line:")
+        lines.append(f"                    yield self.{prefix}_ITEM.validate_json(line)")
+    elif response_type == "None":
+        lines.append(f"        await self._send({request_code})")
+    else:
+        lines.append(f"        response = await self._send({request_code})")
+        if response_type == "str":
+            lines.append("        return response.text")
+        elif response_type == "bytes":
+            lines.append("        return response.content")
+        else:
+            lines.append(f"        return decode_body(self.{prefix}_RESPONSE, response)")
+    return [f"    {adapter}" for adapter in adapters] + ([""] if adapters else []) + lines
+
+def generate_client_tag_class_code(tag: DslTag, dsl_file: DslFile, options: CodegenOptions = CodegenOptions()) -> str:
+    lines = [f"class {client_class_name(tag.name)}(TagClient):",
+             f'    """Endpoints of `api tag {tag.name}`."""',
+             f'    prefix = "/{tag.name}"']
+    for endpoint in tag.endpoints:
+        lines.append("")
+        lines.extend(generate_client_method_code(tag, endpoint, dsl_file, options))
+    if tag.batch_max_requests is not None:
+        # Sub-requests get the batch request's headers, so it carries every requirement of the tag
+        requirements = list(dict.fromkeys(name for endpoint in tag.endpoints
+                                          for name in client_requirement_names(tag, endpoint, dsl_file)))
+        requirements_arg = "requirements=(" + "".join(f'"{name}", ' for name in requirements).rstrip(" ") + "), " \
+            if requirements else ""
+        lines.extend([
+            "",
+            "    async def batch(self, calls: List[Dict[str, Any]]) -> List[Dict[str, Any]]:",
+            f'        """Up to {tag.batch_max_requests} requests to this tag in one round trip, e.g. `{{"method": "GET", "path": "/..."}}`.',
+            '        Returns one `{"status", "headers", "body"}` result per call, in order."""',
+            f'        response = await self._send(self._build("POST", "/batch", {requirements_arg}json=calls))',
+            "        return response.json()",
+        ])
+    return "\n".join(lines)
+
+def generate_client_module_code(dsl_file: DslFile, version: str, options: CodegenOptions = CodegenOptions()) -> str:
+    """Generates client.py for the specific API version."""
+    requirement_keywords: Dict[str, str] = {} # ApiClient keyword -> Python type, first definition wins
+    requirement_rows = []
+    for name, complex_req in dsl_file.complex_requirements.items():
+        items = [("header", p) for p in complex_req.header_params] + [("query", p) for p in complex_req.query_params] \
+            + [("cookie", p) for p in complex_req.cookie_params]
+        for _, param in items:
+            requirement_keywords.setdefault(param.name.replace('-', '_'), param.py_type or "Any")
+        rows = "".join(f'("{kind}", "{p.name}", "{p.name.replace("-", "_")}"), ' for kind, p in items).rstrip(" ")
+        requirement_rows.append(f'    "{name}": ({rows}),')
+    requirements_code = "REQUIREMENTS = {\n" + "\n".join(requirement_rows) + "\n}" if requirement_rows else "REQUIREMENTS = {}"
+    tag_classes = [generate_client_tag_class_code(tag, dsl_file, options) for tag in dsl_file.tags]
+
+    init_args = ['self', 'base_url: str = "http://localhost:8000"', "*"]
+    init_args.extend(f"{keyword}: Optional[{py_type}] = None" for keyword, py_type in requirement_keywords.items())
+    init_args.extend(["http: Optional[httpx.AsyncClient] = None", "transport: Optional[httpx.AsyncBaseTransport] = None",
+                      "limits: httpx.Limits = DEFAULT_LIMITS", "timeout: httpx.Timeout = DEFAULT_TIMEOUT"])
+    values = ", ".join(f'"{keyword}": {keyword}' for keyword in requirement_keywords)
+    api_client = [
+        "class ApiClient:",
+        f'    """Client of API version {version}. Pass `http` to share a connection pool with other clients,',
+        '    or `transport` to send the requests elsewhere (e.g. `httpx.ASGITransport`)."""',
+        "",
+        f"    def __init__({', '.join(init_args)}):",
+        f"        self.requirement_values: Dict[str, Any] = {{{values}}} # Values of `req` items",
+        "        self._owns_http = http is None",
+        "        self.http = http or httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=timeout)",
+    ]
+    api_client.extend(f"        self.{Path(tag.py_module_name).stem} = {client_class_name(tag.name)}(self)" for tag in dsl_file.tags)
+    api_client.extend([
+        "",
+        "    @classmethod",
+        '    def for_app(cls, app: Any, **kwargs: Any) -> "ApiClient":',
+        '        """A client of the ASGI app itself, in-process (e.g. `main_app.app` in tests)."""',
+        '        return cls("http://testserver", transport=httpx.ASGITransport(app=app), **kwargs)',
+        "",
+        "    async def aclose(self) -> None:",
+        "        if self._owns_http:",
+        "            await self.http.aclose()",
+        "",
+        '    async def __aenter__(self) -> "ApiClient":',
+        "        return self",
+        "",
+        "    async def __aexit__(self, *exc_info: Any) -> None:",
+        "        await self.aclose()",
+    ])
+    module_code = CLIENT_MODULE_CODE.replace("$version", version).replace("REQUIREMENTS = {}", requirements_code, 1)
+    return module_code + "\n\n" + "\n\n\n".join(tag_classes + ["\n".join(api_client)]) + "\n"
+
+def generate_models_file_code(dsl_file: DslFile) -> str:
+    """Generates the content for the models.py file."""
+    code_parts = [part for part in (dsl_file.pydantic_models_code, dsl_file.type_definitions_code,
+                                    dsl_file.type_adapters_code) if part.strip()]
+    code = join_model_code([part.strip() for part in code_parts], separator="\n\n")
+
+    header = [TYPING_IMPORTS]
+    if dsl_file.type_definitions_code.startswith("class ") or "\nclass " in dsl_file.type_definitions_code:
+        # Struct fields may refer to the struct itself or to a later one, see type_adapters_code
+        header.insert(0, "from __future__ import annotations")
+    if "Annotated[" in code:
+        header.append("from typing import Annotated")
+    pydantic_names = ["BaseModel"] + [name for name in ("ConfigDict", "Field", "Strict", "TypeAdapter")
+                                      if re.search(rf"\b{name}\(", code)]
+    header.append(f"from pydantic import {', '.join(pydantic_names)}")
+    # Add custom imports from type definitions
+    if dsl_file.custom_imports_code:
+        header.append(dsl_file.custom_imports_code)
+
+    return join_model_code(["\n".join(header), code], separator="\n\n").strip()
+
+
+# --- Incremental Generation (Normally in a separate manifest.py) ---
+# The manifest lives next to .api.json and records, per tag, a hash of everything
+# `generate_tag_module_code` reads. A `-r` run only regenerates tags whose hash moved,
+# and no file is rewritten unless its bytes change (keeps mtimes and `--reload` quiet).
+
+MANIFEST_FILE_NAME = ".api.manifest.json"
+MANIFEST_FORMAT = 1
+
+_generator_hash_cache: Optional[str] = None
+
+def generator_fingerprint() -> str:
+    """Hash of this translator's source, so any codegen change invalidates the manifest."""
+    global _generator_hash_cache
+    if _generator_hash_cache is None:
+        _generator_hash_cache = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+    return _generator_hash_cache
+
+def _hash_json_payload(payload: Any) -> str:
+    # IR dicts are built in a fixed field order, so no key sorting is needed
+    encoded = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()
+
+def referenced_type_names(dsl_types: List[str], defined_types: Dict[str, DslTypeDefinition]) -> List[str]:
+    """Custom type names used by the given DSL type strings, following alias definitions."""
+    found = set()
+    pending = list(dsl_types)
+    while pending:
+        for ident in re.findall(r"[A-Za-z_]\w*", pending.pop()):
+            if ident in defined_types and ident not in found:
+                found.add(ident)
+                pending.append(defined_types[ident].definition)
+    return sorted(found)
+
+def endpoint_payload(endpoint: DslEndpoint) -> Dict[str, Any]:
+    # raw_definition only carries the source spelling, codegen never reads it
+    return {k: v for k, v in endpoint.to_dict().items() if k != "raw_definition"}
+
+def tag_fingerprint(tag: DslTag, dsl_file: DslFile, options: CodegenOptions = CodegenOptions()) -> str:
+    """Hashes the resolved IR of a tag: endpoints after `final_*` merging, the type
+    definitions they reference and the complex requirements applied to them."""
+    dsl_types = []
+    req_names = set(tag.complex_req_names)
+    for endpoint in tag.endpoints:
+        req_names.update(endpoint.complex_req_names)
+        for param_list in (endpoint.final_path_params, endpoint.final_query_params, endpoint.final_header_params,
+                           endpoint.final_cookie_params, endpoint.final_form_params,
+                           endpoint.final_response_headers, endpoint.final_response_cookies):
+            dsl_types.extend(p.dsl_type for p in param_list)
+        for body in (endpoint.final_request_body, endpoint.final_response_body):
+            if body and body.dsl_type:
+                dsl_types.append(body.dsl_type)
+
+    payload = {
+        "generator": generator_fingerprint(),
+        "options": options._asdict(),
+        "tag": {"name": tag.name, "py_module_name": tag.py_module_name, "complex_req_names": tag.complex_req_names,
+                "limits": tag.limits.to_dict() if tag.limits is not None else None,
+                "compression": tag.compression.to_dict() if tag.compression is not None else None,
+                "batch_max_requests": tag.batch_max_requests,
+                "endpoints": [endpoint_payload(endpoint) for endpoint in tag.endpoints]},
+        "types": {
+            name: dsl_file.type_definitions[name].to_dict()
+            for name in referenced_type_names(dsl_types, dsl_file.type_definitions)
+        },
+        "requirements": {
+            name: dsl_file.complex_requirements[name].to_dict()
+            for name in sorted(req_names) if name in dsl_file.complex_requirements
+        },
+    }
+    return _hash_json_payload(payload)
+
+def load_manifest(version_output_dir: Path) -> Dict[str, Any]:
+    """Reads the manifest of a version folder. A missing or foreign manifest is empty."""
+    manifest_path = version_output_dir / MANIFEST_FILE_NAME
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        return {"format": MANIFEST_FORMAT, "tags": {}}
+    if manifest.get("format") != MANIFEST_FORMAT or not isinstance(manifest.get("tags"), dict):
+        return {"format": MANIFEST_FORMAT, "tags": {}}
+    return manifest
+
+def save_manifest(version_output_dir: Path, manifest: Dict[str, Any]) -> bool:
+    manifest_code = json.dumps(manifest, indent=2, sort_keys=True) + "\n"
+    return write_file_if_changed(version_output_dir / MANIFEST_FILE_NAME, manifest_code)
+
+def write_generated_file(path: Path, content: str, overwrite: bool, announce: bool = True) -> bool:
+    """Writes a generated file if it is missing, or if `overwrite` is set and its bytes changed."""
+    if path.exists() and not overwrite:
+        return False
+    written = write_file_if_changed(path, content)
+    if written and announce:
+        print(f"Generated {path}")
+    return written
+
+def write_file_if_changed(path: Path, content: str) -> bool:
+    """Writes `content` unless the file already holds exactly these bytes. Returns True if written."""
+    new_bytes = content.encode("utf-8")
+    try:
+        if path.read_bytes() == new_bytes:
+            return False
+    except OSError:
+        pass
+    path.write_bytes(new_bytes)
+    return True
+
+
+# --- API Snapshots (Normally in a separate versions.py) ---
+# `.api.index.json` is a compact companion of `.api.json`: one entry per endpoint, keyed by
+# "METHOD /tag/path" (its URL below /api/<version>), with requirements already merged and every type normalized (aliases expanded,
+# primitives translated). The version decision only reads the latest version's index.
+
+API_INDEX_FILE_NAME = ".api.index.json"
+API_INDEX_FORMAT = 2
+
+_PARAM_KIND_PREFIXES = {"path": "p", "query": "q", "header": "h", "cookie": "c", "form_param": "f"}
+
+class TypeNormalizer:
+    """Renders DSL types in a canonical spelling, so that renaming an alias or spelling a type
+    differently is not reported as a change. External types are identified by their path."""
+
+    def __init__(self, defined_types: Dict[str, DslTypeDefinition]):
+        self.defined_types = defined_types
+        self._normalized: Dict[str, str] = {}
+        self._expanding: set = set() # Alias cycles were already reported by the resolver
+
+    def normalize(self, dsl_type: Optional[str]) -> Optional[str]:
+        if dsl_type is None:
+            return None
+        normalized = self._normalized.get(dsl_type)
+        if normalized is None:
+            try:
+                normalized = self._render(parse_dsl_type_expr(dsl_type))
+            except ValueError:
+                normalized = "Any"
+            self._normalized[dsl_type] = normalized
+        return normalized
+
+    def _render(self, expr: DslTypeExpr) -> str:
+        if expr.name == "()":
+            return f"({', '.join(self._render(arg) for arg in expr.args)})"
+        if expr.args:
+            return f"{expr.name}<{', '.join(self._render(arg) for arg in expr.args)}>"
+        type_def = self.defined_types.get(expr.name)
+        if type_def is None:
+            return translate_dsl_primitive_type_to_python(expr.name) or expr.name
+        if not type_def.is_alias:
+            return type_def.definition
+        if expr.name in self._expanding:
+            return "Any"
+        self._expanding.add(expr.name)
+        try:
+            return self.normalize(type_def.definition)
+        finally:
+            self._expanding.discard(expr.name)
+
+def build_api_index(dsl_file: DslFile) -> Dict[str, Any]:
+    """Compact, normalized snapshot of a resolved contract for breaking-change detection."""
+    normalizer = TypeNormalizer(dsl_file.type_definitions)
+
+    def params(param_lists: Tuple[List[DslParameter], ...]) -> Dict[str, str]:
+        entries = {}
+        for param_list in param_lists:
+            for param in param_list:
+                name = param.name.lower() if param.param_type == "header" else param.name
+                entries[f"{_PARAM_KIND_PREFIXES.get(param.param_type, param.param_type)}:{name}"] = normalizer.normalize(param.dsl_type)
+        return entries
+
+    def body(value: Optional[DslBody]) -> Optional[str]:
+        if value is None:
+            return None
+        if value.body_type == "file":
+            return f"file:{value.file_form_key}"
+        if value.dsl_type:
+            return f"{value.body_type}:{normalizer.normalize(value.dsl_type)}"
+        return value.body_type
+
+    endpoints = {}
+    for tag in dsl_file.tags:
+        for endpoint in tag.endpoints:
+            # Keyed by URL: moving an endpoint to another tag changes its prefix
+            endpoints[f"{endpoint.http_method.upper()} /{tag.name}{endpoint.path_template}"] = {
+                "in": params((endpoint.final_path_params, endpoint.final_query_params, endpoint.final_header_params,
+                              endpoint.final_cookie_params, endpoint.final_form_params)),
+                "body": body(endpoint.final_request_body),
+                "out": params((endpoint.final_response_headers, endpoint.final_response_cookies)),
+                "resp": body(endpoint.final_response_body),
+            }
+    return {"format": API_INDEX_FORMAT, "endpoints": endpoints}
+
+def dump_api_index(api_index: Dict[str, Any]) -> str:
+    return json.dumps(api_index, separators=(",", ":")) + "\n"
+
+def load_api_index(version_output_dir: Path) -> Optional[Dict[str, Any]]:
+    """Reads a version's index. Returns None if it is missing or has another format."""
+    try:
+        api_index = json.loads((version_output_dir / API_INDEX_FILE_NAME).read_text())
+    except (OSError, ValueError):
+        return None
+    if api_index.get("format") != API_INDEX_FORMAT or not isinstance(api_index.get("endpoints"), dict):
+        return None
+    return api_index
+
+def find_breaking_changes(old_index: Dict[str, Any], new_index: Dict[str, Any]) -> List[str]:
+    """Changes that break clients of the old contract, one pass over its endpoints.
+    New endpoints, removed incoming requirements, new optional incoming requirements, new
+    outgoing requirements and making an incoming type optional (or an outgoing one required)
+    are not breaking."""
+    breaking = []
+    new_endpoints = new_index["endpoints"]
+    for key, old in old_index["endpoints"].items():
+        new = new_endpoints.get(key)
+        if new is None:
+            breaking.append(f"{key}: endpoint removed")
+            continue
+        old_in = old["in"]
+        for name, py_type in new["in"].items():
+            if name not in old_in:
+                if not py_type.startswith("Option<"):
+                    breaking.append(f"{key}: new required incoming '{name}'")
+            elif old_in[name] != py_type and py_type != f"Option<{old_in[name]}>":
+                breaking.append(f"{key}: incoming '{name}' changed from {old_in[name]} to {py_type}")
+        if old["body"] != new["body"]:
+            breaking.append(f"{key}: request body changed from {old['body']} to {new['body']}")
+        new_out = new["out"]
+        for name, py_type in old["out"].items():
+            if name not in new_out:
+                breaking.append(f"{key}: outgoing '{name}' removed")
+            elif new_out[name] != py_type and py_type != f"Option<{new_out[name]}>":
+                breaking.append(f"{key}: outgoing '{name}' changed from {py_type} to {new_out[name]}")
+        if old["resp"] != new["resp"]:
+            breaking.append(f"{key}: response body changed from {old['resp']} to {new['resp']}")
+    return breaking
+
+
+# --- Parallel Code Generation (Normally in a separate codegen_pool.py) ---
+# A tag module depends only on the tag itself plus the shared type and requirement tables.
+# Workers receive those tables once, as a snapshot without tags or generated code, and then
+# generate and write one tag module per task.
+
+_worker_snapshot: Optional[DslFile] = None
+_worker_options = CodegenOptions()
+
+def shared_tables_snapshot(dsl_file: DslFile) -> DslFile:
+    """The read-only part of a DslFile that tag codegen needs, without tags or models code."""
+    return DslFile(type_definitions=dsl_file.type_definitions, complex_requirements=dsl_file.complex_requirements)
+
+def _init_codegen_worker(snapshot: DslFile, options: CodegenOptions) -> None:
+    global _worker_snapshot, _worker_options
+    _worker_snapshot = snapshot
+    _worker_options = options
+
+def _write_tag_module(tag: DslTag, tag_file_path: Path, dsl_file: DslFile,
+                      options: CodegenOptions) -> Tuple[Path, bool, Tuple[float, ...]]:
+    # Returns (wall, cpu) of codegen and of the write, for --timings
+    wall, cpu = time.perf_counter(), time.process_time()
+    module_code = generate_tag_module_code(tag, dsl_file, options)
+    codegen_wall, codegen_cpu = time.perf_counter(), time.process_time()
+    written = write_file_if_changed(tag_file_path, module_code)
+    spent = (codegen_wall - wall, codegen_cpu - cpu, time.perf_counter() - codegen_wall, time.process_time() - codegen_cpu)
+    return tag_file_path, written, spent
+
+def _codegen_worker(task: Tuple[DslTag, Path]) -> Tuple[Path, bool, Tuple[float, ...]]:
+    tag, tag_file_path = task
+    return _write_tag_module(tag, tag_file_path, _worker_snapshot, _worker_options)
+
+def write_tag_modules(tags: List[DslTag], dsl_file: DslFile, version_output_dir: Path, jobs: int = 1,
+                      timings: Optional["PhaseTimings"] = None,
+                      options: CodegenOptions = CodegenOptions()) -> List[Tuple[Path, bool]]:
+    """Generates and writes the modules of `tags`, in a process pool when `jobs` != 1.
+    Returns (path, written) pairs in tag order; unchanged files are not rewritten."""
+    tasks = [(tag, version_output_dir / tag.py_module_name) for tag in tags]
+    workers = min(jobs if jobs > 0 else (os.cpu_count() or 1), len(tasks))
+    if workers <= 1:
+        results = [_write_tag_module(tag, path, dsl_file, options) for tag, path in tasks]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_codegen_worker,
+                                 initargs=(shared_tables_snapshot(dsl_file), options)) as pool:
+            results = list(pool.map(_codegen_worker, tasks, chunksize=max(1, len(tasks) // (workers * 4))))
+
+    if timings is not None:
+        timings.counts["codegen_workers"] = max(workers, 1)
+        for (tag, _), (_, _, spent) in zip(tasks, results):
+            timings.add("codegen", spent[0], spent[1])
+            timings.add("write", spent[2], spent[3])
+            timings.tag_codegen[tag.name] = spent[0]
+    return [(path, written) for path, written, _ in results]
+
+
+# --- Instrumentation (Normally in a separate instrumentation.py) ---
+# `--timings` reports wall and CPU time per translator phase, contract counts and the slowest
+# tags to generate; `--profile` adds the tracemalloc peak and the top allocation sites.
+# With --jobs, codegen and write times are summed over the worker processes.
+
+class PhaseTimings:
+    """Accumulates wall/CPU time per phase and counters over one generation run."""
+
+    def __init__(self, trace_memory: bool = False):
+        self.phases: Dict[str, Dict[str, float]] = {}
+        self.counts: Dict[str, int] = {}
+        self.tag_codegen: Dict[str, float] = {}
+        self.trace_memory = trace_memory
+        self._started = (time.perf_counter(), time.process_time())
+        if trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+
+    @contextlib.contextmanager
+    def phase(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name: str, wall_s: float, cpu_s: float) -> None:
+        entry = self.phases.setdefault(name, {"wall_s": 0.0, "cpu_s": 0.0, "calls": 0})
+        entry["wall_s"] += wall_s
+        entry["cpu_s"] += cpu_s
+        entry["calls"] += 1
+
+    def count_contract(self, dsl_file: DslFile, dsl_paths: List[Path]) -> None:
+        endpoints = [endpoint for tag in dsl_file.tags for endpoint in tag.endpoints]
+        self.counts.update({
+            "files": len(dsl_paths),
+            "lines": sum(len(path.read_bytes().splitlines()) for path in dsl_paths),
+            "tags": len(dsl_file.tags),
+            "endpoints": len(endpoints),
+            "params": sum(len(e.final_path_params) + len(e.final_query_params) + len(e.final_header_params)
+                          + len(e.final_cookie_params) + len(e.final_form_params)
+                          + len(e.final_response_headers) + len(e.final_response_cookies) for e in endpoints),
+            "types": len(dsl_file.type_definitions),
+            "requirements": len(dsl_file.complex_requirements),
+        })
+
+    def report(self, slowest_tags: int = 10, top_allocations: int = 10) -> Dict[str, Any]:
+        wall, cpu = self._started
+        report: Dict[str, Any] = {
+            "phases": {name: dict(entry) for name, entry in self.phases.items()},
+            "total": {"wall_s": time.perf_counter() - wall, "cpu_s": time.process_time() - cpu},
+            "counts": dict(self.counts),
+            "slowest_tags": [
+                {"tag": name, "codegen_s": seconds}
+                for name, seconds in sorted(self.tag_codegen.items(), key=lambda item: -item[1])[:slowest_tags]
+            ],
+        }
+        if self.trace_memory:
+            import tracemalloc
+            if tracemalloc.is_tracing():
+                snapshot = tracemalloc.take_snapshot()
+                report["memory"] = {
+                    "peak_bytes": tracemalloc.get_traced_memory()[1],
+                    # Live allocations at the end of the run, i.e. what the run retains
+                    "top_allocations": [
+                        {"site": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                         "bytes": stat.size, "blocks": stat.count}
+                        for stat in snapshot.statistics("lineno")[:top_allocations]
+                    ],
+                }
+                tracemalloc.stop()
+        return report
+
+def format_timings_report(report: Dict[str, Any]) -> str:
+    lines = [f"{'phase':<14}{'wall ms':>11}{'cpu ms':>11}{'calls':>8}"]
+    for name, entry in report["phases"].items():
+        lines.append(f"{name:<14}{entry['wall_s'] * 1000:>11.2f}{entry['cpu_s'] * 1000:>11.2f}{entry['calls']:>8}")
+    total = report["total"]
+    lines.append(f"{'total':<14}{total['wall_s'] * 1000:>11.2f}{total['cpu_s'] * 1000:>11.2f}")
+    if report["counts"]:
+        lines.append("counts: " + ", ".join(f"{name}={value}" for name, value in report["counts"].items()))
+    if report["slowest_tags"]:
+        lines.append("slowest tags: " + ", ".join(f"{t['tag']} {t['codegen_s'] * 1000:.2f}ms" for t in report["slowest_tags"]))
+    memory = report.get("memory")
+    if memory:
+        lines.append(f"peak traced memory: {memory['peak_bytes'] / 1024:.1f} KiB; top allocation sites:")
+        lines.extend(f"  {a['bytes'] / 1024:>10.1f} KiB {a['blocks']:>7} blocks  {a['site']}" for a in memory["top_allocations"])
+    return "\n".join(lines)
+
+
+# --- Watch Mode (Normally in a separate watcher.py) ---
+# `--watch` keeps the resolved contract in memory and polls the input file and every file it
+# includes. A burst of saves is debounced into one rebuild; the new contract is diffed against
+# the held one per tag and per endpoint, and only the affected modules are regenerated.
+
+class WatchedContract(NamedTuple):
+    dsl_file: DslFile
+    paths: List[Path]
+    options: CodegenOptions
+    tag_hashes: Dict[str, str]
+    types_hash: str
+    requirements_hash: str
+    tag_modules: Tuple[Tuple[str, str], ...]
+
+class ContractDiff(NamedTuple):
+    added_tags: List[str]
+    removed_tags: List[str]
+    changed_tags: List[str]
+    endpoint_changes: Dict[str, Dict[str, int]]  # tag name -> {"added"/"removed"/"changed": count}
+    models_changed: bool
+    requirements_changed: bool
+    app_changed: bool
+
+    @property
+    def empty(self) -> bool:
+        return not (self.added_tags or self.removed_tags or self.changed_tags or self.models_changed
+                    or self.requirements_changed or self.app_changed)
+
+def snapshot_contract(dsl_file: DslFile, paths: List[Path], options: CodegenOptions = CodegenOptions(),
+                      tag_hashes: Optional[Dict[str, str]] = None) -> WatchedContract:
+    """Hashes a resolved contract per tag. `tag_hashes` reuses fingerprints already
+    computed by `generate_version`."""
+    tag_hashes = dict(tag_hashes or {})
+    for tag in dsl_file.tags:
+        if tag.name not in tag_hashes:
+            tag_hashes[tag.name] = tag_fingerprint(tag, dsl_file, options)
+    types_hash = _hash_json_payload([type_def.to_dict() for type_def in dsl_file.type_definitions.values()])
+    requirements_hash = _hash_json_payload([req.to_dict() for req in dsl_file.complex_requirements.values()])
+    tag_modules = tuple((tag.name, tag.py_module_name) for tag in dsl_file.tags)
+    return WatchedContract(dsl_file, paths, options, tag_hashes, types_hash, requirements_hash, tag_modules)
+
+def endpoint_hashes(tag: DslTag) -> Dict[str, str]:
+    return {f"{endpoint.http_method} {endpoint.path_template}": _hash_json_payload(endpoint_payload(endpoint))
+            for endpoint in tag.endpoints}
+
+def diff_contracts(old: WatchedContract, new: WatchedContract) -> ContractDiff:
+    added = [name for name in new.tag_hashes if name not in old.tag_hashes]
+    removed = [name for name in old.tag_hashes if name not in new.tag_hashes]
+    changed = [name for name, tag_hash in new.tag_hashes.items()
+               if name in old.tag_hashes and old.tag_hashes[name] != tag_hash]
+    # Endpoint-level hashes are only needed inside the tags whose fingerprint moved
+    old_tags = {tag.name: tag for tag in old.dsl_file.tags}
+    new_tags = {tag.name: tag for tag in new.dsl_file.tags}
+    endpoint_changes = {}
+    for name in changed:
+        old_endpoints, new_endpoints = endpoint_hashes(old_tags[name]), endpoint_hashes(new_tags[name])
+        endpoint_changes[name] = {
+            "added": sum(1 for key in new_endpoints if key not in old_endpoints),
+            "removed": sum(1 for key in old_endpoints if key not in new_endpoints),
+            "changed": sum(1 for key, digest in new_endpoints.items()
+                           if key in old_endpoints and old_endpoints[key] != digest),
+        }
+    return ContractDiff(added, removed, changed, endpoint_changes,
+                        models_changed=old.types_hash != new.types_hash,
+                        requirements_changed=old.requirements_hash != new.requirements_hash,
+                        app_changed=old.tag_modules != new.tag_modules)
+
+def describe_contract_diff(diff: ContractDiff) -> str:
+    parts = [f"+tag '{name}'" for name in diff.added_tags] + [f"-tag '{name}'" for name in diff.removed_tags]
+    for name in diff.changed_tags:
+        counts = diff.endpoint_changes[name]
+        detail = ", ".join(f"{count} {kind}" for kind, count in counts.items() if count)
+        parts.append(f"tag '{name}' ({detail} endpoint(s))" if detail else f"tag '{name}'")
+    if diff.models_changed:
+        parts.append("models")
+    if diff.requirements_changed:
+        parts.append("requirements")
+    return "; ".join(parts) or "tag order"
+
+def apply_contract_diff(new: WatchedContract, diff: ContractDiff, version_output_dir: Path, api_version_str: str,
+                        jobs: int = 1, timings: Optional[PhaseTimings] = None) -> None:
+    """Regenerates the files a diff touches: changed and added tag modules, models.py when a
+    type changed, requirements.py when a `req` block changed, main_app.py when the tag list
+    changed, plus loadtest.py, client.py, .api.json and the manifest."""
+    timings = timings or PhaseTimings()
+    dsl_file = new.dsl_file
+    if diff.models_changed:
+        with timings.phase("codegen"):
+            models_code = generate_models_file_code(dsl_file)
+        with timings.phase("write"):
+            write_generated_file(version_output_dir / "models.py", models_code, True)
+    if diff.requirements_changed:
+        with timings.phase("codegen"):
+            requirements_code = generate_requirements_module_code(dsl_file)
+        with timings.phase("write"):
+            write_generated_file(version_output_dir / "requirements.py", requirements_code, True)
+
+    affected = set(diff.added_tags) | set(diff.changed_tags)
+    pending_tags = [tag for tag in dsl_file.tags if tag.name in affected]
+    for tag_file_path, written in write_tag_modules(pending_tags, dsl_file, version_output_dir, jobs, timings, new.options):
+        if written:
+            print(f"Generated {tag_file_path}")
+
+    if diff.app_changed:
+        with timings.phase("codegen"):
+            main_app_code = generate_main_app_code(dsl_file, api_version_str, new.options)
+        with timings.phase("write"):
+            write_generated_file(version_output_dir / "main_app.py", main_app_code, True)
+
+    with timings.phase("codegen"):
+        loadtest_code = generate_loadtest_module_code(dsl_file, api_version_str, new.options)
+        client_code = generate_client_module_code(dsl_file, api_version_str, new.options)
+    with timings.phase("write"):
+        write_generated_file(version_output_dir / "loadtest.py", loadtest_code, True)
+        write_generated_file(version_output_dir / "client.py", client_code, True)
+    with timings.phase("api_json"):
+        write_generated_file(version_output_dir / ".api.json", dump_api_json(dsl_file), True)
+    with timings.phase("api_index"):
+        write_generated_file(version_output_dir / API_INDEX_FILE_NAME, dump_api_index(build_api_index(dsl_file)), True)
+    manifest = load_manifest(version_output_dir)
+    manifest["tags"] = {name: {"hash": new.tag_hashes[name], "module": module} for name, module in new.tag_modules}
+    save_manifest(version_output_dir, manifest)
+
+def stat_dsl_files(paths: List[Path]) -> Dict[Path, Optional[Tuple[int, int]]]:
+    stamps: Dict[Path, Optional[Tuple[int, int]]] = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+            stamps[path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            stamps[path] = None # Mid-save (rename) or deleted; picked up on a later poll
+    return stamps
+
+def wait_for_dsl_change(paths: List[Path], stamps: Dict[Path, Optional[Tuple[int, int]]],
+                        interval: float, debounce: float) -> Dict[Path, Optional[Tuple[int, int]]]:
+    """Blocks until a watched file changes, then until no file has changed for `debounce` seconds."""
+    while True:
+        time.sleep(interval)
+        current = stat_dsl_files(paths)
+        if current != stamps:
+            break
+    quiet_since = time.monotonic()
+    while time.monotonic() - quiet_since < debounce:
+        time.sleep(min(interval, debounce))
+        latest = stat_dsl_files(paths)
+        if latest != current:
+            current, quiet_since = latest, time.monotonic()
+    return current
+
+def watch_contract(input_file: Path, cache_dir: Optional[Path], version_output_dir: Path, api_version_str: str,
+                   held: WatchedContract, jobs: int = 1, interval: float = 0.25, debounce: float = 0.3,
+                   report_timings: Optional[str] = None, slowest_tags: int = 10) -> None:
+    """Polls the DSL files of `held` and regenerates what changed until interrupted."""
+    stamps = stat_dsl_files(held.paths)
+    print(f"Info: Watching {len(held.paths)} DSL file(s) for changes (Ctrl+C to stop)")
+    try:
+        while True:
+            stamps = wait_for_dsl_change(held.paths, stamps, interval, debounce)
+            started = time.perf_counter()
+            timings = PhaseTimings()
+            try:
+                dsl_file, paths = load_contract(input_file, cache_dir, timings)
+                new = snapshot_contract(dsl_file, paths, held.options)
+            except Exception as e: # Keep the held contract and wait for the next save
+                print(f"Error: Could not rebuild the contract: {e}")
+                continue
+            if paths != held.paths:
+                stamps = stat_dsl_files(paths)
+
+            diff = diff_contracts(held, new)
+            if diff.empty:
+                held = new
+                print("Info: No contract changes")
+                continue
+            apply_contract_diff(new, diff, version_output_dir, api_version_str, jobs, timings)
+            held = new
+            print(f"Rebuilt {describe_contract_diff(diff)} in {(time.perf_counter() - started) * 1000:.1f} ms")
+            if report_timings:
+                print_timings_report(timings, dsl_file, paths, report_timings, slowest_tags)
+    except KeyboardInterrupt:
+        print("Info: Watch stopped")
+
+
+# --- Batch Mode (Normally in a separate batch.py) ---
+# `--batch <manifest>` compiles many contracts in one run. Contracts are spread over worker
+# processes; each worker keeps its per-process caches (type expressions, import statements and
+# tag module headers) across the contracts it compiles, and all of them share one on-disk
+# fragment cache, so DSL files included by several contracts are parsed once.
+
+class BatchEntry(NamedTuple):
+    input: Path
+    output: Path
+    version: Optional[str] = None # As -v; None picks the version like a run without -v
+    regenerate: bool = False # As -r
+
+def load_batch_manifest(manifest_path: Path) -> List[BatchEntry]:
+    """Reads a JSON list of {"input", "output", "version"?, "regenerate"?} objects. Relative
+    paths are relative to the manifest's folder."""
+    base_dir = manifest_path.parent
+    entries = []
+    for number, item in enumerate(json.loads(manifest_path.read_text(encoding="utf-8")), 1):
+        if not isinstance(item, dict) or not item.get("input") or not item.get("output"):
+            raise ValueError(f"Entry {number} of '{manifest_path}' needs an input and an output")
+        entries.append(BatchEntry(base_dir / item["input"], base_dir / item["output"], item.get("version"),
+                                  bool(item.get("regenerate", False))))
+    return entries
+
+def compile_contract(entry: BatchEntry, cache_dir: Optional[Path], options: CodegenOptions) -> Dict[str, Any]:
+    """Runs one batch entry like `-i <input> -o <output> [-v <version>] [-r]`. The output is
+    captured; the result carries its warnings and errors, or the exception that stopped it."""
+    result: Dict[str, Any] = {"input": str(entry.input), "output": str(entry.output), "version": None, "ok": False,
+                              "error": None, "tags": 0, "endpoints": 0, "written": 0, "warnings": [], "errors": []}
+    start = time.perf_counter()
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            if not entry.input.exists():
+                raise FileNotFoundError(f"Input file '{entry.input}' not found")
+            parsed_dsl, _ = load_contract(entry.input, cache_dir, PhaseTimings())
+            api_index = build_api_index(parsed_dsl)
+            version, regenerate = decide_version(entry.output, entry.version, entry.regenerate, api_index)
+            result["version"] = version
+            generate_version(parsed_dsl, entry.output / version, version, regenerate, 1, None, api_index, options)
+        result["ok"] = True
+        result["tags"] = len(parsed_dsl.tags)
+        result["endpoints"] = sum(len(tag.endpoints) for tag in parsed_dsl.tags)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    lines = log.getvalue().splitlines()
+    result["written"] = sum(1 for line in lines if line.startswith("Generated "))
+    result["warnings"] = [line for line in lines if line.startswith("Warning:")]
+    result["errors"] = [line for line in lines if line.startswith("Error:")]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+_batch_cache_dir: Optional[Path] = None
+_batch_options = CodegenOptions()
+
+def _init_batch_worker(cache_dir: Optional[Path], options: CodegenOptions) -> None:
+    global _batch_cache_dir, _batch_options
+    _batch_cache_dir = cache_dir
+    _batch_options = options
+
+def _batch_worker(entry: BatchEntry) -> Dict[str, Any]:
+    return compile_contract(entry, _batch_cache_dir, _batch_options)
+
+def run_batch(entries: List[BatchEntry], jobs: int = 1, cache_dir: Optional[Path] = None,
+              options: CodegenOptions = CodegenOptions()) -> Dict[str, Any]:
+    """Compiles every entry, in a process pool when `jobs` != 1. Returns the aggregated report,
+    results in manifest order."""
+    start = time.perf_counter()
+    workers = min(jobs if jobs > 0 else (os.cpu_count() or 1), len(entries))
+    if workers <= 1:
+        results = [compile_contract(entry, cache_dir, options) for entry in entries]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker,
+                                 initargs=(cache_dir, options)) as pool:
+            results = list(pool.map(_batch_worker, entries)) # One contract per task: they differ a lot in size
+    failed = sum(1 for result in results if not result["ok"])
+    return {"contracts": len(results), "ok": len(results) - failed, "failed": failed, "workers": max(workers, 1),
+            "seconds": time.perf_counter() - start, "results": results}
+
+def format_batch_report(report: Dict[str, Any]) -> str:
+    lines = [f"Batch: {report['contracts']} contract(s), {report['ok']} ok, {report['failed']} failed "
+             f"in {report['seconds']:.2f} s ({report['workers']} worker(s))"]
+    for result in report["results"]:
+        if not result["ok"]:
+            lines.append(f"  FAILED {result['input']}: {result['error']}")
+            continue
+        notes = [f"{result['tags']} tags", f"{result['endpoints']} endpoints", f"{result['written']} written",
+                 f"{result['seconds']:.2f} s"]
+        if result["warnings"]:
+            notes.append(f"{len(result['warnings'])} warning(s)")
+        if result["errors"]:
+            notes.append(f"{len(result['errors'])} error(s)")
+        lines.append(f"  ok     {result['input']} -> {Path(result['output']) / result['version']} ({', '.join(notes)})")
+        lines.extend(f"         {line}" for line in result["errors"])
+    return "\n".join(lines)
+
+def main_batch(args: argparse.Namespace, options: CodegenOptions) -> int:
+    manifest_path = Path(args.batch)
+    try:
+        entries = load_batch_manifest(manifest_path)
+    except (OSError, ValueError) as e: # json.JSONDecodeError is a ValueError
+        print(f"Error: Could not read batch manifest '{manifest_path}': {e}")
+        return 2
+    cache_dir = None if args.no_cache else Path(args.cache_dir) if args.cache_dir else manifest_path.parent / ".skdsl-cache"
+    report = run_batch(entries, args.jobs, cache_dir, options)
+    if args.batch_report == "-":
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_batch_report(report))
+        if args.batch_report:
+            Path(args.batch_report).write_text(json.dumps(report, indent=2) + "\n")
+    return 1 if report["failed"] else 0
+
+
+# --- Main Script Logic ---
+def load_contract(input_file: Path, cache_dir: Optional[Path], timings: PhaseTimings) -> Tuple[DslFile, List[Path]]:
+    """Parses and resolves the contract. Returns it with every DSL file it was read from."""
+    with timings.phase("parse"):
+        parsed_dsl, dsl_paths = collect_dsl_files(input_file, cache_dir) # [cite: 31]
+    with timings.phase("types"):
+        resolver = resolve_type_definitions(parsed_dsl)
+        resolve_param_types(parsed_dsl, resolver)
+    with timings.phase("requirements"):
+        resolve_requirements(parsed_dsl)
+        resolve_cache_policies(parsed_dsl)
+        resolve_request_limits(parsed_dsl)
+    return parsed_dsl, dsl_paths
+
+def decide_version(output_dir: Path, requested_version: Optional[str], regenerate: bool,
+                   api_index: Optional[Dict[str, Any]] = None) -> Tuple[str, bool]:
+    """Picks the version folder to generate and whether existing files are rewritten.
+    Without -v/-r, the latest version is reused if the contract has no breaking changes
+    against its `.api.index.json`, and its changed files are rewritten as with -r (tag
+    modules by manifest hash, the other files only if their bytes differ); otherwise the
+    version is bumped."""
+    if requested_version:
+        return requested_version, regenerate
+
+    current_max_v = 0
+    if output_dir.is_dir():
+        for item in output_dir.iterdir():
+            if item.is_dir() and item.name.startswith("v"):
+                try:
+                    current_max_v = max(current_max_v, int(item.name[1:]))
+                except ValueError:
+                    pass
+    if current_max_v == 0:
+        return "v1", regenerate
+    latest = f"v{current_max_v}"
+    if regenerate: # Regenerating, use the highest existing version
+        return latest, regenerate
+
+    # Only the latest version's index is read: a contract compatible with it is compatible
+    # with everything that version already promised
+    previous_index = load_api_index(output_dir / latest)
+    if previous_index is None or api_index is None:
+        print(f"Info: {latest} has no {API_INDEX_FILE_NAME} of this skdsl-py, bumping the version")
+        return f"v{current_max_v + 1}", regenerate
+    breaking = find_breaking_changes(previous_index, api_index)
+    if not breaking:
+        print(f"Info: No breaking changes against {latest}, reusing it and rewriting its changed files")
+        return latest, True
+    print(f"Info: {len(breaking)} breaking change(s) against {latest}, bumping the version:")
+    for change in breaking[:10]:
+        print(f"  {change}")
+    if len(breaking) > 10:
+        print(f"  ... and {len(breaking) - 10} more")
+    return f"v{current_max_v + 1}", regenerate
+
+def generate_version(parsed_dsl: DslFile, version_output_dir: Path, api_version_str: str, regenerate: bool,
+                     jobs: int = 1, timings: Optional[PhaseTimings] = None,
+                     api_index: Optional[Dict[str, Any]] = None,
+                     options: CodegenOptions = CodegenOptions()) -> Dict[str, str]:
+    """Writes a version folder for the resolved contract. Returns the tag fingerprints."""
+    timings = timings or PhaseTimings()
     version_output_dir.mkdir(parents=True, exist_ok=True) # [cite: 33]
 
     # Generate models/types file (e.g., models.py inside version_output_dir)
-    models_code = generate_models_file_code(parsed_dsl)
+    with timings.phase("codegen"):
+        models_code = generate_models_file_code(parsed_dsl)
     models_file_path = version_output_dir / "models.py" # Or types.py
-    if not models_file_path.exists() or args.regenerate: # [cite: 34]
-         models_file_path.write_text(models_code)
-         print(f"Generated {models_file_path}")
-
+    with timings.phase("write"):
+        write_generated_file(models_file_path, models_code, regenerate) # [cite: 34]
 
     # Generate code for each tag [cite: 128]
+    # Only tags whose resolved IR hash differs from the manifest are regenerated.
+    manifest = load_manifest(version_output_dir)
+    previous_tags = manifest["tags"]
+    manifest["tags"] = {}
+    fingerprints: Dict[str, str] = {}
+    unchanged_tags = 0
+    pending_tags: List[DslTag] = []
     for tag in parsed_dsl.tags:
-        module_code = generate_tag_module_code(tag, parsed_dsl)
         tag_file_path = version_output_dir / tag.py_module_name
-        
-        if not tag_file_path.exists() or args.regenerate: # [cite: 34]
-            tag_file_path.write_text(module_code)
+        with timings.phase("fingerprint"):
+            fingerprint = tag_fingerprint(tag, parsed_dsl, options)
+        fingerprints[tag.name] = fingerprint
+        previous = previous_tags.get(tag.name, {})
+
+        if tag_file_path.exists() and not regenerate: # [cite: 34]
+            if previous:
+                manifest["tags"][tag.name] = previous
+            continue
+        if tag_file_path.exists() and previous.get("hash") == fingerprint and previous.get("module") == tag.py_module_name:
+            manifest["tags"][tag.name] = previous
+            unchanged_tags += 1
+            continue
+
+        pending_tags.append(tag)
+        manifest["tags"][tag.name] = {"hash": fingerprint, "module": tag.py_module_name}
+
+    for tag_file_path, written in write_tag_modules(pending_tags, parsed_dsl, version_output_dir, jobs, timings, options):
+        if written:
             print(f"Generated {tag_file_path}")
 
+    if unchanged_tags:
+        print(f"Skipped {unchanged_tags} unchanged tag module(s)")
+
     # Generate main app file for the version [cite: 129] (like mod.rs or a main FastAPI app)
-    main_app_code = generate_main_app_code(parsed_dsl, api_version_str)
+    with timings.phase("codegen"):
+        main_app_code = generate_main_app_code(parsed_dsl, api_version_str, options)
+        requirements_code = generate_requirements_module_code(parsed_dsl)
+        loadtest_code = generate_loadtest_module_code(parsed_dsl, api_version_str, options)
+        client_code = generate_client_module_code(parsed_dsl, api_version_str, options)
     main_app_file_path = version_output_dir / "main_app.py" # Name it appropriately
-    if not main_app_file_path.exists() or args.regenerate:
-        main_app_file_path.write_text(main_app_code)
-        print(f"Generated {main_app_file_path}")
-        
-    # Create __init__.py to make the folder a package
-    init_py_path = version_output_dir / "__init__.py"
-    if not init_py_path.exists() or args.regenerate:
-        init_py_path.write_text("# FastAPI routes for version " + api_version_str + "\n")
+    with timings.phase("write"):
+        write_generated_file(main_app_file_path, main_app_code, regenerate)
+        write_generated_file(version_output_dir / "requirements.py", requirements_code, regenerate)
+        write_generated_file(version_output_dir / "loadtest.py", loadtest_code, regenerate)
+        write_generated_file(version_output_dir / "client.py", client_code, regenerate)
+
+        write_generated_file(version_output_dir / "runtime.py", generate_runtime_module_code(), regenerate)
+
+        # Create __init__.py to make the folder a package
+        init_py_path = version_output_dir / "__init__.py"
+        write_generated_file(init_py_path, "# FastAPI routes for version " + api_version_str + "\n", regenerate, announce=False)
 
     # Write .api.json (serialized DSL structure for versioning) [cite: 35]
     # This is useful for `no_breaking_changes` logic if implemented.
     api_json_path = version_output_dir / ".api.json"
-    if not api_json_path.exists() or args.regenerate:
-        try:
-            api_json_path.write_text(parsed_dsl.model_dump_json(indent=2))
-            print(f"Generated {api_json_path}")
-        except Exception as e:
-            print(f"Could not serialize DSL to JSON: {e}")
+    try:
+        with timings.phase("api_json"):
+            write_generated_file(api_json_path, dump_api_json(parsed_dsl), regenerate)
+    except Exception as e:
+        print(f"Could not serialize DSL to JSON: {e}")
+    with timings.phase("api_index"):
+        api_index_code = dump_api_index(api_index if api_index is not None else build_api_index(parsed_dsl))
+        write_generated_file(version_output_dir / API_INDEX_FILE_NAME, api_index_code, regenerate)
 
+    save_manifest(version_output_dir, manifest)
+    return fingerprints
+
+def print_timings_report(timings: PhaseTimings, dsl_file: DslFile, dsl_paths: List[Path], report_format: str,
+                         slowest_tags: int) -> None:
+    timings.count_contract(dsl_file, dsl_paths)
+    report = timings.report(slowest_tags=slowest_tags)
+    if report_format == "json":
+        print(json.dumps(report, indent=2), file=sys.stderr)
+    else:
+        print(format_timings_report(report), file=sys.stderr)
+
+def main():
+    # CLI arguments
+    parser = argparse.ArgumentParser(description="DSL to FastAPI Translator")
+    parser.add_argument("-i", "--input", help="Input DSL file")
+    parser.add_argument("-o", "--output", help="Output folder for generated code")
+    parser.add_argument("-v", "--version", help="API version (e.g., v1). If not set, the latest version is reused unless the DSL breaks it.")
+    parser.add_argument("-r", "--regenerate", action="store_true", help="Don't bump version, regenerate files whose DSL changed.")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Worker processes for tag code generation, or for contracts with --batch (0 = one per CPU).")
+    parser.add_argument("--batch", metavar="MANIFEST",
+                        help="Compile every contract of a JSON manifest ([{\"input\", \"output\", \"version\"?, \"regenerate\"?}]) instead of -i/-o.")
+    parser.add_argument("--batch-report", metavar="FILE", help="Also write the --batch report as JSON to this file ('-' for stdout only).")
+    parser.add_argument("--cache-dir", help="Folder for cached per-file parse results (default: <output>/.skdsl-cache, or next to the --batch manifest)")
+    parser.add_argument("--no-cache", action="store_true", help="Parse every DSL file from scratch.")
+    parser.add_argument("--timings", nargs="?", const="text", choices=["text", "json"],
+                        help="Report per-phase wall/CPU time and counts on stderr (text or json).")
+    parser.add_argument("--profile", action="store_true", help="Like --timings, plus tracemalloc peak and top allocation sites.")
+    parser.add_argument("--slowest", type=int, default=10, help="Number of slowest tags listed by --timings.")
+    parser.add_argument("--fast-json", action="store_true",
+                        help="Validate JSON bodies from raw bytes and dump responses with module-level TypeAdapters.")
+    parser.add_argument("--stream-files", action="store_true",
+                        help="Stream b/file uploads as raw body chunks and b/file responses with Range support.")
+    parser.add_argument("--file-chunk-size", type=int, default=64 * 1024,
+                        help="Chunk size in bytes of streamed b/file responses (default 65536).")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Record per-route request counts, latency histograms and response sizes, served on /api/<version>/metrics.")
+    parser.add_argument("--lazy-routers", action="store_true",
+                        help="Import each tag module (and the models) on the first request under its prefix instead of at startup.")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Keep running and regenerate changed tags when the DSL files change (implies -r).")
+    parser.add_argument("--poll-interval", type=float, default=0.25, help="Seconds between file checks in --watch mode.")
+    parser.add_argument("--debounce", type=float, default=0.3,
+                        help="Seconds without further changes before --watch rebuilds.")
+    args = parser.parse_args()
+    if args.batch and args.watch:
+        parser.error("--watch cannot be combined with --batch")
+    if not args.batch and not (args.input and args.output):
+        parser.error("the following arguments are required: -i/--input, -o/--output (or --batch)")
+    if args.watch:
+        args.regenerate = True
+    timings = PhaseTimings(trace_memory=args.profile)
+    options = CodegenOptions(fast_json=args.fast_json, stream_files=args.stream_files,
+                             file_chunk_size=args.file_chunk_size, metrics=args.metrics,
+                             lazy_routers=args.lazy_routers)
+
+    if args.batch:
+        sys.exit(main_batch(args, options))
+
+    input_file = Path(args.input)
+    output_dir = Path(args.output)
+    
+    if not input_file.exists():
+        print(f"Error: Input file '{input_file}' not found.")
+        return
+
+    cache_dir = None if args.no_cache else Path(args.cache_dir) if args.cache_dir else output_dir / ".skdsl-cache"
+    parsed_dsl, dsl_paths = load_contract(input_file, cache_dir, timings)
+
+    with timings.phase("api_index"):
+        api_index = build_api_index(parsed_dsl)
+    with timings.phase("version"):
+        api_version_str, regenerate = decide_version(output_dir, args.version, args.regenerate, api_index)
+    version_output_dir = output_dir / api_version_str
+    fingerprints = generate_version(parsed_dsl, version_output_dir, api_version_str, regenerate, args.jobs, timings,
+                                    api_index, options)
 
     print(f"FastAPI code generated in {version_output_dir}") # [cite: 36]
 
+    report_format = args.timings or ("text" if args.profile else None)
+    if report_format:
+        print_timings_report(timings, parsed_dsl, dsl_paths, report_format, args.slowest)
+
+    if args.watch:
+        held = snapshot_contract(parsed_dsl, dsl_paths, options, fingerprints)
+        watch_contract(input_file, cache_dir, version_output_dir, api_version_str, held, args.jobs,
+                       args.poll_interval, args.debounce, args.timings, args.slowest)
+
 if __name__ == "__main__":
     main()
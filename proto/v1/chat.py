@@ -1,26 +1,28 @@
-from fastapi import APIRouter, Query, Header, Cookie, File, Form, UploadFile, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Query, Header, Cookie, Body, File, Form, UploadFile, Depends, HTTPException, status, Request, Response
 from fastapi.responses import PlainTextResponse, HTMLResponse, FileResponse
-from typing import List, Dict, Optional, Any
-from ..models import * # Assuming generated types/models are in ..models.py or similar
+from typing import List, Dict, Optional, Any, Tuple
+from .models import * # Generated types/models of this version
+from .runtime import SkdslRoute, MsgPackResponse, route_options
+from .requirements import TokensRequirement
 
-router = APIRouter()
+router = APIRouter(route_class=SkdslRoute, dependencies=[Depends(TokensRequirement)])
 
 @router.get("/chats", response_model=List[ChatData], tags=["Chat"])
-async def get_chats(chat_id: int = Query(..., description="chat_id query"), X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+async def get_chats(chat_id: int = Query(..., description="chat_id query")):
     # TODO: Implement logic and return data for List[ChatData]
     pass
 
 
 
-@router.get("/chat/{u64/id}", response_model=ChatData, tags=["Chat"])
-async def get_chat_u64_id(X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+@router.get("/chat/{id}", response_model=ChatData, tags=["Chat"])
+async def get_chat_by_id(id: int):
     # TODO: Implement logic and return data for ChatData
     pass
 
 
 
-@router.post("/chat/{u64/id}/audio-request", tags=["Chat"])
-async def post_chat_u64_id_audio-request(audio: UploadFile = File(...), X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+@router.post("/chat/{id}/audio-request", tags=["Chat"])
+async def post_chat_by_id_audio_request(id: int, audio: UploadFile = File(...)):
     return None # HTTP 200 OK or 204 No Content implicitly
 
 
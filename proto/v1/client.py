@@ -0,0 +1,185 @@
+"""Async client of API version v1 (generated by skdsl-py).
+
+`ApiClient` owns one pooled, keep-alive `httpx.AsyncClient` and has a client per tag as
+attribute (e.g. `api.users`), with a method per endpoint named like its handler. Values
+of `req` items, e.g. access tokens, are given once to `ApiClient` and sent with every
+endpoint that requires them. Non-2xx responses raise `httpx.HTTPStatusError`.
+
+    async with ApiClient("http://users-service:8000", x_access=token) as api:
+        answer = await api.users.post_sign_in(payload=hello, user_id=1)
+
+    async with ApiClient.for_app(app) as api: # In-process, through httpx's ASGI transport
+        ...
+"""
+import contextlib
+from typing import Any, AsyncIterator, Dict, IO, List, Optional, Sequence, Tuple, Union
+from urllib.parse import quote
+
+import httpx
+from pydantic import TypeAdapter
+
+from .models import * # Generated types/models of this version
+
+try:
+    import msgpack
+except ImportError: # b/msgpack endpoints then exchange JSON, which the server accepts too
+    msgpack = None
+
+API_PREFIX = "/api/v1"
+# Connections are kept alive and reused across calls (and tags) of one ApiClient
+DEFAULT_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30.0)
+DEFAULT_TIMEOUT = httpx.Timeout(10.0)
+JSON_MEDIA_TYPE = "application/json"
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+
+REQUIREMENTS = {
+    "tokens": (("header", "X-Access", "X_Access"), ("header", "X-Refresh", "X_Refresh"), ("header", "X-Client", "X_Client"),),
+    "master": (("header", "X-Access", "X_Access"), ("header", "X-Refresh", "X_Refresh"), ("header", "X-Client", "X_Client"),),
+    "slave": (("cookie", "gitlab_session", "gitlab_session"),),
+}
+
+
+def path_segment(value: Any, rest: bool = False) -> str:
+    """A path parameter, percent-encoded. `{**rest}` parameters keep their slashes."""
+    return quote(str(value), safe="/" if rest else "")
+
+
+def encode_body(adapter: TypeAdapter, payload: Any, as_msgpack: bool = False) -> Tuple[bytes, str]:
+    if as_msgpack and msgpack is not None:
+        return msgpack.packb(adapter.dump_python(payload, mode="json", by_alias=True), use_bin_type=True), MSGPACK_MEDIA_TYPE
+    return adapter.dump_json(payload, by_alias=True), JSON_MEDIA_TYPE
+
+
+def decode_body(adapter: TypeAdapter, response: httpx.Response) -> Any:
+    if response.headers.get("content-type", "").split(";")[0].strip() == MSGPACK_MEDIA_TYPE:
+        return adapter.validate_python(msgpack.unpackb(response.content, raw=False))
+    return adapter.validate_json(response.content)
+
+
+class TagClient:
+    """Base of the tag clients. Requests go through the connection pool of the ApiClient."""
+    prefix = ""
+
+    def __init__(self, api: "ApiClient"):
+        self._api = api
+
+    def _build(self, method: str, path: str, requirements: Sequence[str] = (), params: Optional[Dict[str, Any]] = None,
+               headers: Optional[Dict[str, Any]] = None, cookies: Optional[Dict[str, Any]] = None,
+               **kwargs: Any) -> httpx.Request:
+        params = {name: value for name, value in (params or {}).items() if value is not None}
+        headers = {name: str(value) for name, value in (headers or {}).items() if value is not None}
+        cookies = {name: str(value) for name, value in (cookies or {}).items() if value is not None}
+        for requirement in requirements:
+            for kind, name, keyword in REQUIREMENTS[requirement]:
+                value = self._api.requirement_values.get(keyword)
+                if value is not None:
+                    target = {"header": headers, "query": params, "cookie": cookies}[kind]
+                    target.setdefault(name, value if kind == "query" else str(value))
+        if cookies: # Per-request cookies of httpx are deprecated
+            headers["Cookie"] = "; ".join(f"{name}={value}" for name, value in cookies.items())
+        return self._api.http.build_request(method, f"{API_PREFIX}{self.prefix}{path}", params=params,
+                                            headers=headers, **kwargs)
+
+    async def _send(self, request: httpx.Request) -> httpx.Response:
+        response = await self._api.http.send(request)
+        response.raise_for_status()
+        return response
+
+    @contextlib.asynccontextmanager
+    async def _stream(self, request: httpx.Request) -> AsyncIterator[httpx.Response]:
+        response = await self._api.http.send(request, stream=True)
+        try:
+            if response.is_error:
+                await response.aread()
+                response.raise_for_status()
+            yield response
+        finally:
+            await response.aclose()
+
+
+class UsersClient(TagClient):
+    """Endpoints of `api tag users`."""
+    prefix = "/users"
+
+    POST_SIGN_IN_BODY = TypeAdapter(HelloData)
+    POST_SIGN_IN_RESPONSE = TypeAdapter(AnswerData)
+
+    async def post_sign_in(self, *, payload: HelloData, user_id: int, X_Sign: Optional[str] = None) -> AnswerData:
+        """`api post/sign-in h/str/X-Sign b/json/HelloData q/i64/user_id                                        -> b/json/AnswerData`"""
+        content, content_type = encode_body(self.POST_SIGN_IN_BODY, payload)
+        response = await self._send(self._build("POST", "/sign-in", content=content, params={"user_id": user_id}, headers={"X-Sign": X_Sign, "Content-Type": content_type, "Accept": "application/json"}))
+        return decode_body(self.POST_SIGN_IN_RESPONSE, response)
+
+    PATCH_CHANGE_PASSWORD_BODY = TypeAdapter(UserChangePassReq)
+
+    async def patch_change_password(self, *, payload: UserChangePassReq, X_Access: Optional[str] = None, X_Refresh: Optional[str] = None, X_Client: Optional[str] = None) -> None:
+        """`api patch/change-password h/str/X-Access h/str/X-Refresh h/str/X-Client b/msgpack/UserChangePassReq -> ok`"""
+        content, content_type = encode_body(self.PATCH_CHANGE_PASSWORD_BODY, payload, as_msgpack=True)
+        await self._send(self._build("PATCH", "/change-password", content=content, headers={"X-Access": X_Access, "X-Refresh": X_Refresh, "X-Client": X_Client, "Content-Type": content_type}))
+
+
+class ChatClient(TagClient):
+    """Endpoints of `api tag chat`."""
+    prefix = "/chat"
+
+    GET_CHATS_RESPONSE = TypeAdapter(List[ChatData])
+
+    async def get_chats(self, *, chat_id: int) -> List[ChatData]:
+        """`api get/chats q/i64/chat_id                       -> b/json/Vec<ChatData>`"""
+        response = await self._send(self._build("GET", "/chats", requirements=("tokens",), params={"chat_id": chat_id}, headers={"Accept": "application/json"}))
+        return decode_body(self.GET_CHATS_RESPONSE, response)
+
+    GET_CHAT_BY_ID_RESPONSE = TypeAdapter(ChatData)
+
+    async def get_chat_by_id(self, id: int) -> ChatData:
+        """`api get/chat/{u64/id}                             -> b/json/ChatData`"""
+        response = await self._send(self._build("GET", f"/chat/{path_segment(id)}", requirements=("tokens",), headers={"Accept": "application/json"}))
+        return decode_body(self.GET_CHAT_BY_ID_RESPONSE, response)
+
+    async def post_chat_by_id_audio_request(self, id: int, *, audio: Union[bytes, IO[bytes], Tuple[str, Any, str]]) -> None:
+        """`api post/chat/{u64/id}/audio-request b/file/audio -> ok`"""
+        await self._send(self._build("POST", f"/chat/{path_segment(id)}/audio-request", requirements=("tokens",), files={"audio": audio}))
+
+
+class TestClient(TagClient):
+    """Endpoints of `api tag test`."""
+    prefix = "/test"
+
+    async def get_test(self) -> None:
+        """`api req/master get/test                   -> ok c/X-Sign`"""
+        await self._send(self._build("GET", "/test", requirements=("master",)))
+
+    POST_AUDIO_RESPONSE = ComplexAliasTypeAdapter
+
+    async def post_audio(self, *, audio: List[int]) -> ComplexAliasType:
+        """`api req/slave  post/audio f/Vec<u8>/audio -> b/msgpack/ComplexAliasType`"""
+        response = await self._send(self._build("POST", "/audio", requirements=("slave",), data={"audio": audio}, headers={"Accept": MSGPACK_MEDIA_TYPE if msgpack is not None else JSON_MEDIA_TYPE}))
+        return decode_body(self.POST_AUDIO_RESPONSE, response)
+
+
+class ApiClient:
+    """Client of API version v1. Pass `http` to share a connection pool with other clients,
+    or `transport` to send the requests elsewhere (e.g. `httpx.ASGITransport`)."""
+
+    def __init__(self, base_url: str = "http://localhost:8000", *, X_Access: Optional[str] = None, X_Refresh: Optional[str] = None, X_Client: Optional[str] = None, gitlab_session: Optional[str] = None, http: Optional[httpx.AsyncClient] = None, transport: Optional[httpx.AsyncBaseTransport] = None, limits: httpx.Limits = DEFAULT_LIMITS, timeout: httpx.Timeout = DEFAULT_TIMEOUT):
+        self.requirement_values: Dict[str, Any] = {"X_Access": X_Access, "X_Refresh": X_Refresh, "X_Client": X_Client, "gitlab_session": gitlab_session} # Values of `req` items
+        self._owns_http = http is None
+        self.http = http or httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=timeout)
+        self.users = UsersClient(self)
+        self.chat = ChatClient(self)
+        self.test = TestClient(self)
+
+    @classmethod
+    def for_app(cls, app: Any, **kwargs: Any) -> "ApiClient":
+        """A client of the ASGI app itself, in-process (e.g. `main_app.app` in tests)."""
+        return cls("http://testserver", transport=httpx.ASGITransport(app=app), **kwargs)
+
+    async def aclose(self) -> None:
+        if self._owns_http:
+            await self.http.aclose()
+
+    async def __aenter__(self) -> "ApiClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.aclose()
@@ -0,0 +1,183 @@
+"""In-process load test of API version v1 (generated by skdsl-py).
+
+Sends requests to every endpoint of `main_app.app` through httpx's ASGI transport, so no
+server or network is involved. Inputs are synthetic but valid: path, query, header and
+cookie values, form fields and JSON bodies are sampled from the types of the DSL. Reports
+requests per second and p50/p99 latency per endpoint.
+
+    python -m v1.loadtest --requests 500
+    python -m v1.loadtest --json v1.json
+    python -m <next version>.loadtest --baseline v1.json
+"""
+import argparse
+import asyncio
+import enum
+import json
+import sys
+import time
+import types
+import typing
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple, Union, get_args, get_origin
+
+import httpx
+from pydantic import BaseModel
+
+from .main_app import app
+from .models import * # Generated types/models of this version
+
+
+class LoadCase(NamedTuple):
+    tag: str
+    endpoint: str # DSL func_name
+    method: str
+    path: str # With {name} placeholders for the path parameters
+    path_params: Dict[str, Any] # Name -> Python type, like the other mappings
+    query: Dict[str, Any]
+    headers: Dict[str, Any] # The endpoint's own headers and those of its requirements
+    cookies: Dict[str, Any]
+    body_kind: Optional[str] # "json", "form", "raw" or "file:<form key>"
+    body_type: Any
+
+
+CASES = [
+    LoadCase("users", "post_sign_in", "POST", "/api/v1/users/sign-in", {}, {"user_id": int}, {"X-Sign": str}, {}, "json", HelloData),
+    LoadCase("users", "patch_change_password", "PATCH", "/api/v1/users/change-password", {}, {}, {"X-Access": str, "X-Refresh": str, "X-Client": str}, {}, "json", UserChangePassReq),
+    LoadCase("chat", "get_chats", "GET", "/api/v1/chat/chats", {}, {"chat_id": int}, {"X-Access": str, "X-Refresh": str, "X-Client": str}, {}, None, None),
+    LoadCase("chat", "get_chat_by_id", "GET", "/api/v1/chat/chat/{id}", {"id": int}, {}, {"X-Access": str, "X-Refresh": str, "X-Client": str}, {}, None, None),
+    LoadCase("chat", "post_chat_by_id_audio_request", "POST", "/api/v1/chat/chat/{id}/audio-request", {"id": int}, {}, {"X-Access": str, "X-Refresh": str, "X-Client": str}, {}, "file:audio", None),
+    LoadCase("test", "get_test", "GET", "/api/v1/test/test", {}, {}, {"X-Access": str, "X-Refresh": str, "X-Client": str}, {}, None, None),
+    LoadCase("test", "post_audio", "POST", "/api/v1/test/audio", {}, {}, {}, {"gitlab_session": str}, "form", {"audio": List[int]}),
+]
+
+
+def sample(tp: Any, depth: int = 0) -> Any:
+    """A valid value of `tp`: the first member of unions, literals and enums, one item per container."""
+    origin, args = get_origin(tp), get_args(tp)
+    if origin is typing.Annotated:
+        return sample(args[0], depth)
+    if origin in (Union, types.UnionType):
+        return sample(next((arg for arg in args if arg is not type(None)), str), depth)
+    if origin is typing.Literal:
+        return args[0]
+    if origin in (list, set, frozenset, tuple):
+        if origin is tuple and args and args[-1] is not Ellipsis:
+            return [sample(arg, depth + 1) for arg in args]
+        return [sample(args[0], depth + 1)] if args and depth < 4 else []
+    if origin is dict:
+        return {str(sample(args[0], depth + 1)): sample(args[1], depth + 1)} if args and depth < 4 else {}
+    if isinstance(tp, type):
+        if issubclass(tp, BaseModel):
+            return {field.alias or name: sample(field.annotation, depth + 1) for name, field in tp.model_fields.items()}
+        if issubclass(tp, enum.Enum):
+            return next(iter(tp)).value
+        if issubclass(tp, bool):
+            return True
+        if issubclass(tp, int):
+            return 1
+        if issubclass(tp, float):
+            return 1.5
+    return "sample"
+
+
+def as_texts(value: Any) -> List[str]:
+    """Query, form and header text of a sampled value; lists repeat the key."""
+    values = value if isinstance(value, list) else [value]
+    return [json.dumps(item) if not isinstance(item, str) else item for item in values]
+
+
+def build_request(case: LoadCase) -> Tuple[str, Dict[str, Any]]:
+    path = case.path.format(**{name: as_texts(sample(tp))[0] for name, tp in case.path_params.items()})
+    headers = {name: as_texts(sample(tp))[0] for name, tp in case.headers.items()}
+    if case.cookies:
+        headers["Cookie"] = "; ".join(f"{name}={as_texts(sample(tp))[0]}" for name, tp in case.cookies.items())
+    request: Dict[str, Any] = {"params": [(name, text) for name, tp in case.query.items() for text in as_texts(sample(tp))],
+                               "headers": headers}
+    if case.body_kind == "json":
+        request["json"] = sample(case.body_type)
+    elif case.body_kind == "form":
+        request["data"] = {name: as_texts(sample(tp)) for name, tp in case.body_type.items()}
+    elif case.body_kind == "raw":
+        request["content"] = b"sample" * 1024
+        headers["Content-Type"] = "application/octet-stream"
+    elif case.body_kind and case.body_kind.startswith("file:"):
+        request["files"] = {case.body_kind[len("file:"):]: ("sample.bin", b"sample" * 1024, "application/octet-stream")}
+    return path, request
+
+
+def percentile(sorted_samples: List[float], fraction: float) -> float:
+    return sorted_samples[min(len(sorted_samples) - 1, int(round(fraction * (len(sorted_samples) - 1))))]
+
+
+async def run_case(client: httpx.AsyncClient, case: LoadCase, requests: int, warmup: int,
+                   concurrency: int) -> Dict[str, Any]:
+    path, request = build_request(case)
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+
+    async def send(record: bool) -> None:
+        start = time.perf_counter()
+        response = await client.request(case.method, path, **request)
+        if record:
+            latencies.append(time.perf_counter() - start)
+            statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+
+    for _ in range(warmup):
+        await send(False)
+    start = time.perf_counter()
+    for offset in range(0, requests, concurrency):
+        await asyncio.gather(*(send(True) for _ in range(min(concurrency, requests - offset))))
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {"tag": case.tag, "endpoint": case.endpoint, "method": case.method, "path": path,
+            "requests": requests, "statuses": statuses, "rps": requests / elapsed,
+            "p50_ms": percentile(latencies, 0.5) * 1000, "p99_ms": percentile(latencies, 0.99) * 1000}
+
+
+async def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    cases = [case for case in CASES if not args.match or args.match in f"{case.tag}.{case.endpoint}"]
+    transport = httpx.ASGITransport(app=app, raise_app_exceptions=False) # Handler errors count as 500s
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+        return [await run_case(client, case, args.requests, args.warmup, args.concurrency) for case in cases]
+
+
+def format_report(results: List[Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], max_slowdown: float) -> str:
+    lines = [f"{'endpoint':<40}{'statuses':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}"]
+    for result in results:
+        key = f"{result['tag']}.{result['endpoint']}"
+        statuses = ",".join(f"{code}x{count}" for code, count in sorted(result["statuses"].items()))
+        line = f"{key:<40}{statuses:<16}{result['rps']:>10.0f}{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}"
+        previous = baseline.get(key)
+        if previous:
+            ratio = result["p50_ms"] / previous["p50_ms"]
+            line += f"  p50 {ratio:.2f}x baseline" + ("  SLOWER" if ratio > max_slowdown else "")
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="In-process load test of the generated endpoints")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=20, help="Untimed requests per endpoint")
+    parser.add_argument("--concurrency", type=int, default=1, help="Requests in flight per endpoint")
+    parser.add_argument("--match", help="Only endpoints whose '<tag>.<func_name>' contains this")
+    parser.add_argument("--json", help="Write the results to this file ('-' for stdout)")
+    parser.add_argument("--baseline", help="Results of an earlier run (--json) to compare p50 latency with")
+    parser.add_argument("--max-slowdown", type=float, default=1.25, help="p50 ratio flagged as SLOWER")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+        return 0
+    baseline = {}
+    if args.baseline:
+        baseline = {f"{r['tag']}.{r['endpoint']}": r for r in json.loads(Path(args.baseline).read_text())}
+    print(format_report(results, baseline, args.max_slowdown))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
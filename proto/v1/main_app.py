@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 
-app = FastAPI(title="Generated API", version=f"{version}")
+app = FastAPI(title="Generated API", version="v1")
 
 from .users import router as users_router
 app.include_router(users_router, prefix='/api/v1/users')
@@ -1,8 +1,10 @@
-from typing import List, Dict, Optional, Any
-from pydantic import BaseModel
+from typing import List, Dict, Optional, Any, Tuple
+from pydantic import BaseModel, TypeAdapter
 from crate.api.types import AnswerData
 from crate.api.types import ChatData
 from crate.api.types import HelloData
 from crate.api.types import UserChangePasswordRequest as UserChangePassReq
 
-ComplexAliasType = Dict[str, int]
\ No newline at end of file
+ComplexAliasType = Dict[str, int]
+
+ComplexAliasTypeAdapter = TypeAdapter(ComplexAliasType)
\ No newline at end of file
@@ -0,0 +1,38 @@
+from fastapi import Query, Header, Cookie, Request
+from typing import List, Dict, Optional, Any, Tuple
+from .models import * # Generated types/models of this version
+from .runtime import Requirement
+
+
+class TokensRequirement(Requirement):
+    """`req tokens`: headers X-Access, X-Refresh, X-Client"""
+
+    def __init__(self, request: Request, X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+        super().__init__(request)
+        self.X_Access = X_Access
+        self.X_Refresh = X_Refresh
+        self.X_Client = X_Client
+
+
+class MasterRequirement(Requirement):
+    """`req master`: headers X-Access, X-Refresh, X-Client; sets headers X-Sign"""
+
+    def __init__(self, request: Request, X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+        super().__init__(request)
+        self.X_Access = X_Access
+        self.X_Refresh = X_Refresh
+        self.X_Client = X_Client
+
+    def set_outgoing(self, *, X_Sign: Optional[str] = None) -> None:
+        """Adds the given outgoing items to the response of the endpoint."""
+        if X_Sign is not None:
+            self.set_response_header("X-Sign", X_Sign)
+
+
+class SlaveRequirement(Requirement):
+    """`req/hidden slave`: cookies gitlab_session"""
+
+    def __init__(self, request: Request, gitlab_session: Optional[str] = Cookie(None, description="gitlab_session cookie", include_in_schema=False)):
+        super().__init__(request)
+        self.gitlab_session = gitlab_session
+
@@ -0,0 +1,995 @@
+"""Runtime support for the generated routers of this API version (generated by skdsl-py)."""
+import base64
+import functools
+import gzip
+import importlib
+import inspect
+import json
+import mimetypes
+import re
+import time
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, AsyncIterator, Callable, Dict, List, Mapping, Optional, Tuple, Union
+from urllib.parse import quote, unquote
+
+import anyio
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.routing import APIRoute
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from pydantic_core import core_schema, to_json
+from starlette.background import BackgroundTask
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.datastructures import Headers
+from starlette.routing import BaseRoute, Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import msgpack
+except ImportError: # Only needed by b/msgpack endpoints
+    msgpack = None
+
+try:
+    import brotli
+except ImportError: # Only needed by compress/br tags
+    brotli = None
+
+MSGPACK_MEDIA_TYPE = "application/msgpack"
+MSGPACK_MEDIA_TYPES = frozenset({"application/msgpack", "application/x-msgpack", "application/vnd.msgpack"})
+
+# Response format negotiated for the request being handled, read by MsgPackResponse
+_respond_with_msgpack: ContextVar[bool] = ContextVar("skdsl_respond_with_msgpack", default=True)
+
+
+def route_options(**options: Any) -> Callable:
+    """Per-endpoint options for SkdslRoute. Must be applied below the router decorator."""
+    def decorate(endpoint: Callable) -> Callable:
+        endpoint.__skdsl_options__ = {**getattr(endpoint, "__skdsl_options__", {}), **options}
+        return endpoint
+    return decorate
+
+
+def media_type_of(header_value: Optional[str]) -> str:
+    return (header_value or "").split(";", 1)[0].strip().lower()
+
+
+def weighted_values(header_value: str) -> List[Tuple[str, float]]:
+    """(value, q) pairs of an Accept-style header, values lowercased."""
+    weighted = []
+    for item in header_value.split(","):
+        value, _, params = item.partition(";")
+        q = 1.0
+        for param in params.split(";"):
+            key, _, param_value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(param_value)
+                except ValueError:
+                    q = 0.0
+        weighted.append((value.strip().lower(), q))
+    return weighted
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """MessagePack unless the Accept header prefers JSON (or only lists other types)."""
+    if not accept:
+        return True
+    msgpack_q = json_q = wildcard_q = 0.0
+    for media_type, q in weighted_values(accept):
+        if media_type in MSGPACK_MEDIA_TYPES:
+            msgpack_q = max(msgpack_q, q)
+        elif media_type == "application/json" or media_type.endswith("+json"):
+            json_q = max(json_q, q)
+        elif media_type in ("*/*", "application/*"):
+            wildcard_q = max(wildcard_q, q)
+    if msgpack_q > 0 and msgpack_q >= json_q:
+        return True
+    return json_q == 0 and wildcard_q > 0
+
+
+class MsgPackRequest(Request):
+    """Presents a MessagePack body to FastAPI as an already decoded JSON body."""
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = msgpack.unpackb(await self.body(), raw=False)
+        return self._json
+
+
+def as_msgpack_request(request: Request) -> MsgPackRequest:
+    # FastAPI only hands JSON content types to request.json(), so the decoded request says it is one
+    headers = [(key, value) for key, value in request.scope["headers"] if key != b"content-type"]
+    headers.append((b"content-type", b"application/json"))
+    return MsgPackRequest({**request.scope, "headers": headers}, request.receive, request._send)
+
+
+class ValidatedBody:
+    """A request body already validated by the endpoint's TypeAdapter (see ValidatedJSONRequest)."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+class PreValidated:
+    """`Annotated` marker of a --fast-json body parameter. A ValidatedBody is passed through as
+    its value, so FastAPI does not validate the body again; anything else (e.g. a body with a
+    non-JSON content type) is validated by the field as usual. The OpenAPI schema is unchanged.
+    FastAPI keeps the marker only with `Body()` inside the same `Annotated`, not as the default."""
+
+    @staticmethod
+    def __get_pydantic_core_schema__(source: Any, handler: Callable) -> Any:
+        return core_schema.no_info_wrap_validator_function(_unwrap_validated_body, handler(source))
+
+
+PREVALIDATED = PreValidated()
+
+
+def _unwrap_validated_body(value: Any, validate: Callable) -> Any:
+    return value.value if type(value) is ValidatedBody else validate(value)
+
+
+def takes_validated_body(endpoint: Callable) -> bool:
+    return any(isinstance(metadata, PreValidated)
+               for parameter in inspect.signature(endpoint).parameters.values()
+               for metadata in getattr(parameter.annotation, "__metadata__", ()))
+
+
+class BodyValidationError(HTTPException):
+    """422 of a body that failed the endpoint's TypeAdapter, in the format of FastAPI's request
+    validation errors. An HTTPException, since FastAPI turns other errors of request.json() into 400."""
+
+    def __init__(self, error: ValidationError):
+        detail = [{**item, "loc": ["body", *item["loc"]]} for item in json.loads(error.json(include_url=False))]
+        super().__init__(status_code=422, detail=detail)
+
+
+class ValidatedJSONRequest(Request):
+    """Parses and validates a JSON body in one step, straight from the raw bytes, with the
+    endpoint's TypeAdapter. The body parameter (marked PREVALIDATED) receives the result as is."""
+    body_adapter: TypeAdapter
+
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            try:
+                self._json = ValidatedBody(self.body_adapter.validate_json(await self.body()))
+            except ValidationError as e:
+                raise BodyValidationError(e) from None
+        return self._json
+
+
+def as_validated_json_request(request: Request, body_adapter: TypeAdapter) -> ValidatedJSONRequest:
+    validated = ValidatedJSONRequest(request.scope, request.receive, request._send)
+    validated.body_adapter = body_adapter
+    return validated
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered by pydantic-core in one call, models included."""
+
+    def render(self, content: Any) -> bytes:
+        return to_json(content)
+
+
+def dump_json_with(endpoint: Callable, response_adapter: TypeAdapter) -> Callable:
+    """Wraps an endpoint so that its result is validated and dumped to JSON bytes by
+    `response_adapter`, instead of going through FastAPI's response serialization."""
+    def respond(result: Any) -> Response:
+        if isinstance(result, Response):
+            return result
+        return Response(response_adapter.dump_json(response_adapter.validate_python(result), by_alias=True),
+                        media_type="application/json")
+
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(await endpoint(*args, **kwargs))
+    else:
+        @functools.wraps(endpoint)
+        def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    return endpoint_wrapper
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class NDJSONResponse(StreamingResponse):
+    """Newline-delimited JSON, one item per line, sent as it is produced (b/ndjson endpoints)."""
+    media_type = NDJSON_MEDIA_TYPE
+
+
+async def ndjson_lines(items: Any, item_adapter: TypeAdapter) -> AsyncIterator[bytes]:
+    if not hasattr(items, "__aiter__"):
+        items = iterate_in_threadpool(iter(items)) # Sync sources may block
+    async for item in items:
+        yield item_adapter.dump_json(item_adapter.validate_python(item), by_alias=True) + b"\n"
+
+
+def stream_ndjson_with(endpoint: Callable, item_adapter: TypeAdapter) -> Callable:
+    """Wraps an endpoint that yields items (or returns an iterable of them) so that they are
+    streamed as JSON lines, each validated and dumped by `item_adapter` when it is produced."""
+    def respond(result: Any) -> Response:
+        if isinstance(result, Response):
+            return result
+        return NDJSONResponse(ndjson_lines(result, item_adapter))
+
+    if inspect.isasyncgenfunction(endpoint) or inspect.isgeneratorfunction(endpoint):
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    elif inspect.iscoroutinefunction(endpoint):
+        async def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(await endpoint(*args, **kwargs))
+    else:
+        def endpoint_wrapper(*args: Any, **kwargs: Any) -> Response:
+            return respond(endpoint(*args, **kwargs))
+    functools.update_wrapper(endpoint_wrapper, endpoint)
+    # FastAPI unwraps endpoints to find generators, which it would stream by itself
+    del endpoint_wrapper.__wrapped__
+    endpoint_wrapper.__signature__ = inspect.signature(endpoint)
+    return endpoint_wrapper
+
+
+class MsgPackResponse(Response):
+    """Encodes the response as MessagePack, or as JSON if the request's Accept header prefers it."""
+    media_type = MSGPACK_MEDIA_TYPE
+
+    def __init__(self, content: Any = None, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        self.as_msgpack = _respond_with_msgpack.get()
+        if not self.as_msgpack:
+            self.media_type = "application/json"
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        if self.as_msgpack:
+            return msgpack.packb(content, use_bin_type=True)
+        return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+# OpenAPI description of a streamed b/file upload: the file is the raw request body
+STREAMED_BODY_OPENAPI = {"requestBody": {"required": True, "content": {
+    "application/octet-stream": {"schema": {"type": "string", "format": "binary"}}}}}
+
+
+class FileStream:
+    """A streamed b/file upload: the raw request body as an async iterator of chunks, as they
+    arrive. Nothing is spooled to memory or disk, so it can be iterated only once."""
+
+    def __init__(self, request: Request):
+        self._request = request
+        self.media_type = media_type_of(request.headers.get("content-type")) or "application/octet-stream"
+        length = request.headers.get("content-length", "")
+        self.size: Optional[int] = int(length) if length.isdigit() else None
+        match = re.search(r'filename="?([^";]+)"?', request.headers.get("content-disposition", ""))
+        self.filename: Optional[str] = match.group(1) if match else None
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._chunks()
+
+    async def _chunks(self) -> AsyncIterator[bytes]:
+        async for chunk in self._request.stream():
+            if chunk:
+                yield chunk
+
+
+async def file_stream(request: Request) -> FileStream:
+    """Dependency for streamed b/file uploads."""
+    return FileStream(request)
+
+
+def requested_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """Inclusive (start, end) of a single `bytes=` Range, or None to send the whole file.
+    Raises 416 for a range outside the file."""
+    if not range_header or not range_header.startswith("bytes=") or "," in range_header:
+        return None # No range, or several ranges: the whole file is sent
+    start_text, _, end_text = range_header[len("bytes="):].strip().partition("-")
+    try:
+        if start_text:
+            start, end = int(start_text), int(end_text) if end_text else size - 1
+        else: # bytes=-N is the last N bytes
+            start, end = max(size - int(end_text), 0), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+
+async def read_file_chunks(path: Path, offset: int, length: int, chunk_size: int) -> AsyncIterator[bytes]:
+    async with await anyio.open_file(path, "rb") as file:
+        await file.seek(offset)
+        while length > 0:
+            chunk = await file.read(min(chunk_size, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def stream_file(path: Union[str, Path], request: Optional[Request] = None, chunk_size: int = 64 * 1024,
+                media_type: Optional[str] = None, filename: Optional[str] = None) -> StreamingResponse:
+    """Streams a file in `chunk_size` pieces, answering a single-range Range header with 206."""
+    path = Path(path)
+    try:
+        size = path.stat().st_size
+    except OSError:
+        raise HTTPException(status_code=404, detail="File not found")
+    headers = {"Accept-Ranges": "bytes"}
+    if filename:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    byte_range = requested_byte_range(request.headers.get("range") if request is not None else None, size)
+    status_code, (start, end) = (200, (0, size - 1)) if byte_range is None else (206, byte_range)
+    if byte_range is not None:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(read_file_chunks(path, start, end - start + 1, chunk_size), status_code=status_code,
+                             media_type=media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream",
+                             headers=headers)
+
+
+def cache_control_ttl(cache_control: Optional[str], default: float) -> float:
+    """TTL allowed by a Cache-Control response header: 0 for no-store, no-cache or private,
+    else its s-maxage or max-age, else `default`."""
+    if not cache_control:
+        return default
+    directives = {}
+    for item in cache_control.split(","):
+        name, _, value = item.strip().partition("=")
+        directives[name.lower()] = value.strip('" ')
+    if directives.keys() & {"no-store", "no-cache", "private"}:
+        return 0.0
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name, "").isdigit():
+            return float(directives[name])
+    return default
+
+
+class ResponseCache:
+    """In-process TTL + LRU cache of one GET endpoint's responses (`cache/<ttl>` in the DSL).
+    Keyed on method, path, the declared query parameters and the `vary` headers. Only complete
+    200 responses without cookies are stored. A hit skips the handler, not its dependencies
+    (see serve_cached_with), and outgoing requirement items are never stored."""
+
+    def __init__(self, ttl: float, max_entries: int = 1024, query: Tuple[str, ...] = (),
+                 vary: Tuple[str, ...] = (), cache_control: bool = False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.query = query
+        self.vary = tuple(name.lower() for name in vary)
+        self.cache_control = cache_control # Honour the handler's Cache-Control header
+        # key -> (expires at, stored at, status code, raw headers, body), least recently used first
+        self._entries: "OrderedDict[Tuple, Tuple[float, float, int, List[Tuple[bytes, bytes]], bytes]]" = OrderedDict()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def key_for(self, request: Request) -> Tuple:
+        query_params, headers = request.query_params, request.headers
+        return (request.method, request.url.path, tuple(tuple(query_params.getlist(name)) for name in self.query),
+                tuple(headers.get(name) for name in self.vary))
+
+    def lookup(self, key: Tuple) -> Optional[Response]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, stored_at, status_code, raw_headers, body = entry
+        now = time.monotonic()
+        if now >= expires_at:
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        response = Response(body, status_code)
+        response.raw_headers = raw_headers + [(b"age", str(int(now - stored_at)).encode("latin-1"))]
+        return response
+
+    def store(self, key: Tuple, response: Response, raw_headers: Optional[List[Tuple[bytes, bytes]]] = None) -> None:
+        """Stores `response` with `raw_headers` (default: all of its headers). The TTL honours
+        the Cache-Control header of the whole response."""
+        body = getattr(response, "body", None) # Streamed responses have none
+        raw_headers = list(response.raw_headers if raw_headers is None else raw_headers)
+        if response.status_code != 200 or body is None or any(name == b"set-cookie" for name, _ in raw_headers):
+            return
+        ttl = cache_control_ttl(response.headers.get("cache-control"), self.ttl) if self.cache_control else self.ttl
+        if ttl <= 0:
+            return
+        now = time.monotonic()
+        self._entries[key] = (now + ttl, now, response.status_code, raw_headers, body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "expirations": self.expirations}
+
+
+# Scope key of the ResponseCache key of a miss, read back by SkdslRoute to store the response
+CACHE_KEY_SCOPE_KEY = "skdsl.cache_key"
+
+
+def serve_cached_with(endpoint: Callable, cache: ResponseCache) -> Callable:
+    """Wraps an endpoint so that a stored response of `cache` is returned instead of calling
+    it. FastAPI calls the wrapper once the route's dependencies (requirements included) and
+    parameters are resolved, so a hit is only answered to requests the endpoint would accept.
+    On a miss, the key is left in the request scope and SkdslRoute stores the final response."""
+    signature = inspect.signature(endpoint)
+    request_parameter = inspect.Parameter("skdsl_request", inspect.Parameter.KEYWORD_ONLY, annotation=Request)
+
+    async def endpoint_wrapper(*args: Any, skdsl_request: Request, **kwargs: Any) -> Any:
+        key = cache.key_for(skdsl_request)
+        cached = cache.lookup(key)
+        if cached is not None:
+            return cached
+        skdsl_request.scope[CACHE_KEY_SCOPE_KEY] = key
+        if inspect.iscoroutinefunction(endpoint):
+            return await endpoint(*args, **kwargs)
+        return await run_in_threadpool(endpoint, *args, **kwargs)
+
+    functools.update_wrapper(endpoint_wrapper, endpoint)
+    endpoint_wrapper.__signature__ = signature.replace(parameters=[*signature.parameters.values(), request_parameter])
+    return endpoint_wrapper
+
+# Content coding -> (compress(body, level), default level, highest level)
+COMPRESSORS: Dict[str, Tuple[Callable[[bytes, int], bytes], int, int]] = {
+    "br": (lambda body, level: brotli.compress(body, quality=level), 4, 11),
+    "gzip": (lambda body, level: gzip.compress(body, compresslevel=level, mtime=0), 6, 9),
+    "deflate": (lambda body, level: zlib.compress(body, level), 6, 9),
+}
+# Media types that are compressed already
+COMPRESSED_MEDIA_PREFIXES = ("image/", "audio/", "video/", "font/woff")
+COMPRESSED_MEDIA_TYPES = frozenset({"application/gzip", "application/x-gzip", "application/zip", "application/zstd",
+                                    "application/x-bzip2", "application/x-xz", "application/x-7z-compressed"})
+
+
+class ResponseCompression:
+    """Compression of a tag's responses (`compress/...` on the `api tag` line). Complete bodies
+    of at least `min_size` bytes are compressed with the first of `algorithms` the request's
+    Accept-Encoding allows. Streamed and file responses, and bodies that are encoded or
+    compressed already, are sent as is."""
+
+    def __init__(self, algorithms: Tuple[str, ...] = ("gzip",), min_size: int = 1024, level: Optional[int] = None):
+        unknown = [algorithm for algorithm in algorithms if algorithm not in COMPRESSORS]
+        if unknown:
+            raise ValueError(f"Unknown compression algorithms: {', '.join(unknown)}")
+        if "br" in algorithms and brotli is None:
+            raise RuntimeError("compress/br needs the 'brotli' package")
+        self.algorithms = algorithms
+        self.min_size = min_size
+        self.level = level
+
+    def negotiate(self, accept_encoding: Optional[str]) -> Optional[str]:
+        weights = dict(weighted_values(accept_encoding)) if accept_encoding else {}
+        wildcard = weights.get("*", 0.0)
+        return next((algorithm for algorithm in self.algorithms if weights.get(algorithm, wildcard) > 0), None)
+
+    def apply(self, request: Request, response: Response) -> None:
+        body = getattr(response, "body", None) # Streamed and file responses have none
+        if body is None or len(body) < self.min_size or "content-encoding" in response.headers:
+            return
+        media_type = media_type_of(response.headers.get("content-type"))
+        if media_type.startswith(COMPRESSED_MEDIA_PREFIXES) or media_type in COMPRESSED_MEDIA_TYPES:
+            return
+        vary = response.headers.get("vary")
+        if not vary:
+            response.headers["Vary"] = "Accept-Encoding"
+        elif "accept-encoding" not in vary.lower():
+            response.headers["Vary"] = f"{vary}, Accept-Encoding"
+        algorithm = self.negotiate(request.headers.get("accept-encoding"))
+        if algorithm is None:
+            return
+        compress, default_level, highest_level = COMPRESSORS[algorithm]
+        response.body = compress(body, min(self.level, highest_level) if self.level is not None else default_level)
+        response.headers["Content-Encoding"] = algorithm
+        response.headers["Content-Length"] = str(len(response.body))
+
+
+class InFlightLimit:
+    """Bound on the requests that one route (`inflight/<n>` in the DSL), or all routes of a tag,
+    handle at once. Requests over it are answered 503 with a Retry-After header instead of queueing."""
+    __slots__ = ("limit", "retry_after", "active")
+
+    def __init__(self, limit: int, retry_after: int = 1):
+        self.limit = limit
+        self.retry_after = retry_after # Seconds
+        self.active = 0
+
+    def try_acquire(self) -> bool:
+        if self.active >= self.limit:
+            return False
+        self.active += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+
+
+class BodyTooLarge(HTTPException):
+    def __init__(self, max_body: int):
+        super().__init__(status_code=413, detail=f"Request body is larger than {max_body} bytes")
+
+
+class RequestLimits:
+    """ASGI guard in front of one route (`maxbody/<size>` and `inflight/<n>` in the DSL), applied
+    before anything of the request body is read. A declared Content-Length over `max_body` and a
+    request over any of the `in_flight` limits are rejected without calling the route; a body
+    without Content-Length is counted while it streams in and cut off with 413 at the limit."""
+
+    def __init__(self, max_body: Optional[int] = None, in_flight: Tuple[InFlightLimit, ...] = ()):
+        self.max_body = max_body
+        self.in_flight = in_flight
+        self.shed = 0 # Answered 503
+        self.too_large = 0 # Answered 413
+
+    async def guard(self, app: ASGIApp, scope: Scope, receive: Receive, send: Send) -> None:
+        """Calls `app` unless the request is over a limit."""
+        if self.max_body is not None:
+            length = Headers(scope=scope).get("content-length", "")
+            if length.isdigit() and int(length) > self.max_body:
+                self.too_large += 1
+                await reject(BodyTooLarge(self.max_body), scope, receive, send)
+                return
+            receive = self.limited_receive(receive)
+        acquired = []
+        try:
+            for limit in self.in_flight:
+                if not limit.try_acquire():
+                    self.shed += 1
+                    await reject(HTTPException(status_code=503, detail="Too many requests in flight",
+                                               headers={"Retry-After": str(limit.retry_after)}), scope, receive, send)
+                    return
+                acquired.append(limit)
+            await app(scope, receive, send)
+        finally:
+            for limit in acquired:
+                limit.release()
+
+    def limited_receive(self, receive: Receive) -> Receive:
+        received = 0
+
+        async def receive_limited() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body:
+                    self.too_large += 1
+                    raise BodyTooLarge(self.max_body) # Turned into the 413 response by the app's exception handlers
+            return message
+
+        return receive_limited
+
+
+async def reject(exc: HTTPException, scope: Scope, receive: Receive, send: Send) -> None:
+    response = JSONResponse({"detail": exc.detail}, status_code=exc.status_code, headers=exc.headers)
+    await response(scope, receive, send)
+
+
+# Scope key of the outgoing requirement items collected while a request is handled
+OUTGOING_SCOPE_KEY = "skdsl.outgoing"
+
+
+class OutgoingItems:
+    """Response headers and cookies set through requirement dependencies."""
+    __slots__ = ("headers", "cookies")
+
+    def __init__(self):
+        self.headers: Dict[str, str] = {}
+        self.cookies: List[Tuple[str, str, Dict[str, Any]]] = []
+
+    def apply(self, response: Response) -> None:
+        for name, value in self.headers.items():
+            response.headers[name] = value
+        for key, value, cookie_options in self.cookies:
+            response.set_cookie(key, value, **cookie_options)
+
+
+class Requirement:
+    """Base of the dependency classes generated for `req` blocks (see requirements.py).
+    FastAPI builds one instance per request, however many dependencies of the route name the
+    class. Outgoing headers and cookies set on it are added by SkdslRoute to the response the
+    endpoint returns, whichever response class it is."""
+
+    def __init__(self, request: Request):
+        self.request = request
+
+    def _outgoing(self) -> OutgoingItems:
+        return self.request.scope.setdefault(OUTGOING_SCOPE_KEY, OutgoingItems())
+
+    def set_response_header(self, name: str, value: Any) -> None:
+        self._outgoing().headers[name] = str(value)
+
+    def set_response_cookie(self, key: str, value: Any, **cookie_options: Any) -> None:
+        self._outgoing().cookies.append((key, str(value), cookie_options))
+
+
+def uses_requirements(dependant: Any) -> bool:
+    """Whether a route (or any of its sub-dependencies) depends on a Requirement class."""
+    return any((isinstance(dependency.call, type) and issubclass(dependency.call, Requirement))
+               or uses_requirements(dependency) for dependency in dependant.dependencies)
+
+
+class SkdslRoute(APIRoute):
+    """Route class of the generated routers. Per endpoint (see route_options) it adds
+    MessagePack request decoding and response negotiation, TypeAdapter-based JSON bodies and
+    responses, streamed NDJSON responses, a ResponseCache, RequestLimits and ResponseCompression.
+    Routes depending on a Requirement get its outgoing headers and cookies."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        options = getattr(endpoint, "__skdsl_options__", {})
+        if options.get("body_adapter") is not None and not takes_validated_body(endpoint):
+            raise RuntimeError(f"{path}: a body_adapter needs the body parameter annotated with PREVALIDATED")
+        if options.get("response_adapter") is not None:
+            endpoint = dump_json_with(endpoint, options["response_adapter"])
+        elif options.get("ndjson_item") is not None:
+            endpoint = stream_ndjson_with(endpoint, options["ndjson_item"])
+        if options.get("cache") is not None: # Outermost, so that a hit skips the response dump too
+            endpoint = serve_cached_with(endpoint, options["cache"])
+        self.limits: Optional[RequestLimits] = options.get("limits")
+        super().__init__(path, endpoint, **kwargs)
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if self.limits is None:
+            await super().handle(scope, receive, send)
+        else: # Matched, but nothing of the request is read yet
+            await self.limits.guard(super().handle, scope, receive, send)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        options = getattr(self.endpoint, "__skdsl_options__", {})
+        msgpack_body = options.get("msgpack_body", False)
+        body_adapter = options.get("body_adapter")
+        msgpack_response = isinstance(self.response_class, type) and issubclass(self.response_class, MsgPackResponse)
+        sets_outgoing = uses_requirements(self.dependant)
+        cache = options.get("cache")
+        compression = options.get("compression")
+        if not (msgpack_body or msgpack_response or body_adapter or sets_outgoing or cache is not None
+                or compression is not None):
+            return handler
+        if (msgpack_body or msgpack_response) and msgpack is None:
+            raise RuntimeError(f"{self.path}: b/msgpack endpoints need the 'msgpack' package")
+
+        async def route_handler(request: Request) -> Response:
+            content_type = media_type_of(request.headers.get("content-type"))
+            if msgpack_body and content_type in MSGPACK_MEDIA_TYPES:
+                request = as_msgpack_request(request)
+            elif body_adapter is not None: # FastAPI only calls request.json() for JSON content types
+                request = as_validated_json_request(request, body_adapter)
+            if not msgpack_response:
+                response = await handler(request)
+            else:
+                token = _respond_with_msgpack.set(accepts_msgpack(request.headers.get("accept")))
+                try:
+                    response = await handler(request)
+                finally:
+                    _respond_with_msgpack.reset(token)
+            cache_key = request.scope.pop(CACHE_KEY_SCOPE_KEY, None) # Only set on a cache miss
+            if compression is not None and (cache is None or cache_key is not None): # Hits are stored as sent
+                compression.apply(request, response)
+            raw_headers = list(response.raw_headers) # Without the outgoing items of this request
+            outgoing = request.scope.get(OUTGOING_SCOPE_KEY) if sets_outgoing else None
+            if outgoing is not None:
+                outgoing.apply(response)
+            if cache_key is not None:
+                cache.store(cache_key, response, raw_headers)
+            return response
+
+        return route_handler
+
+
+class BatchCall(BaseModel):
+    """One request of a batch, to an endpoint of the batch route's tag."""
+    method: str = "GET"
+    path: str # Below the tag's prefix, optionally with a query string: "/chat/5", "/chats?chat_id=1"
+    headers: Dict[str, str] = {}
+    body: Any = None # Sent as JSON
+
+
+class BatchResult(BaseModel):
+    status: int
+    headers: Dict[str, str] = {} # Repeated headers are joined with ", "
+    body: Any = None # JSON bodies as is, NDJSON as a list, text as a string, anything else in base64
+    encoding: Optional[str] = None # "base64" for binary bodies
+
+
+# Headers of the batch request that are not passed on to its sub-requests. Their bodies are
+# embedded in the batch response, so they are answered uncompressed and as JSON by default.
+BATCH_REQUEST_ONLY_HEADERS = frozenset({"content-length", "content-type", "accept", "accept-encoding",
+                                        "transfer-encoding", "expect"})
+BATCH_JSON_HEADERS = [(b"content-type", b"application/json")]
+BATCH_SCOPE_KEYS = ("type", "asgi", "http_version", "scheme", "server", "client", "root_path", "app", "state")
+
+
+class BatchDispatcher:
+    """POST /batch of a tag (`batch` on the `api tag` line). Runs up to `max_requests`
+    sub-requests to the tag's endpoints concurrently and in-process. Each one goes through the
+    whole app as a request of its own: middleware, routing, validation, requirements, caches
+    and limits. The results are answered in one JSON array, in request order. The batch
+    request's headers (tokens, cookies) are passed on to every sub-request, below its own."""
+
+    def __init__(self, max_requests: int = 20):
+        self.max_requests = max_requests
+
+    async def dispatch(self, request: Request, calls: List[BatchCall]) -> Response:
+        if len(calls) > self.max_requests:
+            raise HTTPException(413, f"A batch takes at most {self.max_requests} requests, got {len(calls)}")
+        base_path = request.scope["path"][:-len("/batch")]
+        inherited = [(name, value) for name, value in request.scope["headers"]
+                     if name.decode("latin-1").lower() not in BATCH_REQUEST_ONLY_HEADERS]
+        results: List[bytes] = [b"null"] * len(calls)
+
+        async def run(index: int, call: BatchCall) -> None:
+            results[index] = await self.call(request.scope, base_path, inherited, call)
+
+        async with anyio.create_task_group() as tasks:
+            for index, call in enumerate(calls):
+                tasks.start_soon(run, index, call)
+        return Response(b"[" + b",".join(results) + b"]", media_type="application/json")
+
+    async def call(self, outer_scope: Scope, base_path: str, inherited: List[Tuple[bytes, bytes]],
+                   call: BatchCall) -> bytes:
+        path, _, query = call.path.partition("?")
+        if not path.startswith("/") or unquote(path).rstrip("/") == "/batch":
+            return self.encode_result(400, BATCH_JSON_HEADERS, to_json({"detail": f"Invalid batch path: {call.path}"}))
+        own_headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in call.headers.items()]
+        overridden = {name for name, _ in own_headers}
+        headers = [(name, value) for name, value in inherited if name.lower() not in overridden] + own_headers
+        if b"accept" not in overridden:
+            headers.append((b"accept", b"application/json"))
+        body = b""
+        if call.body is not None:
+            body = to_json(call.body)
+            headers = [(name, value) for name, value in headers if name.lower() != b"content-type"]
+            headers += [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        scope = {key: outer_scope[key] for key in BATCH_SCOPE_KEYS if key in outer_scope}
+        scope.update(method=call.method.upper(), path=base_path + unquote(path),
+                     raw_path=(quote(base_path) + path).encode("latin-1"), query_string=query.encode("latin-1"),
+                     headers=headers)
+
+        responded = anyio.Event()
+        request_sent = False
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def receive() -> Message:
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await responded.wait() # Streaming responses listen for a disconnect meanwhile
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        try:
+            await outer_scope["app"](scope, receive, send)
+        except Exception:
+            if not start: # Otherwise the 500 was answered already, by ServerErrorMiddleware
+                return self.encode_result(500, BATCH_JSON_HEADERS, to_json({"detail": "Internal Server Error"}))
+        finally:
+            responded.set()
+        return self.encode_result(start.get("status", 500), start.get("headers", []), b"".join(chunks))
+
+    @staticmethod
+    def encode_result(status: int, raw_headers: List[Tuple[bytes, bytes]], content: bytes) -> bytes:
+        headers: Dict[str, str] = {}
+        for raw_name, raw_value in raw_headers:
+            name, value = raw_name.decode("latin-1").lower(), raw_value.decode("latin-1")
+            if name not in ("content-length", "transfer-encoding"):
+                headers[name] = f"{headers[name]}, {value}" if name in headers else value
+        media_type = media_type_of(headers.get("content-type"))
+        encoding = None
+        if not content:
+            body = b"null"
+        elif media_type == "application/json" or media_type.endswith("+json"):
+            body = content # Embedded as is, not parsed again
+        elif media_type == "application/x-ndjson":
+            body = b"[" + b",".join(line for line in content.splitlines() if line.strip()) + b"]"
+        elif media_type.startswith("text/"):
+            body = to_json(content.decode("utf-8", errors="replace"))
+        else:
+            body, encoding = to_json(base64.b64encode(content).decode("ascii")), "base64"
+        result = b'{"status":' + str(status).encode() + b',"headers":' + to_json(headers) + b',"body":' + body
+        if encoding:
+            result += b',"encoding":"' + encoding.encode() + b'"'
+        return result + b"}"
+
+
+# Upper bounds (seconds) of the latency histogram buckets, plus an implicit +Inf one
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class RouteMetrics:
+    """Counters of one route: requests per status code, a fixed-bucket histogram of the
+    seconds until the handler returned its response, requests in flight and response bytes."""
+    __slots__ = ("tag", "endpoint", "statuses", "buckets", "latency_sum", "in_flight", "response_bytes", "cache", "limits")
+
+    def __init__(self, tag: str, endpoint: str):
+        self.tag = tag
+        self.endpoint = endpoint
+        self.statuses: Dict[int, int] = {}
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.in_flight = 0
+        self.response_bytes = 0
+        self.cache: Optional[ResponseCache] = None
+        self.limits: Optional[RequestLimits] = None
+
+    def observe(self, status_code: int, seconds: float, size: int) -> None:
+        self.statuses[status_code] = self.statuses.get(status_code, 0) + 1
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.latency_sum += seconds
+        self.response_bytes += size
+
+
+# (tag, endpoint) -> metrics of every metered route of this process
+ROUTE_METRICS: Dict[Tuple[str, str], RouteMetrics] = {}
+
+
+def response_size(response: Response) -> int:
+    body = getattr(response, "body", None)
+    if body is not None:
+        return len(body)
+    length = response.headers.get("content-length", "") # Streamed responses
+    return int(length) if length.isdigit() else 0
+
+
+class MeteredRoute(SkdslRoute):
+    """SkdslRoute that records RouteMetrics under its tag and endpoint name (the DSL func_name)."""
+    metrics_tag = ""
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        key = (self.metrics_tag, self.name)
+        metrics = ROUTE_METRICS.get(key) or ROUTE_METRICS.setdefault(key, RouteMetrics(*key))
+        options = getattr(self.endpoint, "__skdsl_options__", {})
+        metrics.cache = options.get("cache")
+        metrics.limits = options.get("limits") # Its 503s and early 413s never reach the handler
+
+        async def metered_handler(request: Request) -> Response:
+            metrics.in_flight += 1
+            start = time.perf_counter()
+            try:
+                response = await handler(request)
+            except Exception as exc: # Turned into an error response by the app's exception handlers
+                status_code = 422 if isinstance(exc, RequestValidationError) else getattr(exc, "status_code", 500)
+                metrics.observe(status_code, time.perf_counter() - start, 0)
+                raise
+            finally:
+                metrics.in_flight -= 1
+            metrics.observe(response.status_code, time.perf_counter() - start, response_size(response))
+            return response
+
+        return metered_handler
+
+
+@functools.lru_cache(maxsize=None)
+def metered_route(tag: str) -> type:
+    """Route class of a tag router generated with --metrics."""
+    return type("MeteredRoute", (MeteredRoute,), {"metrics_tag": tag})
+
+
+def render_metrics() -> str:
+    """All route metrics in the Prometheus text exposition format."""
+    routes = sorted(ROUTE_METRICS.values(), key=lambda metrics: (metrics.tag, metrics.endpoint))
+    lines = []
+
+    def family(name: str, kind: str, help_text: str) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def labels(metrics: RouteMetrics, **extra: Any) -> str:
+        pairs = [("tag", metrics.tag), ("endpoint", metrics.endpoint), *extra.items()]
+        return "{" + ",".join(f'{key}="{value}"' for key, value in pairs) + "}"
+
+    family("skdsl_requests_total", "counter", "Requests handled, by status code.")
+    for metrics in routes:
+        for status_code, count in sorted(metrics.statuses.items()):
+            lines.append(f"skdsl_requests_total{labels(metrics, status=status_code)} {count}")
+    family("skdsl_request_duration_seconds", "histogram", "Seconds until the handler returned its response.")
+    for metrics in routes:
+        cumulative = 0
+        for bound, count in zip((*LATENCY_BUCKETS, "+Inf"), metrics.buckets):
+            cumulative += count
+            lines.append(f"skdsl_request_duration_seconds_bucket{labels(metrics, le=bound)} {cumulative}")
+        lines.append(f"skdsl_request_duration_seconds_sum{labels(metrics)} {metrics.latency_sum:.6f}")
+        lines.append(f"skdsl_request_duration_seconds_count{labels(metrics)} {cumulative}")
+    family("skdsl_requests_in_flight", "gauge", "Requests being handled.")
+    for metrics in routes:
+        lines.append(f"skdsl_requests_in_flight{labels(metrics)} {metrics.in_flight}")
+    family("skdsl_response_bytes_total", "counter", "Response body bytes (Content-Length of streamed responses).")
+    for metrics in routes:
+        lines.append(f"skdsl_response_bytes_total{labels(metrics)} {metrics.response_bytes}")
+
+    cached_routes = [metrics for metrics in routes if metrics.cache is not None]
+    for counter in ("hits", "misses", "evictions", "expirations"):
+        if cached_routes:
+            family(f"skdsl_cache_{counter}_total", "counter", f"Response cache {counter}.")
+        for metrics in cached_routes:
+            lines.append(f"skdsl_cache_{counter}_total{labels(metrics)} {getattr(metrics.cache, counter)}")
+
+    limited_routes = [metrics for metrics in routes if metrics.limits is not None]
+    if limited_routes:
+        family("skdsl_rejected_total", "counter", "Requests rejected by the route's limits: 503 over an in-flight limit, 413 over the body size.")
+    for metrics in limited_routes:
+        for reason, count in (("in_flight", metrics.limits.shed), ("body_size", metrics.limits.too_large)):
+            lines.append(f"skdsl_rejected_total{labels(metrics, reason=reason)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint() -> Response:
+    return Response(render_metrics(), media_type=METRICS_MEDIA_TYPE)
+
+
+class LazyRouter(BaseRoute):
+    """Stands in for a tag router of main_app.py (--lazy-routers) until the first request under
+    its prefix. That request imports the tag module, includes its router in the app and is
+    routed again; from then on the placeholder matches nothing."""
+
+    def __init__(self, app: FastAPI, module: str, package: Optional[str], prefix: str):
+        self.app = app
+        self.module = module
+        self.package = package
+        self.prefix = prefix
+        self.loaded = False
+
+    def matches(self, scope: Scope) -> Tuple[Match, Scope]:
+        if self.loaded or scope["type"] != "http":
+            return Match.NONE, {}
+        path, root_path = scope["path"], scope.get("root_path", "")
+        if root_path and path.startswith(root_path):
+            path = path[len(root_path):]
+        if path == self.prefix or path.startswith(self.prefix + "/"):
+            return Match.FULL, {}
+        return Match.NONE, {}
+
+    def load(self) -> None:
+        if not self.loaded:
+            router = importlib.import_module(self.module, self.package).router
+            self.app.include_router(router, prefix=self.prefix)
+            self.app.openapi_schema = None
+            self.loaded = True
+
+    async def handle(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.load()
+        await self.app.router(scope, receive, send)
+
+
+def lazy_include_router(app: FastAPI, module: str, package: Optional[str], prefix: str) -> LazyRouter:
+    """Like `app.include_router(import_module(module, package).router, prefix=prefix)`, but the
+    import happens on the first request under `prefix`. The OpenAPI schema loads every router."""
+    lazy_router = LazyRouter(app, module, package, prefix)
+    app.router.routes.append(lazy_router)
+    if not hasattr(app, "skdsl_lazy_routers"):
+        app.skdsl_lazy_routers = []
+        build_openapi = app.openapi
+
+        def openapi() -> Dict[str, Any]:
+            load_lazy_routers(app)
+            return build_openapi()
+
+        app.openapi = openapi
+    app.skdsl_lazy_routers.append(lazy_router)
+    return lazy_router
+
+
+def load_lazy_routers(app: FastAPI) -> None:
+    """Imports every tag router that is still lazy, e.g. to warm a worker up before it serves."""
+    for lazy_router in getattr(app, "skdsl_lazy_routers", ()):
+        lazy_router.load()
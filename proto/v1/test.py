@@ -1,18 +1,20 @@
-from fastapi import APIRouter, Query, Header, Cookie, File, Form, UploadFile, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Query, Header, Cookie, Body, File, Form, UploadFile, Depends, HTTPException, status, Request, Response
 from fastapi.responses import PlainTextResponse, HTMLResponse, FileResponse
-from typing import List, Dict, Optional, Any
-from ..models import * # Assuming generated types/models are in ..models.py or similar
+from typing import List, Dict, Optional, Any, Tuple
+from .models import * # Generated types/models of this version
+from .runtime import SkdslRoute, MsgPackResponse, route_options
+from .requirements import MasterRequirement, SlaveRequirement
 
-router = APIRouter()
+router = APIRouter(route_class=SkdslRoute)
 
 @router.get("/test", tags=["Test"])
-async def get_test(X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+async def get_test(master_req: MasterRequirement = Depends()):
     return None # HTTP 200 OK or 204 No Content implicitly
 
 
 
-@router.post("/audio", response_model=ComplexAliasType, tags=["Test"])
-async def post_audio(gitlab_session: Optional[str] = Cookie(None, description="gitlab_session cookie"), audio: List[int] = Form(..., description="audio form_param")):
+@router.post("/audio", response_model=ComplexAliasType, response_class=MsgPackResponse, tags=["Test"])
+async def post_audio(audio: List[int] = Form(..., description="audio form_param"), slave_req: SlaveRequirement = Depends()):
     # TODO: Implement logic and return data for ComplexAliasType
     pass
 
@@ -1,19 +1,21 @@
-from fastapi import APIRouter, Query, Header, Cookie, File, Form, UploadFile, Depends, HTTPException, status, Response
+from fastapi import APIRouter, Query, Header, Cookie, Body, File, Form, UploadFile, Depends, HTTPException, status, Request, Response
 from fastapi.responses import PlainTextResponse, HTMLResponse, FileResponse
-from typing import List, Dict, Optional, Any
-from ..models import * # Assuming generated types/models are in ..models.py or similar
+from typing import List, Dict, Optional, Any, Tuple
+from .models import * # Generated types/models of this version
+from .runtime import SkdslRoute, MsgPackResponse, route_options
 
-router = APIRouter()
+router = APIRouter(route_class=SkdslRoute)
 
 @router.post("/sign-in", response_model=AnswerData, tags=["Users"])
-async def post_sign-in(payload: HelloData, user_id: int = Query(..., description="user_id query"), X_Sign: Optional[str] = Header(None, description="X-Sign header", alias="X-Sign")):
+async def post_sign_in(payload: HelloData = Body(...), user_id: int = Query(..., description="user_id query"), X_Sign: Optional[str] = Header(None, description="X-Sign header", alias="X-Sign")):
     # TODO: Implement logic and return data for AnswerData
     pass
 
 
 
 @router.patch("/change-password", tags=["Users"])
-async def patch_change-password(payload: UserChangePassReq, X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
+@route_options(msgpack_body=True)
+async def patch_change_password(payload: UserChangePassReq = Body(...), X_Access: Optional[str] = Header(None, description="X-Access header", alias="X-Access"), X_Refresh: Optional[str] = Header(None, description="X-Refresh header", alias="X-Refresh"), X_Client: Optional[str] = Header(None, description="X-Client header", alias="X-Client")):
     return None # HTTP 200 OK or 204 No Content implicitly
 
 
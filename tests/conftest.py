@@ -0,0 +1,115 @@
+"""Shared fixtures: run the translator on a DSL snippet and import the generated version package."""
+
+import importlib
+import importlib.util
+import itertools
+import re
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Dict, List
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path: # main.py is a single script, not an installed package
+    sys.path.insert(0, str(ROOT))
+
+import main as skdsl # noqa: E402
+
+_package_ids = itertools.count()
+
+
+class Translator:
+    """Writes DSL text to `<tmp>/api.md` and runs the CLI on it, returning its stdout.
+    The stderr of the last run is kept in `stderr`."""
+
+    def __init__(self, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture):
+        self.contract = tmp_path / "api.md"
+        self.output = tmp_path / "out"
+        self._monkeypatch = monkeypatch
+        self._capsys = capsys
+        self.stderr = ""
+
+    def __call__(self, dsl: str, *args: str) -> str:
+        self.contract.write_text(dsl)
+        return self.run("-i", str(self.contract), "-o", str(self.output), "--no-cache", *args)
+
+    def run(self, *args: str) -> str:
+        self._capsys.readouterr()
+        self._monkeypatch.setattr(sys, "argv", ["skdsl-py", *args])
+        try:
+            skdsl.main()
+        except SystemExit as e:
+            if e.code:
+                raise
+        captured = self._capsys.readouterr()
+        self.stderr = captured.err
+        return captured.out
+
+    def generated(self, output: str) -> List[str]:
+        """Names of the files a run reported as written."""
+        return sorted(Path(line.split(" ", 1)[1]).name for line in output.splitlines() if line.startswith("Generated "))
+
+
+class GeneratedVersion:
+    """A generated version folder imported as a uniquely named package."""
+
+    def __init__(self, version_dir: Path):
+        self.dir = version_dir
+        self.package = f"skdsl_generated_{version_dir.name}_{next(_package_ids)}"
+        spec = importlib.util.spec_from_file_location(self.package, version_dir / "__init__.py",
+                                                      submodule_search_locations=[str(version_dir)])
+        package = importlib.util.module_from_spec(spec)
+        sys.modules[self.package] = package
+        spec.loader.exec_module(package)
+
+    def module(self, name: str) -> ModuleType:
+        return importlib.import_module(f"{self.package}.{name}")
+
+    @property
+    def app(self):
+        return self.module("main_app").app
+
+    def client(self, **kwargs) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.ASGITransport(app=self.app), base_url="http://test", **kwargs)
+
+    def unload(self) -> None:
+        for name in [n for n in sys.modules if n == self.package or n.startswith(self.package + ".")]:
+            del sys.modules[name]
+
+
+def implement(module_path: Path, handlers: Dict[str, str]) -> None:
+    """Replaces the body of generated handlers, like a developer filling in the TODO stubs."""
+    code = module_path.read_text()
+    for name, body in handlers.items():
+        pattern = re.compile(rf"^(async def {name}\(.*\):\n)((?:[ \t]+.*\n)+)", re.MULTILINE)
+        replacement = "".join(f"    {line}\n" for line in body.strip("\n").splitlines())
+        code, count = pattern.subn(lambda m: m.group(1) + replacement, code)
+        assert count == 1, f"handler {name} not found in {module_path}"
+    module_path.write_text(code)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+def translate(tmp_path, monkeypatch, capsys) -> Translator:
+    return Translator(tmp_path, monkeypatch, capsys)
+
+
+@pytest.fixture
+def load_version():
+    loaded: List[GeneratedVersion] = []
+
+    def load(version_dir: Path) -> GeneratedVersion:
+        version = GeneratedVersion(version_dir)
+        loaded.append(version)
+        return version
+
+    yield load
+    for version in loaded:
+        version.unload()
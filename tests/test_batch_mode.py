@@ -0,0 +1,72 @@
+"""`--batch <manifest>`: many contracts compiled in one run, with one aggregated report."""
+
+import json
+
+import pytest
+
+import main as skdsl
+
+CHAT = """
+type Msg struct { id: u64, text: String }
+api tag chat
+api get/messages -> b/json/Vec<Msg>
+"""
+
+AUTH = """
+api tag auth
+api post/login f/str/name -> b/plain
+api get/ghost -> b/json/Missing
+"""
+
+
+@pytest.fixture
+def manifest(tmp_path):
+    (tmp_path / "chat").mkdir()
+    (tmp_path / "chat" / "api.md").write_text(CHAT)
+    (tmp_path / "auth.md").write_text(AUTH)
+    path = tmp_path / "services.json"
+    path.write_text(json.dumps([
+        {"input": "chat/api.md", "output": "chat/generated"},
+        {"input": "auth.md", "output": "auth/generated", "version": "v2"},
+    ]))
+    return path
+
+
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_every_contract_is_compiled(translate, manifest, jobs):
+    report_path = manifest.parent / "report.json"
+    output = translate.run("--batch", str(manifest), "-j", jobs, "--batch-report", str(report_path))
+    assert output.startswith("Batch: 2 contract(s), 2 ok, 0 failed")
+    report = json.loads(report_path.read_text())
+    chat, auth = report["results"]
+    assert (chat["version"], chat["tags"], chat["endpoints"]) == ("v1", 1, 1)
+    assert (auth["version"], auth["tags"], auth["endpoints"]) == ("v2", 1, 2)
+    assert chat["written"] > 0 and not chat["warnings"]
+    assert (manifest.parent / "chat" / "generated" / "v1" / "chat.py").exists()
+    assert (manifest.parent / "auth" / "generated" / "v2" / "auth.py").exists()
+
+
+def test_batch_output_matches_a_single_run(translate, manifest):
+    translate.run("--batch", str(manifest), "--no-cache")
+    translate.run("-i", str(manifest.parent / "chat" / "api.md"), "-o", str(translate.output), "--no-cache")
+    for name in ("models.py", "chat.py", "main_app.py"):
+        batch_file = manifest.parent / "chat" / "generated" / "v1" / name
+        assert batch_file.read_text() == (translate.output / "v1" / name).read_text()
+
+
+def test_failed_contract_is_reported_without_stopping_the_others(translate, manifest, capsys):
+    entries = json.loads(manifest.read_text())
+    manifest.write_text(json.dumps([{"input": "gone.md", "output": "gone"}, *entries]))
+    with pytest.raises(SystemExit) as exit_info:
+        translate.run("--batch", str(manifest), "--batch-report", "-")
+    assert exit_info.value.code == 1
+    report = json.loads(capsys.readouterr().out)
+    assert [result["ok"] for result in report["results"]] == [False, True, True]
+    assert report["results"][0]["error"].startswith("FileNotFoundError")
+
+
+def test_manifest_entries_need_an_input_and_an_output(tmp_path):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps([{"input": "a.md"}]))
+    with pytest.raises(ValueError, match="Entry 1"):
+        skdsl.load_batch_manifest(path)
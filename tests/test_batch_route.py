@@ -0,0 +1,102 @@
+"""`batch` on an `api tag` line: POST /batch runs sub-requests to the tag's endpoints in process."""
+
+import base64
+
+import anyio
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type Msg struct { msg-id: u64, text: String }
+req tokens h/str/X-Access
+api tag chat req/tokens batch/5
+api get/chat/{u64/id} -> b/json/Msg
+api post/chat b/json/Msg -> b/json/u64
+api get/feed -> b/ndjson/u64
+api get/text -> b/plain
+api get/blob -> b/file
+api get/boom -> ok
+api get/slow/{u64/n} -> b/json/u64
+
+api tag other
+api get/ping -> b/plain
+"""
+
+
+@pytest.fixture
+def chat(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "chat.py", {
+        "get_chat_by_id": "return Msg(msg_id=id, text=tokens.X_Access or \"\")",
+        "post_chat": "return payload.msg_id",
+        "get_feed": "yield 1\nyield 2",
+        "get_text": "return PlainTextResponse(\"hi\")",
+        "get_blob": "return Response(b\"\\xff\\x00\", media_type=\"application/octet-stream\")",
+        "get_boom": "raise RuntimeError(\"boom\")",
+        "get_slow_by_n": "ACTIVE.append(n)\nwhile len(ACTIVE) < 2:\n    await anyio.sleep(0.001)\nreturn n",
+    })
+    module_path = translate.output / "v1" / "chat.py"
+    code = module_path.read_text().replace("router = APIRouter(", "import anyio\n\nACTIVE = []\n\nrouter = APIRouter(", 1)
+    code = code.replace("async def get_chat_by_id(id: int", "async def get_chat_by_id(id: int, tokens: TokensRequirement = Depends()", 1)
+    module_path.write_text(code)
+    return load_version(translate.output / "v1")
+
+
+async def batch(version, calls, **kwargs):
+    async with version.client() as client:
+        return await client.post("/api/v1/chat/batch", json=calls, **kwargs)
+
+
+async def test_results_come_back_in_request_order(chat):
+    response = await batch(chat, [
+        {"path": "/chat/5"},
+        {"method": "POST", "path": "/chat", "body": {"msg-id": 7, "text": "x"}},
+        {"path": "/feed"},
+        {"path": "/text"},
+        {"path": "/blob"},
+    ], headers={"X-Access": "token"})
+    assert response.status_code == 200
+    chat_result, posted, feed, text, blob = response.json()
+    assert chat_result["status"] == 200 and chat_result["body"] == {"msg-id": 5, "text": "token"}
+    assert chat_result["headers"]["content-type"] == "application/json"
+    assert posted["body"] == 7
+    assert feed["body"] == [1, 2]
+    assert text["body"] == "hi"
+    assert blob["encoding"] == "base64" and base64.b64decode(blob["body"]) == b"\xff\x00"
+
+
+async def test_sub_requests_run_concurrently(chat):
+    with anyio.fail_after(5): # Each handler waits for the other one
+        response = await batch(chat, [{"path": "/slow/1"}, {"path": "/slow/2"}])
+    assert [result["body"] for result in response.json()] == [1, 2]
+
+
+async def test_failures_stay_in_their_own_result(chat):
+    response = await batch(chat, [
+        {"path": "/chat/not-a-number"},
+        {"path": "/missing"},
+        {"path": "/boom"},
+        {"path": "/batch", "method": "POST", "body": []},
+    ])
+    assert response.status_code == 200
+    assert [result["status"] for result in response.json()] == [422, 404, 500, 400]
+
+
+async def test_own_headers_override_the_batch_headers(chat):
+    response = await batch(chat, [{"path": "/chat/1"}, {"path": "/chat/2", "headers": {"X-Access": "own"}}],
+                           headers={"X-Access": "shared"})
+    assert [result["body"]["text"] for result in response.json()] == ["shared", "own"]
+
+
+async def test_too_long_batch_is_rejected_unrun(chat):
+    response = await batch(chat, [{"path": "/slow/1"}] * 6)
+    assert response.status_code == 413
+    assert chat.module("chat").ACTIVE == []
+
+
+def test_only_the_batch_tag_gets_the_route(chat):
+    assert "TAG_BATCH = BatchDispatcher(max_requests=5)" in (chat.dir / "chat.py").read_text()
+    assert "BatchDispatcher" not in (chat.dir / "other.py").read_text()
@@ -0,0 +1,39 @@
+"""The benchmark harness: synthetic contracts, stage reports and baseline comparison."""
+
+import argparse
+import copy
+
+import bench
+import main as skdsl
+
+
+def test_synthetic_contract_has_the_requested_size():
+    dsl_text = bench.synthesize_contract(tags=6, endpoints=5, requirements=3)
+    dsl_file = skdsl.parse_dsl_file_content(dsl_text)
+    counts = bench.contract_counts(dsl_file, dsl_text)
+    assert counts["tags"] == 6
+    assert counts["endpoints"] == 30
+    assert counts["requirements"] == 3
+
+
+def test_synthetic_contract_is_deterministic_per_seed():
+    assert bench.synthesize_contract(4, 4, 2, seed=1) == bench.synthesize_contract(4, 4, 2, seed=1)
+    assert bench.synthesize_contract(4, 4, 2, seed=1) != bench.synthesize_contract(4, 4, 2, seed=2)
+
+
+def test_report_covers_every_stage():
+    args = argparse.Namespace(tags=3, endpoints=3, requirements=2, seed=0, repeat=1)
+    report = bench.build_report(args, bench.synthesize_contract(3, 3, 2))
+    assert set(report["stages"]) == set(bench.STAGES)
+    assert all(stage["min_s"] >= 0 and stage["peak_bytes"] >= 0 for stage in report["stages"].values())
+    assert "total" in bench.format_report(report)
+
+
+def test_regressions_above_the_threshold_are_flagged():
+    baseline = {"stages": {"parse": {"min_s": 0.010, "peak_bytes": 1000},
+                           "types": {"min_s": 0.010, "peak_bytes": 1000}}}
+    report = copy.deepcopy(baseline)
+    report["stages"]["parse"]["min_s"] = 0.020
+    report["stages"]["types"]["peak_bytes"] = 1100
+    regressions = bench.compare_with_baseline(report, baseline, threshold=0.25, min_time_delta=0.001)
+    assert [(r["stage"], r["metric"]) for r in regressions] == [("parse", "min_s")]
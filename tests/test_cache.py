@@ -0,0 +1,87 @@
+"""`cache/<ttl>` response caches: hits still run the requirements, outgoing items are not stored."""
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+req tokens h/str/X-Access -> h/str/X-Trace
+api tag chat req/tokens cache/30s
+api get/chat/{u64/id} q/bool/full -> b/json/u64
+api get/feed -> b/ndjson/u64
+"""
+
+
+@pytest.fixture
+def chat(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    version_dir = translate.output / "v1"
+    implement(version_dir / "chat.py", {"get_chat_by_id": "CALLS.append(id)\nreturn id * 10 if full else id"})
+    module_path = version_dir / "chat.py"
+    module_path.write_text(module_path.read_text().replace("router = APIRouter(", "CALLS = []\n\nrouter = APIRouter(", 1))
+    # An access check, as a developer would add it to the generated requirement class
+    requirements_path = version_dir / "requirements.py"
+    requirements = requirements_path.read_text().replace("from fastapi import ", "from fastapi import HTTPException, ", 1)
+    requirements = requirements.replace("        self.X_Access = X_Access\n", "        self.X_Access = X_Access\n"
+                                        "        if X_Access != \"secret\":\n"
+                                        "            raise HTTPException(401)\n"
+                                        "        TRACES.append(len(TRACES))\n"
+                                        "        self.set_outgoing(X_Trace=str(TRACES[-1]))\n", 1)
+    requirements_path.write_text(requirements.replace("\n\nclass ", "\n\nTRACES = []\n\nclass ", 1))
+    return load_version(version_dir)
+
+
+async def test_repeated_request_is_a_hit(chat):
+    async with chat.client(headers={"X-Access": "secret"}) as client:
+        first = await client.get("/api/v1/chat/chat/1", params={"full": "true"})
+        second = await client.get("/api/v1/chat/chat/1", params={"full": "true"})
+        other_query = await client.get("/api/v1/chat/chat/1", params={"full": "false"})
+    assert first.json() == second.json() == 10 and other_query.json() == 1
+    assert "age" not in first.headers and "age" in second.headers
+    assert chat.module("chat").CALLS == [1, 1]
+    assert chat.module("chat").GET_CHAT_BY_ID_CACHE.stats()["hits"] == 1
+
+
+async def test_hit_is_refused_to_a_request_the_requirements_reject(chat):
+    async with chat.client() as client:
+        authorized = await client.get("/api/v1/chat/chat/1", params={"full": "true"}, headers={"X-Access": "secret"})
+        anonymous = await client.get("/api/v1/chat/chat/1", params={"full": "true"})
+        wrong = await client.get("/api/v1/chat/chat/1", params={"full": "true"}, headers={"X-Access": "guess"})
+    assert authorized.status_code == 200
+    assert anonymous.status_code == wrong.status_code == 401
+    assert chat.module("chat").CALLS == [1]
+
+
+async def test_outgoing_items_are_set_per_request_not_stored(chat):
+    async with chat.client(headers={"X-Access": "secret"}) as client:
+        first = await client.get("/api/v1/chat/chat/1", params={"full": "true"})
+        second = await client.get("/api/v1/chat/chat/1", params={"full": "true"})
+    assert "age" in second.headers
+    assert (first.headers["x-trace"], second.headers["x-trace"]) == ("0", "1")
+
+
+def test_streamed_responses_get_no_cache(chat):
+    code = (chat.dir / "chat.py").read_text()
+    assert "GET_CHAT_BY_ID_CACHE = ResponseCache(" in code
+    assert "GET_FEED_CACHE" not in code
+
+
+def test_streamed_endpoint_cache_is_ignored_with_a_warning(translate):
+    output = translate("api tag media\napi cache/10s get/file -> b/file\n", "-v", "v1")
+    assert "cache/ and vary/ do not apply to streamed b/ndjson and b/file responses" in output
+    assert "ResponseCache" not in (translate.output / "v1" / "media.py").read_text()
+
+
+async def test_compressed_hit_is_sent_as_stored(translate, load_version):
+    translate("api tag text cache/30s compress/gzip/1\napi get/text -> b/plain\n", "-v", "v1")
+    implement(translate.output / "v1" / "text.py", {"get_text": "return PlainTextResponse(\"hello \" * 20)"})
+    version = load_version(translate.output / "v1")
+    async with version.client(headers={"Accept-Encoding": "gzip"}) as client:
+        first = await client.get("/api/v1/text/text")
+        second = await client.get("/api/v1/text/text")
+        schema = (await client.get("/openapi.json")).json()
+    assert first.headers["content-encoding"] == second.headers["content-encoding"] == "gzip"
+    assert "age" in second.headers and second.text == first.text == "hello " * 20
+    assert "parameters" not in schema["paths"]["/api/v1/text/text"]["get"] # The wrapper's request is injected
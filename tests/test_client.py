@@ -0,0 +1,100 @@
+"""The generated `client.py`, driven in process against the version's own app."""
+
+import inspect
+
+import httpx
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type Msg struct { msg-id: u64, text: String }
+req tokens h/str/X-Access
+api tag chat req/tokens
+api get/chat/{u64/id} q/bool/full h/str/X-Trace -> b/json/Msg
+api post/chat b/json/Msg -> ok
+api get/feed q/u64/count -> b/ndjson/Msg
+api get/text -> b/plain
+api get/file/{**path} -> b/file
+api post/packed b/msgpack/Msg -> b/msgpack/Msg
+
+api tag open
+api get/ping -> b/plain
+"""
+
+
+@pytest.fixture
+def version(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "chat.py", {
+        "get_chat_by_id": "if chat.X_Access != \"token\":\n    raise HTTPException(401)\n"
+                          "return Msg(msg_id=id, text=f\"{full} {chat.request.headers.get('X-Trace')}\")",
+        "post_chat": "RECEIVED.append(payload)",
+        "get_feed": "for i in range(count):\n    yield Msg(msg_id=i, text=\"f\")",
+        "get_text": "return PlainTextResponse(\"hello\")",
+        "get_file_by_path": "return Response(path.encode())",
+        "post_packed": "return payload",
+    })
+    implement(translate.output / "v1" / "open.py", {"get_ping": "return PlainTextResponse(\"pong\")"})
+    module_path = translate.output / "v1" / "chat.py"
+    code = module_path.read_text().replace("router = APIRouter(", "RECEIVED = []\n\nrouter = APIRouter(", 1)
+    code = code.replace("async def get_chat_by_id(id: int, ", "async def get_chat_by_id(id: int, chat: TokensRequirement = Depends(), ", 1)
+    module_path.write_text(code)
+    return load_version(translate.output / "v1")
+
+
+@pytest.fixture
+async def api(version):
+    async with version.module("client").ApiClient.for_app(version.app, X_Access="token") as api:
+        yield api
+
+
+async def test_json_endpoints_round_trip_models(version, api):
+    Msg = version.module("models").Msg
+    assert await api.chat.get_chat_by_id(5, full=True, X_Trace="t1") == Msg(msg_id=5, text="True t1")
+    assert await api.chat.post_chat(payload=Msg(msg_id=1, text="hi")) is None
+    assert version.module("chat").RECEIVED == [Msg(msg_id=1, text="hi")]
+
+
+async def test_other_body_kinds(version, api):
+    assert [m.msg_id async for m in api.chat.get_feed(count=3)] == [0, 1, 2]
+    assert await api.chat.get_text() == "hello"
+    assert await api.chat.get_file_by_path("a b/c.txt") == b"a b/c.txt"
+    Msg = version.module("models").Msg
+    assert await api.chat.post_packed(payload=Msg(msg_id=9, text="p")) == Msg(msg_id=9, text="p")
+    assert await api.open.get_ping() == "pong"
+
+
+async def test_requirements_are_client_defaults(version):
+    client_module = version.module("client")
+    sent = []
+
+    async def record(request):
+        sent.append(request)
+
+    async with client_module.ApiClient.for_app(version.app, X_Access="wrong") as api:
+        api.http.event_hooks["request"].append(record)
+        with pytest.raises(httpx.HTTPStatusError) as error:
+            await api.chat.get_chat_by_id(1, full=False)
+        await api.open.get_ping()
+    assert error.value.response.status_code == 401
+    assert sent[0].headers["X-Access"] == "wrong"
+    assert "X-Access" not in sent[1].headers # Only sent to endpoints that require it
+    assert "X_Access" not in inspect.signature(client_module.ChatClient.get_chat_by_id).parameters
+
+
+async def test_one_connection_pool_is_shared(version):
+    client_module = version.module("client")
+    async with httpx.AsyncClient(base_url="http://testserver", transport=httpx.ASGITransport(app=version.app)) as http:
+        first = client_module.ApiClient(http=http, X_Access="token")
+        second = client_module.ApiClient(http=http)
+        assert first.http is second.http is http
+        assert first.chat._api.http is first.open._api.http
+        await first.aclose()
+        assert not http.is_closed # Owned by the caller
+        assert await second.open.get_ping() == "pong"
+    owned = client_module.ApiClient()
+    await owned.aclose()
+    assert owned.http.is_closed
@@ -0,0 +1,73 @@
+"""`compress/...` on an `api tag` line: negotiated compression of that tag's complete bodies only."""
+
+import gzip
+import zlib
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+api tag chat compress/gzip,deflate/64/9
+api get/big -> b/plain
+api get/small -> b/plain
+api get/feed -> b/ndjson/u64
+
+api tag auth
+api get/token -> b/plain
+"""
+
+BIG = "chat " * 100
+
+
+@pytest.fixture
+def app(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "chat.py", {
+        "get_big": f"return PlainTextResponse({BIG!r})",
+        "get_small": "return PlainTextResponse(\"tiny\")",
+        "get_feed": "for i in range(100):\n    yield i",
+    })
+    implement(translate.output / "v1" / "auth.py", {"get_token": f"return PlainTextResponse({BIG!r})"})
+    return load_version(translate.output / "v1")
+
+
+async def raw_get(client, path, accept_encoding):
+    # Read the body as sent, without httpx decoding it
+    async with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as response:
+        return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+async def test_first_accepted_algorithm_is_used(app):
+    async with app.client() as client:
+        gzipped, gzip_body = await raw_get(client, "/api/v1/chat/big", "deflate;q=0.5, gzip")
+        deflated, deflate_body = await raw_get(client, "/api/v1/chat/big", "gzip;q=0, deflate")
+        plain, plain_body = await raw_get(client, "/api/v1/chat/big", "br")
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(gzip_body).decode() == BIG
+    assert gzipped.headers["content-length"] == str(len(gzip_body))
+    assert deflated.headers["content-encoding"] == "deflate"
+    assert zlib.decompress(deflate_body).decode() == BIG
+    assert "content-encoding" not in plain.headers and plain_body.decode() == BIG
+    for response in (gzipped, deflated, plain):
+        assert "accept-encoding" in response.headers["vary"].lower()
+
+
+async def test_small_streamed_and_other_tag_bodies_are_sent_as_is(app):
+    async with app.client() as client:
+        small, _ = await raw_get(client, "/api/v1/chat/small", "gzip")
+        feed, feed_body = await raw_get(client, "/api/v1/chat/feed", "gzip")
+        token, _ = await raw_get(client, "/api/v1/auth/token", "gzip")
+    assert "content-encoding" not in small.headers
+    assert "content-encoding" not in feed.headers and feed_body.startswith(b"0\n1\n")
+    assert "content-encoding" not in token.headers
+
+
+def test_only_the_asking_tag_gets_compression(app):
+    chat_code = (app.dir / "chat.py").read_text()
+    assert 'TAG_COMPRESSION = ResponseCompression(("gzip", "deflate"), min_size=64, level=9)' in chat_code
+    assert "@route_options(compression=TAG_COMPRESSION)\nasync def get_big" in chat_code
+    assert "@route_options(compression=TAG_COMPRESSION)\nasync def get_feed" not in chat_code
+    assert "ResponseCompression" not in (app.dir / "auth.py").read_text()
@@ -0,0 +1,89 @@
+"""`--fast-json`: bodies validated once by module-level TypeAdapters, responses dumped by them."""
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type Point struct { x: i32, y: i32 }
+type Points Vec<Point>
+api tag geo
+api post/points b/json/Points -> b/json/Vec<Point>
+api post/point b/json/Point -> ok
+"""
+
+
+class CountingAdapter:
+    """Wraps a TypeAdapter and records what its validations return."""
+
+    def __init__(self, adapter):
+        self.adapter = adapter
+        self.results = []
+
+    def validate_json(self, data):
+        self.results.append(self.adapter.validate_json(data))
+        return self.results[-1]
+
+    def validate_python(self, data):
+        self.results.append(self.adapter.validate_python(data))
+        return self.results[-1]
+
+
+@pytest.fixture
+def geo(translate, load_version):
+    translate(CONTRACT, "-v", "v1", "--fast-json")
+    implement(translate.output / "v1" / "geo.py", {
+        "post_points": "RECEIVED.append(payload)\nreturn [Point(x=p.y, y=p.x) for p in payload]",
+        "post_point": "RECEIVED.append(payload)",
+    })
+    module_path = translate.output / "v1" / "geo.py"
+    module_path.write_text(module_path.read_text().replace("router = APIRouter(", "RECEIVED = []\n\nrouter = APIRouter(", 1))
+    return load_version(translate.output / "v1")
+
+
+def route(version, path):
+    return next(r for r in version.module("geo").router.routes if r.path == path)
+
+
+async def test_body_is_validated_once_and_passed_as_is(geo, monkeypatch):
+    counting = CountingAdapter(geo.module("geo").POST_POINTS_BODY)
+    monkeypatch.setitem(route(geo, "/points").endpoint.__skdsl_options__, "body_adapter", counting)
+    async with geo.client() as client:
+        response = await client.post("/api/v1/geo/points", json=[{"x": 1, "y": 2}])
+    assert response.status_code == 200
+    assert response.json() == [{"x": 2, "y": 1}]
+    (received,) = geo.module("geo").RECEIVED
+    assert len(counting.results) == 1
+    assert received is counting.results[0]
+
+
+async def test_invalid_body_is_a_422_in_fastapi_format(geo):
+    async with geo.client() as client:
+        invalid = await client.post("/api/v1/geo/point", json={"x": "1", "y": 2})
+        malformed = await client.post("/api/v1/geo/point", content=b"{", headers={"Content-Type": "application/json"})
+        missing = await client.post("/api/v1/geo/point")
+    assert invalid.status_code == 422
+    (error,) = invalid.json()["detail"]
+    assert error["loc"] == ["body", "x"] and error["type"] == "int_type"
+    assert malformed.status_code == 422
+    assert malformed.json()["detail"][0]["type"] == "json_invalid"
+    assert missing.status_code == 422
+    assert geo.module("geo").RECEIVED == []
+
+
+async def test_non_json_content_type_is_still_validated(geo):
+    async with geo.client() as client:
+        response = await client.post("/api/v1/geo/point", content=b'{"x": 1, "y": 2}', headers={"Content-Type": "text/plain"})
+    assert response.status_code == 422
+    assert geo.module("geo").RECEIVED == []
+
+
+async def test_openapi_documents_the_body(geo):
+    async with geo.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    body = schema["paths"]["/api/v1/geo/point"]["post"]["requestBody"]
+    assert body["required"] is True
+    assert body["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/Point"}
+    assert "Point" in schema["components"]["schemas"]
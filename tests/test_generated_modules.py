@@ -0,0 +1,77 @@
+"""Generated version folders import as packages and route path, rest-path and body parameters."""
+
+import importlib
+import re
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path: # main.py is a single script, not an installed package
+    sys.path.insert(0, str(ROOT))
+
+import main as skdsl # noqa: E402
+
+CONTRACT = """
+type Ids Vec<u64>
+api tag files
+api get/file/{u64/id}/audio-request q/bool/full -> b/json/u64
+api get/raw/{**rest} -> b/plain
+api post/count b/json/Ids -> b/json/u64
+api post/double b/json/u64 -> b/json/u64
+"""
+
+HANDLERS = {
+    "get_file_by_id_audio_request": "return id + full",
+    "get_raw_by_rest": "return PlainTextResponse(rest)",
+    "post_count": "return len(payload)",
+    "post_double": "return payload * 2",
+}
+
+
+def implement(code: str) -> str:
+    for name, body in HANDLERS.items():
+        code, count = re.subn(rf"(async def {name}\(.*\):\n)(?:    .*\n)+", rf"\g<1>    {body}\n", code)
+        assert count == 1, name
+    return code
+
+
+@pytest.fixture
+def generated(tmp_path, monkeypatch):
+    contract = tmp_path / "api.md"
+    contract.write_text(CONTRACT)
+    package_root = tmp_path / "pkg"
+    monkeypatch.setattr(sys, "argv", ["skdsl-py", "-i", str(contract), "-o", str(package_root / "gen_modules"),
+                                      "-v", "v1", "--no-cache"])
+    skdsl.main()
+    version_dir = package_root / "gen_modules" / "v1"
+    (package_root / "gen_modules" / "__init__.py").write_text("")
+    tag_module = version_dir / "files.py"
+    tag_module.write_text(implement(tag_module.read_text()))
+    monkeypatch.syspath_prepend(str(package_root))
+    yield version_dir
+    for name in [name for name in sys.modules if name.split(".", 1)[0] == "gen_modules"]:
+        del sys.modules[name]
+
+
+def test_names_and_paths_are_valid(generated):
+    code = (generated / "files.py").read_text()
+    assert '@router.get("/file/{id}/audio-request"' in code
+    assert "async def get_file_by_id_audio_request(id: int, " in code
+    assert '@router.get("/raw/{rest:path}"' in code
+    assert "from .models import *" in code
+    assert 'version="v1"' in (generated / "main_app.py").read_text()
+
+
+@pytest.mark.anyio
+async def test_generated_app_routes_requests(generated):
+    app = importlib.import_module("gen_modules.v1.main_app").app
+    assert app.version == "v1"
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        assert (await client.get("/api/v1/files/file/4/audio-request", params={"full": "true"})).json() == 5
+        assert (await client.get("/api/v1/files/file/x/audio-request", params={"full": "true"})).status_code == 422
+        assert (await client.get("/api/v1/files/raw/a/b.txt")).text == "a/b.txt"
+        assert (await client.post("/api/v1/files/count", json=[1, 2, 3])).json() == 3 # A list body, not a query param
+        assert (await client.post("/api/v1/files/double", json=21)).json() == 42 # A scalar body, not a query param
@@ -0,0 +1,82 @@
+"""`include` directives: merge order, tag placement, cycles and the per-file parse cache."""
+
+import json
+from pathlib import Path
+
+import main as skdsl
+
+
+def write(path: Path, text: str) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_definition_after_include_overrides_the_included_one(tmp_path, capsys):
+    write(tmp_path / "types.dsl", "type Id u32\n")
+    main_file = write(tmp_path / "api.dsl", "include types.dsl\ntype Id u64\n")
+    dsl_file, _ = skdsl.collect_dsl_files(main_file)
+    assert dsl_file.type_definitions["Id"].definition == "u64"
+    assert "Warning: Type 'Id' is redefined, using 'u64'." in capsys.readouterr().out
+
+
+def test_definition_before_include_is_overridden(tmp_path):
+    write(tmp_path / "types.dsl", "type Id u32\nreq auth h/str/X-Key\n")
+    main_file = write(tmp_path / "api.dsl", "type Id u64\nreq auth h/str/X-Token\ninclude types.dsl\n")
+    dsl_file, _ = skdsl.collect_dsl_files(main_file)
+    assert dsl_file.type_definitions["Id"].definition == "u32"
+    assert dsl_file.complex_requirements["auth"].header_params[0].name == "X-Key"
+
+
+def test_redefinition_in_the_same_file_after_include_wins(tmp_path):
+    write(tmp_path / "types.dsl", "type Id u32\n")
+    main_file = write(tmp_path / "api.dsl", "type Id u16\ninclude types.dsl\ntype Id u64\n")
+    dsl_file, _ = skdsl.collect_dsl_files(main_file)
+    assert dsl_file.type_definitions["Id"].definition == "u64"
+
+
+def test_included_tags_keep_the_directive_position(tmp_path):
+    write(tmp_path / "tags" / "b.dsl", "api tag b\napi get/b -> ok\n")
+    main_file = write(tmp_path / "api.dsl", "api tag a\napi get/a -> ok\ninclude tags/b.dsl\napi tag c\napi get/c -> ok\n")
+    dsl_file, paths = skdsl.collect_dsl_files(main_file)
+    assert [tag.name for tag in dsl_file.tags] == ["a", "b", "c"]
+    assert len(paths) == 2
+
+
+def test_include_cycle_is_reported(tmp_path, capsys):
+    write(tmp_path / "b.dsl", "include a.dsl\n")
+    main_file = write(tmp_path / "a.dsl", "include b.dsl\napi tag a\napi get/a -> ok\n")
+    dsl_file, _ = skdsl.collect_dsl_files(main_file)
+    assert [tag.name for tag in dsl_file.tags] == ["a"]
+    assert "Error: Include cycle detected" in capsys.readouterr().out
+
+
+def test_parsed_files_are_cached_by_content(tmp_path):
+    cache_dir = tmp_path / "cache"
+    main_file = write(tmp_path / "api.dsl", "api tag a\napi get/a -> ok\n")
+    first = skdsl.load_dsl_fragment(main_file, cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 1
+    second = skdsl.load_dsl_fragment(main_file, cache_dir)
+    assert second.to_dict() == first.to_dict()
+    write(main_file, "api tag a\napi get/b -> ok\n")
+    skdsl.load_dsl_fragment(main_file, cache_dir)
+    assert len(list(cache_dir.glob("*.json"))) == 2
+
+
+def test_cached_fragment_is_json_that_rebuilds_the_records(tmp_path):
+    cache_dir = tmp_path / "cache"
+    main_file = write(tmp_path / "api.dsl", "include types.dsl\n"
+                      "type Msg struct { msg-id: u64, text: String }\n"
+                      "req tokens h/str/X-Access -> h/str/X-Trace\n"
+                      "api tag chat req/tokens cache/30s compress/gzip maxbody/1k\n"
+                      "api get/chat/{u64/id} q/bool/full -> b/json/Msg c/seen\n"
+                      "api get/file/{**path} -> b/file\n")
+    parsed = skdsl.load_dsl_fragment(main_file)
+    skdsl.load_dsl_fragment(main_file, cache_dir)
+    (cache_path,) = cache_dir.glob("*.json")
+    json.loads(cache_path.read_text()) # Plain data
+    cached = skdsl.load_dsl_fragment(main_file, cache_dir)
+    assert cached == parsed
+    assert cached.includes == [(0, 0, "types.dsl")]
+    cache_path.write_bytes(b"\x80\x04not json")
+    assert skdsl.load_dsl_fragment(main_file, cache_dir) == parsed # A broken entry is parsed again
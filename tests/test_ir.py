@@ -0,0 +1,52 @@
+"""The slotted IR records and their `.api.json` serialization."""
+
+import json
+
+import pytest
+
+import main as skdsl
+
+CONTRACT = """
+type Point (i32, i32)
+req tokens h/str/X-Access
+
+api tag geo req/tokens
+api get/point/{u64/id} h/str/X-Client -> b/json/Point
+api get/points h/str/X-Client -> b/json/Vec<Point>
+"""
+
+
+def test_records_have_no_instance_dict():
+    endpoint = skdsl.parse_dsl_file_content(CONTRACT).tags[0].endpoints[0]
+    with pytest.raises(AttributeError):
+        endpoint.unknown_field = 1
+    assert not hasattr(endpoint, "__dict__")
+
+
+def test_equal_parameters_are_shared_between_endpoints():
+    first, second = skdsl.parse_dsl_file_content(CONTRACT).tags[0].endpoints
+    assert first.header_params[0] is second.header_params[0]
+
+
+def test_copy_replaces_fields_without_touching_the_original():
+    param = skdsl.parse_dsl_file_content(CONTRACT).tags[0].endpoints[0].header_params[0]
+    hidden = param.copy(is_hidden=True)
+    assert hidden.is_hidden and not param.is_hidden
+    assert hidden.name == param.name
+    assert hidden != param
+
+
+def test_to_dict_follows_slot_order():
+    tag = skdsl.parse_dsl_file_content(CONTRACT).tags[0]
+    assert list(tag.to_dict()) == list(skdsl.DslTag.__slots__)
+    assert list(tag.endpoints[0].to_dict()) == list(skdsl.DslEndpoint.__slots__)
+
+
+def test_api_json_is_the_serialized_ir(translate):
+    translate(CONTRACT, "-v", "v1")
+    api_json = json.loads((translate.output / "v1" / ".api.json").read_text())
+    dsl_file = skdsl.parse_dsl_file_content(CONTRACT)
+    assert api_json["tags"][0]["name"] == "geo"
+    assert api_json["type_definitions"]["Point"] == dsl_file.type_definitions["Point"].to_dict()
+    assert api_json["tags"][0]["endpoints"][0]["final_header_params"] == [
+        p.to_dict() for p in dsl_file.tags[0].endpoints[0].final_header_params]
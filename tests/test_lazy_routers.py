@@ -0,0 +1,69 @@
+"""`--lazy-routers`: tag modules are imported on the first request under their prefix."""
+
+import sys
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type A struct { x: i32 }
+api tag one
+api get/a -> b/json/A
+
+api tag two
+api get/b -> ok
+"""
+
+
+@pytest.fixture
+def lazy(translate, load_version):
+    translate(CONTRACT, "-v", "v1", "--lazy-routers")
+    implement(translate.output / "v1" / "one.py", {"get_a": "return A(x=1)"})
+    version = load_version(translate.output / "v1")
+    version.app # Imports main_app
+    return version
+
+
+def imported(version, name):
+    return f"{version.package}.{name}" in sys.modules
+
+
+async def test_startup_imports_no_tag_module(lazy):
+    assert not imported(lazy, "one") and not imported(lazy, "two") and not imported(lazy, "models")
+    assert "import" not in (lazy.dir / "main_app.py").read_text().split("lazy_include_router", 1)[1]
+
+
+async def test_first_request_loads_only_its_tag(lazy):
+    async with lazy.client() as client:
+        first = await client.get("/api/v1/one/a")
+        second = await client.get("/api/v1/one/a")
+    assert first.status_code == second.status_code == 200
+    assert first.json() == {"x": 1}
+    assert imported(lazy, "one") and imported(lazy, "models")
+    assert not imported(lazy, "two")
+    loaded = {lazy_router.prefix: lazy_router.loaded for lazy_router in lazy.app.skdsl_lazy_routers}
+    assert loaded == {"/api/v1/one": True, "/api/v1/two": False}
+
+
+async def test_unknown_path_under_a_lazy_prefix_is_404(lazy):
+    async with lazy.client() as client:
+        response = await client.get("/api/v1/two/missing")
+    assert response.status_code == 404
+    assert imported(lazy, "two")
+
+
+async def test_openapi_loads_every_router(lazy):
+    async with lazy.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    assert {"/api/v1/one/a", "/api/v1/two/b"} <= set(schema["paths"])
+    assert imported(lazy, "one") and imported(lazy, "two")
+
+
+async def test_load_lazy_routers_warms_everything_up(lazy):
+    lazy.module("runtime").load_lazy_routers(lazy.app)
+    assert imported(lazy, "one") and imported(lazy, "two")
+    async with lazy.client() as client:
+        assert (await client.get("/api/v1/two/b")).status_code == 200
@@ -0,0 +1,86 @@
+"""`maxbody/` and `inflight/`: 413 before the body is buffered, 503 with Retry-After past the bound."""
+
+import asyncio
+
+import anyio
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type P struct { x: i32 }
+api tag up maxbody/1k inflight/2/3s
+api maxbody/16 post/small b/json/P -> ok
+api get/slow -> ok
+"""
+
+
+@pytest.fixture
+def up(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "up.py", {
+        "post_small": "CALLS.append(payload)",
+        "get_slow": "CALLS.append(\"slow\")\nawait GATE.wait()",
+    })
+    module_path = translate.output / "v1" / "up.py"
+    module_path.write_text(module_path.read_text().replace("router = APIRouter(", "CALLS = []\nGATE = None\n\nrouter = APIRouter(", 1))
+    return load_version(translate.output / "v1")
+
+
+async def test_declared_oversized_body_is_rejected_unread(up):
+    async with up.client() as client:
+        ok = await client.post("/api/v1/up/small", json={"x": 1})
+        too_large = await client.post("/api/v1/up/small", json={"x": 1, "padding": "x" * 32})
+    assert ok.status_code == 200
+    assert too_large.status_code == 413
+    assert up.module("up").CALLS == [up.module("models").P(x=1)]
+    assert up.module("up").POST_SMALL_LIMITS.too_large == 1
+
+
+async def test_streamed_oversized_body_is_cut_off(up):
+    async def chunks():
+        yield b'{"x": 1, "padding": "'
+        yield b"x" * 64
+        yield b'"}'
+
+    async with up.client() as client:
+        response = await client.post("/api/v1/up/small", content=chunks(), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+    assert up.module("up").CALLS == []
+
+
+async def test_requests_over_the_tag_bound_are_shed(up):
+    module = up.module("up")
+    module.GATE = asyncio.Event()
+    statuses = []
+    async with up.client() as client:
+        async def slow():
+            statuses.append((await client.get("/api/v1/up/slow")).status_code)
+
+        async with anyio.create_task_group() as tasks:
+            tasks.start_soon(slow)
+            tasks.start_soon(slow)
+            while len(module.CALLS) < 2:
+                await anyio.sleep(0.001)
+            shed = await client.get("/api/v1/up/slow")
+            module.GATE.set()
+    assert shed.status_code == 503
+    assert shed.headers["retry-after"] == "3"
+    assert statuses == [200, 200]
+    assert module.TAG_IN_FLIGHT.active == 0
+    assert module.GET_SLOW_LIMITS.shed == 1
+
+
+def test_generated_guards(up):
+    code = (up.dir / "up.py").read_text()
+    assert "TAG_IN_FLIGHT = InFlightLimit(2, retry_after=3)" in code
+    assert "POST_SMALL_LIMITS = RequestLimits(max_body=16, in_flight=(TAG_IN_FLIGHT,))" in code
+    assert "GET_SLOW_LIMITS = RequestLimits(in_flight=(TAG_IN_FLIGHT,))" in code # maxbody/ needs a body
+
+
+def test_maxbody_without_a_body_is_ignored_with_a_warning(translate):
+    output = translate("api tag up\napi maxbody/1k get/ping -> ok\n", "-v", "v1")
+    assert "Warning:" in output and "maxbody/" in output
+    assert "RequestLimits" not in (translate.output / "v1" / "up.py").read_text()
@@ -0,0 +1,73 @@
+"""The generated `loadtest.py`: synthetic valid requests to every endpoint, in process."""
+
+import json
+import subprocess
+import sys
+
+import pytest
+
+from conftest import implement
+
+CONTRACT = """
+type Color enum { Red, Green }
+type Point struct { x: i32, y: i32, color: Option<Color> }
+req tokens h/str/X-Access
+api tag geo req/tokens
+api get/point/{u64/id} q/bool/full -> b/json/Point
+api post/points b/json/Vec<Point> -> b/json/u64
+api post/upload f/str/name -> ok
+"""
+
+
+@pytest.fixture
+def geo(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "geo.py", {
+        "get_point_by_id": "return Point(x=id, y=int(full), color=None)",
+        "post_points": "return len(payload)",
+    })
+    return load_version(translate.output / "v1")
+
+
+def test_cases_list_every_endpoint_with_its_inputs(geo):
+    cases = {case.endpoint: case for case in geo.module("loadtest").CASES}
+    assert set(cases) == {"get_point_by_id", "post_points", "post_upload"}
+    point = cases["get_point_by_id"]
+    assert (point.method, point.path) == ("GET", "/api/v1/geo/point/{id}")
+    assert point.path_params == {"id": int} and point.query == {"full": bool}
+    assert point.headers == {"X-Access": str} # From the tag's requirement
+    assert cases["post_points"].body_kind == "json"
+    assert cases["post_upload"].body_kind == "form"
+
+
+def test_sampled_inputs_are_valid(geo):
+    loadtest = geo.module("loadtest")
+    (points,) = [case for case in loadtest.CASES if case.endpoint == "post_points"]
+    path, request = loadtest.build_request(points)
+    assert path == "/api/v1/geo/points"
+    models = geo.module("models")
+    (point,) = request["json"]
+    models.Point.model_validate(point)
+    assert request["headers"]["X-Access"]
+
+
+def test_run_reports_every_endpoint(translate, geo):
+    result = subprocess.run([sys.executable, "-m", "v1.loadtest", "--requests", "5", "--warmup", "1", "--json", "-"],
+                            cwd=translate.output, capture_output=True, text=True, check=True)
+    results = {r["endpoint"]: r for r in json.loads(result.stdout)}
+    assert set(results) == {"get_point_by_id", "post_points", "post_upload"}
+    for endpoint in results.values():
+        assert endpoint["statuses"] == {"200": 5}, endpoint
+        assert endpoint["rps"] > 0 and endpoint["p99_ms"] >= endpoint["p50_ms"] > 0
+
+
+def test_baseline_comparison_and_match(translate, geo):
+    baseline = translate.output / "base.json"
+    subprocess.run([sys.executable, "-m", "v1.loadtest", "--requests", "3", "--warmup", "0", "--json", str(baseline)],
+                   cwd=translate.output, capture_output=True, text=True, check=True)
+    result = subprocess.run([sys.executable, "-m", "v1.loadtest", "--requests", "3", "--warmup", "0",
+                             "--match", "geo.post_points", "--baseline", str(baseline)],
+                            cwd=translate.output, capture_output=True, text=True, check=True)
+    rows = result.stdout.splitlines()[1:]
+    assert len(rows) == 1 and rows[0].startswith("geo.post_points")
+    assert "x baseline" in rows[0]
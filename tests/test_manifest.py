@@ -0,0 +1,58 @@
+"""Incremental regeneration driven by `.api.manifest.json` (`-r`)."""
+
+import json
+
+import main as skdsl
+
+CONTRACT = """
+type Point struct { x: i32, y: i32 }
+
+api tag geo
+api get/point/{u64/id} -> b/json/Point
+
+api tag misc
+api get/ping -> ok
+"""
+
+
+def test_manifest_records_a_hash_per_tag(translate):
+    translate(CONTRACT, "-v", "v1")
+    manifest = json.loads((translate.output / "v1" / skdsl.MANIFEST_FILE_NAME).read_text())
+    assert manifest["format"] == skdsl.MANIFEST_FORMAT
+    assert set(manifest["tags"]) == {"geo", "misc"}
+    assert manifest["tags"]["geo"]["module"] == "geo.py"
+
+
+def test_unchanged_contract_rewrites_nothing(translate):
+    translate(CONTRACT, "-v", "v1")
+    output = translate(CONTRACT, "-v", "v1", "-r")
+    assert translate.generated(output) == []
+    assert "Skipped 2 unchanged tag module(s)" in output
+
+
+def test_only_changed_tag_is_regenerated(translate):
+    translate(CONTRACT, "-v", "v1")
+    misc_module = translate.output / "v1" / "misc.py"
+    misc_module.write_text(misc_module.read_text() + "# edited by hand\n")
+
+    output = translate(CONTRACT.replace("get/point/{u64/id}", "get/point/{u64/id} q/bool/full"), "-v", "v1", "-r")
+    assert "geo.py" in translate.generated(output)
+    assert "misc.py" not in translate.generated(output)
+    assert misc_module.read_text().endswith("# edited by hand\n")
+
+
+def test_changed_referenced_type_moves_the_tag_hash(translate):
+    manifest_path = translate.output / "v1" / skdsl.MANIFEST_FILE_NAME
+    translate(CONTRACT, "-v", "v1")
+    before = json.loads(manifest_path.read_text())["tags"]
+    output = translate(CONTRACT.replace("y: i32", "y: i64"), "-v", "v1", "-r")
+    after = json.loads(manifest_path.read_text())["tags"]
+    assert after["geo"]["hash"] != before["geo"]["hash"]
+    assert after["misc"] == before["misc"]
+    assert "Skipped 1 unchanged tag module(s)" in output
+
+
+def test_without_regenerate_existing_modules_are_kept(translate):
+    translate(CONTRACT, "-v", "v1")
+    output = translate(CONTRACT.replace("get/ping", "get/pong"), "-v", "v1")
+    assert translate.generated(output) == []
@@ -0,0 +1,69 @@
+"""`--metrics`: per-route metrics keyed by tag and func_name, served in the Prometheus text format."""
+
+import re
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+api tag chat
+api get/chat/{u64/id} -> b/json/u64
+api get/ping -> ok
+"""
+
+
+@pytest.fixture
+def chat(translate, load_version):
+    translate(CONTRACT, "-v", "v1", "--metrics")
+    implement(translate.output / "v1" / "chat.py", {"get_chat_by_id": "return id"})
+    return load_version(translate.output / "v1")
+
+
+def sample(text: str, name: str, **labels: str) -> float:
+    label_text = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    match = re.search(rf"^{re.escape(name)}{{{re.escape(label_text)}}} (\S+)$", text, re.MULTILINE)
+    assert match, f"no sample {name}{{{label_text}}}"
+    return float(match.group(1))
+
+
+async def test_routes_are_keyed_by_tag_and_func_name(chat):
+    async with chat.client() as client:
+        for chat_id in (1, 22, 333):
+            await client.get(f"/api/v1/chat/chat/{chat_id}")
+        await client.get("/api/v1/chat/chat/not-a-number")
+        response = await client.get("/api/v1/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    route = {"tag": "chat", "endpoint": "get_chat_by_id"}
+    assert sample(text, "skdsl_requests_total", **route, status="200") == 3
+    assert sample(text, "skdsl_requests_total", **route, status="422") == 1
+    assert sample(text, "skdsl_request_duration_seconds_count", **route) == 4
+    assert sample(text, "skdsl_request_duration_seconds_bucket", **route, le="+Inf") == 4
+    assert sample(text, "skdsl_requests_in_flight", **route) == 0
+    assert sample(text, "skdsl_response_bytes_total", **route) == len("1") + len("22") + len("333")
+    assert "/chat/1" not in text # Path parameters add no series
+
+
+async def test_histogram_buckets_are_cumulative(chat):
+    async with chat.client() as client:
+        await client.get("/api/v1/chat/ping")
+        text = (await client.get("/api/v1/metrics")).text
+    counts = [float(value) for value in re.findall(
+        r'^skdsl_request_duration_seconds_bucket\{tag="chat",endpoint="get_ping",le="[^"]+"\} (\S+)$', text, re.MULTILINE)]
+    assert len(counts) > 2 and counts == sorted(counts) and counts[-1] == 1
+
+
+async def test_metrics_endpoint_is_not_in_the_schema(chat):
+    async with chat.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    assert "/api/v1/metrics" not in schema["paths"]
+    assert "/api/v1/chat/chat/{id}" in schema["paths"]
+
+
+def test_without_the_flag_nothing_is_metered(translate):
+    translate(CONTRACT, "-v", "v1")
+    assert "metered_route" not in (translate.output / "v1" / "chat.py").read_text()
+    assert "metrics" not in (translate.output / "v1" / "main_app.py").read_text()
@@ -0,0 +1,57 @@
+"""`b/msgpack` request decoding and response encoding in generated routers."""
+
+import msgpack
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type Point struct { x: i32, y: i32 }
+type Scores HashMap<String, u32>
+api tag geo
+api post/echo b/msgpack/Point -> b/msgpack/Point
+api get/scores -> b/msgpack/Scores
+"""
+
+
+@pytest.fixture
+def geo(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "geo.py", {
+        "post_echo": "return Point(x=payload.x + 1, y=payload.y)",
+        "get_scores": 'return {"alice": 3}',
+    })
+    return load_version(translate.output / "v1")
+
+
+async def test_msgpack_body_and_response(geo):
+    async with geo.client() as client:
+        response = await client.post("/api/v1/geo/echo", content=msgpack.packb({"x": 1, "y": 2}),
+                                     headers={"Content-Type": "application/msgpack"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == {"x": 2, "y": 2}
+
+
+async def test_json_body_is_still_accepted(geo):
+    async with geo.client() as client:
+        response = await client.post("/api/v1/geo/echo", json={"x": 1, "y": 2})
+    assert msgpack.unpackb(response.content) == {"x": 2, "y": 2}
+
+
+async def test_accept_json_selects_a_json_response(geo):
+    async with geo.client() as client:
+        response = await client.get("/api/v1/geo/scores", headers={"Accept": "application/json"})
+    assert response.headers["content-type"].startswith("application/json")
+    assert response.json() == {"alice": 3}
+
+
+async def test_invalid_msgpack_body_is_rejected(geo):
+    async with geo.client() as client:
+        malformed = await client.post("/api/v1/geo/echo", content=b"\xc1", headers={"Content-Type": "application/msgpack"})
+        invalid = await client.post("/api/v1/geo/echo", content=msgpack.packb({"x": "1", "y": 2}),
+                                    headers={"Content-Type": "application/msgpack"})
+    assert malformed.status_code == 400
+    assert invalid.status_code == 422
@@ -0,0 +1,76 @@
+"""`b/ndjson/<T>`: items streamed as JSON lines, each validated and dumped when it is produced."""
+
+import json
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type Msg struct { id: u64, text: String }
+api tag chat
+api get/messages q/u64/count -> b/ndjson/Msg
+api get/listed -> b/ndjson/Msg
+api get/pages -> b/ndjson/Vec<u8>
+"""
+
+
+@pytest.fixture
+def chat(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    implement(translate.output / "v1" / "chat.py", {
+        "get_messages": "for i in range(count):\n    yield Msg(id=i, text=f\"m{i}\")",
+        "get_listed": "return iter([{\"id\": 1, \"text\": \"dict\"}, Msg(id=2, text=\"model\")])",
+        "get_pages": "yield [1, 2]\nyield []",
+    })
+    return load_version(translate.output / "v1")
+
+
+def lines(response):
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+async def test_yielded_items_become_json_lines(chat):
+    async with chat.client() as client:
+        response = await client.get("/api/v1/chat/messages", params={"count": 3})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.text.endswith("\n")
+    assert lines(response) == [{"id": i, "text": f"m{i}"} for i in range(3)]
+
+
+async def test_returned_sync_iterable_is_validated_per_item(chat):
+    async with chat.client() as client:
+        listed = await client.get("/api/v1/chat/listed")
+        pages = await client.get("/api/v1/chat/pages")
+    assert lines(listed) == [{"id": 1, "text": "dict"}, {"id": 2, "text": "model"}]
+    assert lines(pages) == [[1, 2], []]
+
+
+async def test_lines_are_produced_as_items_arrive(chat):
+    runtime = chat.module("runtime")
+    pulled = []
+
+    async def source():
+        for i in range(3):
+            pulled.append(i)
+            yield {"id": i, "text": "x"}
+
+    stream = runtime.ndjson_lines(source(), chat.module("chat").GET_MESSAGES_ITEM)
+    first = await stream.__anext__()
+    assert json.loads(first) == {"id": 0, "text": "x"}
+    assert pulled == [0] # Nothing is read ahead
+    rest = [line async for line in stream]
+    assert len(rest) == 2 and pulled == [0, 1, 2]
+
+
+async def test_openapi_and_stub(chat):
+    code = (chat.dir / "chat.py").read_text()
+    assert "GET_MESSAGES_ITEM = TypeAdapter(Msg)" in code
+    assert "@route_options(ndjson_item=GET_MESSAGES_ITEM)" in code
+    assert "response_model" not in code.split("async def get_messages")[0].rsplit("@router.get", 1)[1]
+    async with chat.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    assert "application/x-ndjson" in schema["paths"]["/api/v1/chat/messages"]["get"]["responses"]["200"]["content"]
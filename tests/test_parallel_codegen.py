@@ -0,0 +1,24 @@
+"""`--jobs`: tag modules generated in a process pool are identical to a serial run."""
+
+import main as skdsl
+
+CONTRACT = "type Item struct { id: u64, name: String }\n" + "".join(
+    f"api tag tag{n}\napi get/items q/u32/page -> b/json/Vec<Item>\napi post/items b/json/Item -> ok\n" for n in range(6)
+)
+
+
+def test_pool_output_matches_serial_output(translate):
+    translate(CONTRACT, "-v", "v1", "-j", "1")
+    translate(CONTRACT, "-v", "v2", "-j", "3")
+    # Tag modules and models.py do not mention the version
+    for name in ["models.py"] + [f"tag{n}.py" for n in range(6)]:
+        assert (translate.output / "v2" / name).read_text() == (translate.output / "v1" / name).read_text()
+
+
+def test_write_tag_modules_keeps_tag_order_and_skips_unchanged_files(tmp_path):
+    dsl_file = skdsl.parse_dsl_file_content(CONTRACT)
+    results = skdsl.write_tag_modules(dsl_file.tags, dsl_file, tmp_path, jobs=2)
+    assert [path.name for path, _ in results] == [f"tag{n}.py" for n in range(6)]
+    assert all(written for _, written in results)
+    again = skdsl.write_tag_modules(dsl_file.tags, dsl_file, tmp_path, jobs=2)
+    assert not any(written for _, written in again)
@@ -0,0 +1,81 @@
+"""`req` blocks as dependency classes in requirements.py, tag-level ones as router dependencies."""
+
+import functools
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+req tokens h/str/X-Access h/str/X-Refresh
+req session c/sid -> h/str/X-Next c/seen
+req/hidden secret h/str/X-Secret
+api tag chat req/tokens
+api req/session req/secret get/chat/{u64/id} -> b/json/u64
+api req/session get/plain -> b/plain
+"""
+
+
+@pytest.fixture
+def chat(translate, load_version):
+    translate(CONTRACT, "-v", "v1")
+    module_path = translate.output / "v1" / "chat.py"
+    implement(module_path, {
+        "get_chat_by_id": "SEEN.append((tokens, session_req.sid, secret_req.X_Secret))\n"
+                          "session_req.set_outgoing(X_Next=str(id + 1), seen=\"yes\")\n"
+                          "return id",
+        "get_plain": "session_req.set_response_header(\"X-Next\", \"plain\")\n"
+                     "return PlainTextResponse(\"text\")",
+    })
+    code = module_path.read_text().replace("router = APIRouter(", "SEEN = []\n\nrouter = APIRouter(", 1)
+    code = code.replace("secret_req: SecretRequirement = Depends()",
+                        "secret_req: SecretRequirement = Depends(), tokens: TokensRequirement = Depends()", 1)
+    module_path.write_text(code)
+    return load_version(translate.output / "v1")
+
+
+def test_requirements_are_not_expanded_into_signatures(chat):
+    code = (chat.dir / "chat.py").read_text()
+    assert "dependencies=[Depends(TokensRequirement)]" in code
+    assert "X_Access" not in code
+    requirements = (chat.dir / "requirements.py").read_text()
+    assert requirements.count("class TokensRequirement(Requirement)") == 1
+    assert "def set_outgoing(self, *, X_Next: Optional[str] = None, seen: Optional[str] = None)" in requirements
+
+
+async def test_values_are_read_once_per_request(chat, monkeypatch):
+    requirement = chat.module("requirements").TokensRequirement
+    built = []
+    original_init = requirement.__init__
+
+    @functools.wraps(original_init) # FastAPI reads the parameters from the signature
+    def counting_init(self, *args, **kwargs):
+        built.append(self)
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(requirement, "__init__", counting_init)
+    async with chat.client(cookies={"sid": "abc"}) as client:
+        response = await client.get("/api/v1/chat/chat/7", headers={"X-Access": "a", "X-Secret": "s"})
+    assert response.status_code == 200 and response.json() == 7
+    (tokens, sid, secret), = chat.module("chat").SEEN
+    assert built == [tokens] # The router dependency and the handler share one instance
+    assert (tokens.X_Access, tokens.X_Refresh, sid, secret) == ("a", None, "abc", "s")
+
+
+async def test_outgoing_items_are_added_to_the_response(chat):
+    async with chat.client() as client:
+        response = await client.get("/api/v1/chat/chat/7")
+        plain = await client.get("/api/v1/chat/plain")
+    assert response.headers["x-next"] == "8"
+    assert response.cookies["seen"] == "yes"
+    assert plain.text == "text" and plain.headers["x-next"] == "plain"
+
+
+async def test_hidden_requirement_is_left_out_of_the_schema(chat):
+    async with chat.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    names = {p["name"] for p in schema["paths"]["/api/v1/chat/chat/{id}"]["get"]["parameters"]}
+    assert {"id", "X-Access", "X-Refresh", "sid"} <= names
+    assert "X-Secret" not in names
@@ -0,0 +1,42 @@
+"""Merging of `req` blocks into endpoints: order, de-duplication and hidden requirements."""
+
+import main as skdsl
+
+CONTRACT = """
+req tokens h/str/X-Access h/str/X-Refresh
+req session h/str/X-Access c/session -> h/str/X-Sign
+req/hidden debug q/bool/trace
+
+api tag chat req/tokens
+api req/session req/debug get/chat h/str/X-Refresh -> ok
+"""
+
+
+def names(params):
+    return [p.name for p in params]
+
+
+def test_endpoint_definitions_win_then_endpoint_then_tag_requirements():
+    endpoint = skdsl.parse_dsl_file_content(CONTRACT).tags[0].endpoints[0]
+    assert names(endpoint.final_header_params) == ["X-Refresh", "X-Access"]
+    assert names(endpoint.final_cookie_params) == ["session"]
+    assert names(endpoint.final_response_headers) == ["X-Sign"]
+
+
+def test_hidden_requirement_parameters_are_hidden():
+    endpoint = skdsl.parse_dsl_file_content(CONTRACT).tags[0].endpoints[0]
+    (trace,) = endpoint.final_query_params
+    assert trace.name == "trace" and trace.is_hidden
+
+
+def test_first_requirement_with_a_name_wins():
+    requirements = skdsl.parse_dsl_fragment(CONTRACT).complex_requirements
+    merged = skdsl.merge_complex_requirements(("session", "tokens"), requirements)
+    assert names(merged.header_params) == ["X-Access", "X-Refresh"]
+    assert merged.header_params[0] is requirements["session"].header_params[0]
+
+
+def test_unknown_requirement_is_reported(capsys):
+    merged = skdsl.merge_complex_requirements(("missing",), {})
+    assert merged == skdsl.MergedRequirements([], [], [], [], [])
+    assert "Warning: Unknown complex requirement 'req/missing'." in capsys.readouterr().out
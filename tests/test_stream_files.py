@@ -0,0 +1,95 @@
+"""`--stream-files`: raw-body uploads read chunk by chunk and ranged, chunked file downloads."""
+
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+api tag media
+api post/audio/{u64/id} b/file/audio -> b/json/u64
+api get/audio/{u64/id} -> b/file
+"""
+
+PAYLOAD = b"0123456789abcdef"
+
+
+@pytest.fixture
+def media(translate, load_version, tmp_path):
+    translate(CONTRACT, "-v", "v1", "--stream-files", "--file-chunk-size", "4")
+    stored = tmp_path / "audio.bin"
+    stored.write_bytes(PAYLOAD)
+    implement(translate.output / "v1" / "media.py", {
+        "post_audio_by_id": "chunks = [chunk async for chunk in audio]\n"
+                            "UPLOADS.append((audio.media_type, audio.size, audio.filename, chunks))\n"
+                            "return sum(map(len, chunks))",
+        "get_audio_by_id": f"return stream_file({str(stored)!r}, request, chunk_size=FILE_CHUNK_SIZE)",
+    })
+    module_path = translate.output / "v1" / "media.py"
+    module_path.write_text(module_path.read_text().replace("router = APIRouter(", "UPLOADS = []\n\nrouter = APIRouter(", 1))
+    return load_version(translate.output / "v1")
+
+
+def test_generated_signatures(media):
+    code = (media.dir / "media.py").read_text()
+    assert "FILE_CHUNK_SIZE = 4" in code
+    assert "audio: FileStream = Depends(file_stream)" in code
+    assert "UploadFile = File(...)" not in code
+
+
+async def test_upload_is_streamed_from_the_raw_body(media):
+    async def body():
+        yield b"abc"
+        yield b""
+        yield b"def"
+
+    async with media.client() as client:
+        response = await client.post("/api/v1/media/audio/1", content=PAYLOAD, headers={
+            "Content-Type": "audio/ogg", "Content-Disposition": 'attachment; filename="a.ogg"'})
+        chunked = await client.post("/api/v1/media/audio/2", content=body())
+    assert response.status_code == 200 and response.json() == len(PAYLOAD)
+    (media_type, size, filename, chunks), (_, chunked_size, _, parts) = media.module("media").UPLOADS
+    assert (media_type, size, filename) == ("audio/ogg", len(PAYLOAD), "a.ogg")
+    assert b"".join(chunks) == PAYLOAD
+    assert chunked_size is None and parts == [b"abc", b"def"] # Empty chunks are skipped
+
+
+async def test_download_sends_the_whole_file(media):
+    async with media.client() as client:
+        response = await client.get("/api/v1/media/audio/1")
+    assert response.status_code == 200
+    assert response.content == PAYLOAD
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-length"] == str(len(PAYLOAD))
+
+
+@pytest.mark.parametrize("byte_range, status, content", [
+    ("bytes=2-5", 206, PAYLOAD[2:6]),
+    ("bytes=10-", 206, PAYLOAD[10:]),
+    ("bytes=-3", 206, PAYLOAD[-3:]),
+    ("bytes=4-100", 206, PAYLOAD[4:]),
+    ("bytes=0-1,4-5", 200, PAYLOAD), # Several ranges: the whole file
+])
+async def test_download_answers_a_range(media, byte_range, status, content):
+    async with media.client() as client:
+        response = await client.get("/api/v1/media/audio/1", headers={"Range": byte_range})
+    assert response.status_code == status
+    assert response.content == content
+    if status == 206:
+        start = PAYLOAD.index(content)
+        assert response.headers["content-range"] == f"bytes {start}-{start + len(content) - 1}/{len(PAYLOAD)}"
+
+
+async def test_range_outside_the_file_is_416(media):
+    async with media.client() as client:
+        response = await client.get("/api/v1/media/audio/1", headers={"Range": "bytes=16-20"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(PAYLOAD)}"
+
+
+async def test_openapi_documents_the_raw_body(media):
+    async with media.client() as client:
+        schema = (await client.get("/openapi.json")).json()
+    body = schema["paths"]["/api/v1/media/audio/{id}"]["post"]["requestBody"]
+    assert body["content"]["application/octet-stream"]["schema"] == {"type": "string", "format": "binary"}
@@ -0,0 +1,89 @@
+"""`type X struct { ... }`: complete Pydantic models, strict integers, aliases kept on every path."""
+
+import json
+
+import pydantic
+import pytest
+
+from conftest import implement
+
+pytestmark = pytest.mark.anyio
+
+CONTRACT = """
+type User struct { user-id: u64, name: String, age: Option<u8> }
+type Point struct { x: i32, y: i32 }
+type Users Vec<User>
+api tag users
+api post/user b/json/User -> b/json/User
+api get/users -> b/json/Users
+api get/feed -> b/ndjson/User
+api post/packed b/msgpack/User -> b/msgpack/User
+"""
+
+HANDLERS = {
+    "post_user": "return payload",
+    "get_users": "return [User(user_id=1, name=\"a\")]",
+    "get_feed": "yield User(user_id=2, name=\"b\", age=3)",
+    "post_packed": "return payload",
+}
+
+
+def load(translate, load_version, *args):
+    translate(CONTRACT, "-v", "v1", *args)
+    implement(translate.output / "v1" / "users.py", HANDLERS)
+    return load_version(translate.output / "v1")
+
+
+def test_models_are_strict_and_frozen(translate, load_version):
+    models = load(translate, load_version).module("models")
+    user = models.User.model_validate({"user-id": 1, "name": "a"})
+    assert user.age is None
+    assert models.User(user_id=1, name="a") == user # populate_by_name
+    with pytest.raises(pydantic.ValidationError):
+        models.User.model_validate({"user-id": "1", "name": "a"}) # Strict: no str -> int
+    with pytest.raises(pydantic.ValidationError):
+        models.User.model_validate({"user-id": 1, "name": "a", "age": 256}) # u8 range
+    with pytest.raises(pydantic.ValidationError):
+        models.User.model_validate({"user-id": -1, "name": "a"}) # u64 range
+    assert hash(models.Point(x=1, y=2)) == hash(models.Point(x=1, y=2))
+    assert models.UsersAdapter.validate_python([{"user-id": 1, "name": "a"}]) == [user]
+
+
+def test_model_classes_are_set_off_by_two_empty_lines(translate, load_version):
+    code = (load(translate, load_version).dir / "models.py").read_text()
+    assert "\n\n\nclass User(BaseModel):" in code
+    assert "    age: Optional[StrictU8] = None\n\n\nclass Point(BaseModel):" in code
+    assert "\n\n\n\n" not in code
+
+
+async def aliased_bodies(version):
+    async with version.client() as client:
+        posted = await client.post("/api/v1/users/user", json={"user-id": 7, "name": "x"})
+        listed = await client.get("/api/v1/users/users")
+        feed = await client.get("/api/v1/users/feed")
+        packed = await client.post("/api/v1/users/packed", json={"user-id": 8, "name": "y"},
+                                   headers={"Accept": "application/json"})
+    return posted.json(), listed.json(), [json.loads(line) for line in feed.text.splitlines()], packed.json()
+
+
+async def test_fast_and_default_paths_emit_the_same_aliases(translate, load_version):
+    default = await aliased_bodies(load(translate, load_version))
+    fast = await aliased_bodies(load(translate, load_version, "--fast-json", "-r"))
+    assert fast == default
+    posted, listed, feed, packed = fast
+    assert posted == {"user-id": 7, "name": "x", "age": None}
+    assert listed == [{"user-id": 1, "name": "a", "age": None}]
+    assert feed == [{"user-id": 2, "name": "b", "age": 3}]
+    assert packed == {"user-id": 8, "name": "y", "age": None}
+
+
+def test_client_sends_aliases(translate, load_version):
+    version = load(translate, load_version)
+    client_module = version.module("client")
+    user = version.module("models").User(user_id=1, name="a")
+    body, media_type = client_module.encode_body(version.module("client").UsersClient.POST_USER_BODY, user)
+    assert media_type == "application/json"
+    assert json.loads(body)["user-id"] == 1
+    if client_module.msgpack is not None:
+        packed, _ = client_module.encode_body(client_module.UsersClient.POST_PACKED_BODY, user, as_msgpack=True)
+        assert client_module.msgpack.unpackb(packed)["user-id"] == 1
@@ -0,0 +1,36 @@
+"""`--timings` and `--profile` reports of the translator phases."""
+
+import json
+
+CONTRACT = """
+req tokens h/str/X-Access
+api tag users req/tokens
+api get/users q/u32/page -> b/json/Vec<String>
+api tag chat
+api get/chats -> ok
+"""
+
+
+def test_json_timings_report_phases_and_counts(translate):
+    translate(CONTRACT, "-v", "v1", "--timings", "json")
+    report = json.loads(translate.stderr)
+    for phase in ("parse", "types", "requirements", "codegen", "write", "api_json", "api_index"):
+        assert report["phases"][phase]["calls"] >= 1
+    assert report["counts"]["tags"] == 2
+    assert report["counts"]["endpoints"] == 2
+    assert report["counts"]["files"] == 1
+    assert {entry["tag"] for entry in report["slowest_tags"]} == {"users", "chat"}
+    assert "memory" not in report
+
+
+def test_text_timings_report(translate):
+    translate(CONTRACT, "-v", "v1", "--timings", "--slowest", "1")
+    assert translate.stderr.startswith("phase")
+    assert "files=1, lines=6, tags=2, endpoints=2" in translate.stderr
+    slowest = translate.stderr.split("slowest tags: ")[1].splitlines()[0]
+    assert slowest.count("ms") == 1
+
+
+def test_profile_adds_memory(translate):
+    translate(CONTRACT, "-v", "v1", "--profile")
+    assert "peak traced memory:" in translate.stderr
@@ -0,0 +1,65 @@
+"""DSL type expressions: parsing, translation to Python types and alias resolution."""
+
+import pytest
+
+import main as skdsl
+
+
+def definitions(dsl: str):
+    return skdsl.parse_dsl_fragment(dsl).type_definitions
+
+
+@pytest.mark.parametrize("dsl_type, py_type", [
+    ("u32", "int"),
+    ("String", "str"),
+    ("Vec<Option<f64>>", "List[Optional[float]]"),
+    ("HashMap<String, HashMap<u32, Vec<bool>>>", "Dict[str, Dict[int, List[bool]]]"),
+    ("(u8, String)", "Tuple[int, str]"),
+    ("Vec<(i64, Vec<u8>)>", "List[Tuple[int, List[int]]]"),
+])
+def test_translates_nested_generics(dsl_type, py_type):
+    assert skdsl.DslTypeResolver({}).to_python(dsl_type) == py_type
+
+
+def test_equal_subtrees_are_parsed_once():
+    first = skdsl.parse_dsl_type_expr("HashMap<String, Vec<u8>>")
+    second = skdsl.parse_dsl_type_expr("Vec<Vec<u8>>")
+    assert first.args[1] is second.args[0]
+
+
+@pytest.mark.parametrize("dsl_type", ["Vec<u8", "HashMap<String u8>", "Vec<>", "u8>"])
+def test_malformed_types_raise(dsl_type):
+    with pytest.raises(ValueError):
+        skdsl.parse_dsl_type_expr(dsl_type)
+
+
+def test_malformed_and_unknown_types_become_any(capsys):
+    resolver = skdsl.DslTypeResolver({})
+    assert resolver.to_python("Vec<u8") == "Any"
+    assert resolver.to_python("Nope") == "Any"
+    assert resolver.to_python("Vec<u8, u8>") == "Any"
+    out = capsys.readouterr().out
+    assert "Could not parse DSL type 'Vec<u8'" in out
+    assert "Unknown DSL type 'Nope'" in out
+    assert "'Vec' takes 1 type argument(s), got 2" in out
+
+
+def test_aliases_are_ordered_after_their_dependencies():
+    types = definitions("type Outer Vec<Inner>\ntype Inner HashMap<String, Leaf>\ntype Leaf u32\n")
+    assert skdsl.DslTypeResolver(types).definition_order == ["Leaf", "Inner", "Outer"]
+
+
+def test_alias_cycles_become_any(capsys):
+    types = definitions("type A Vec<B>\ntype B Option<A>\ntype C Vec<A>\n")
+    resolver = skdsl.DslTypeResolver(types)
+    assert resolver.cyclic_aliases == {"A", "B"}
+    assert resolver.to_python("C") == "C"
+    assert resolver.to_python("Vec<A>") == "List[Any]"
+    assert "Error: Type alias cycle" in capsys.readouterr().out
+
+
+def test_generated_models_define_aliases(translate):
+    translate("type Leaf u32\ntype Tree HashMap<String, Vec<Leaf>>\napi tag t\napi get/tree -> b/json/Tree\n", "-v", "v1")
+    models = (translate.output / "v1" / "models.py").read_text()
+    assert "Leaf = int" in models
+    assert models.index("Leaf = int") < models.index("Tree = Dict[str, List[Leaf]]")
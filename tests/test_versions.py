@@ -0,0 +1,90 @@
+"""Version decision from `.api.index.json` and breaking-change detection."""
+
+import json
+
+import main as skdsl
+
+CONTRACT = """
+type Id u64
+api tag users
+api get/user/{u64/id} q/Option<bool>/full -> b/json/String
+api post/user b/json/String -> ok h/str/X-Request-Id
+
+api tag admin
+api get/user/{u64/id} -> b/json/String
+"""
+
+
+def index(dsl):
+    return skdsl.build_api_index(skdsl.parse_dsl_file_content(dsl))
+
+
+def breaking(old_dsl, new_dsl):
+    return skdsl.find_breaking_changes(index(old_dsl), index(new_dsl))
+
+
+def test_same_path_in_two_tags_has_two_entries():
+    assert set(index(CONTRACT)["endpoints"]) == {"GET /users/user/{id}", "POST /users/user", "GET /admin/user/{id}"}
+
+
+def test_moving_an_endpoint_to_another_tag_is_breaking():
+    moved = CONTRACT.replace("api post/user b/json/String -> ok h/str/X-Request-Id\n", "") \
+        + "api post/user b/json/String -> ok h/str/X-Request-Id\n"
+    assert breaking(CONTRACT, moved) == ["POST /users/user: endpoint removed"]
+
+
+def test_compatible_changes_are_not_breaking():
+    extended = CONTRACT.replace("q/Option<bool>/full", "") \
+        .replace("-> ok h/str/X-Request-Id", "q/Option<u32>/page -> ok h/str/X-Request-Id h/str/X-Trace") \
+        + "api get/users -> b/json/Vec<String>\n"
+    assert breaking(CONTRACT, extended) == []
+
+
+def test_alias_spelling_is_not_breaking():
+    assert breaking(CONTRACT, CONTRACT.replace("{u64/id} q", "{Id/id} q")) == []
+
+
+def test_incompatible_changes_are_breaking():
+    changed = CONTRACT.replace("q/Option<bool>/full", "q/bool/full").replace("-> ok h/str/X-Request-Id", "-> b/plain")
+    assert breaking(CONTRACT, changed) == [
+        "GET /users/user/{id}: incoming 'q:full' changed from Option<bool> to bool",
+        "POST /users/user: outgoing 'h:x-request-id' removed",
+        "POST /users/user: response body changed from ok to plain",
+    ]
+
+
+def test_compatible_contract_reuses_the_latest_version_and_rewrites_changes(translate):
+    translate(CONTRACT)
+    output = translate(CONTRACT.replace("api tag admin", "api get/users -> ok\n\napi tag admin"))
+    assert "No breaking changes against v1" in output
+    assert not (translate.output / "v2").exists()
+    assert "async def get_users(" in (translate.output / "v1" / "users.py").read_text()
+    index_path = translate.output / "v1" / skdsl.API_INDEX_FILE_NAME
+    assert "GET /users/users" in json.loads(index_path.read_text())["endpoints"]
+    assert "users.py" in translate.generated(output)
+
+
+def test_reuse_keeps_unchanged_files(translate):
+    translate(CONTRACT)
+    admin_module = translate.output / "v1" / "admin.py"
+    admin_module.write_text(admin_module.read_text() + "# edited by hand\n")
+    output = translate(CONTRACT.replace("api tag admin", "api get/users -> ok\n\napi tag admin"))
+    assert admin_module.read_text().endswith("# edited by hand\n")
+    assert "models.py" not in translate.generated(output)
+
+
+def test_breaking_contract_bumps_the_version(translate):
+    translate(CONTRACT)
+    output = translate(CONTRACT.replace("api tag admin\napi get/user/{u64/id} -> b/json/String\n", ""))
+    assert "1 breaking change(s) against v1" in output
+    assert "GET /admin/user/{id}: endpoint removed" in output
+    assert (translate.output / "v2" / "users.py").exists()
+
+
+def test_index_of_an_older_format_bumps_the_version(translate):
+    translate(CONTRACT)
+    index_path = translate.output / "v1" / skdsl.API_INDEX_FILE_NAME
+    index_path.write_text(json.dumps({"format": 1, "endpoints": {}}))
+    output = translate(CONTRACT)
+    assert "bumping the version" in output
+    assert (translate.output / "v2").is_dir()
@@ -0,0 +1,68 @@
+"""`--watch`: per-tag diffs of the held contract and regeneration of the affected files."""
+
+import main as skdsl
+
+CONTRACT = """
+type Item struct { id: u64 }
+req tokens h/str/X-Access
+
+api tag items req/tokens
+api get/items -> b/json/Vec<Item>
+api get/item/{u64/id} -> b/json/Item
+
+api tag misc
+api get/ping -> ok
+"""
+
+
+def snapshot(tmp_path, dsl):
+    path = tmp_path / "api.dsl"
+    path.write_text(dsl)
+    dsl_file, paths = skdsl.load_contract(path, None, skdsl.PhaseTimings())
+    return skdsl.snapshot_contract(dsl_file, paths)
+
+
+def test_unchanged_contract_has_an_empty_diff(tmp_path):
+    assert skdsl.diff_contracts(snapshot(tmp_path, CONTRACT), snapshot(tmp_path, CONTRACT)).empty
+
+
+def test_diff_counts_endpoint_changes_per_tag(tmp_path):
+    old = snapshot(tmp_path, CONTRACT)
+    new = snapshot(tmp_path, CONTRACT.replace("get/item/{u64/id}", "get/item/{u64/id} q/bool/full")
+                   + "api post/items b/json/Item -> ok\napi tag extra\napi get/extra -> ok\n")
+    diff = skdsl.diff_contracts(old, new)
+    assert diff.added_tags == ["extra"]
+    assert diff.changed_tags == ["items", "misc"]
+    assert diff.endpoint_changes["items"] == {"added": 0, "removed": 0, "changed": 1}
+    assert diff.endpoint_changes["misc"] == {"added": 1, "removed": 0, "changed": 0}
+    assert diff.app_changed and not diff.models_changed
+
+
+def test_type_and_requirement_changes_touch_their_tags(tmp_path):
+    old = snapshot(tmp_path, CONTRACT)
+    new = snapshot(tmp_path, CONTRACT.replace("id: u64", "id: u32").replace("h/str/X-Access", "h/str/X-Token"))
+    diff = skdsl.diff_contracts(old, new)
+    assert diff.changed_tags == ["items"]
+    assert diff.models_changed and diff.requirements_changed and not diff.app_changed
+    assert skdsl.describe_contract_diff(diff) == "tag 'items' (2 changed endpoint(s)); models; requirements"
+
+
+def test_watch_regenerates_only_the_changed_tag(translate, monkeypatch):
+    translate(CONTRACT, "-v", "v1")
+    version_dir = translate.output / "v1"
+    misc_module = version_dir / "misc.py"
+    misc_module.write_text(misc_module.read_text() + "# edited by hand\n")
+    saves = [CONTRACT.replace("get/items", "get/items q/u32/page")]
+
+    def wait_for_dsl_change(paths, stamps, interval, debounce):
+        if not saves:
+            raise KeyboardInterrupt
+        translate.contract.write_text(saves.pop())
+        return skdsl.stat_dsl_files(paths)
+
+    monkeypatch.setattr(skdsl, "wait_for_dsl_change", wait_for_dsl_change)
+    output = translate.run("-i", str(translate.contract), "-o", str(translate.output), "-v", "v1", "--no-cache", "--watch")
+    assert "Rebuilt tag 'items' (1 changed endpoint(s))" in output
+    assert "page: int = Query" in (version_dir / "items.py").read_text()
+    assert misc_module.read_text().endswith("# edited by hand\n")
+    assert "Info: Watch stopped" in output